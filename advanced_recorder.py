@@ -6,33 +6,57 @@ Fixes: Audio detection, multi-monitor selection, file corruption
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import subprocess
-import threading
 import os
+import shutil
+import time
 from datetime import datetime
-import sys
+
+from segmented_output import OUTPUT_MODES, output_size
+from device_discovery import get_cache
+from transcode_queue import TranscodeQueue
+from replay_buffer import ReplayBuffer
+from prewarm import StandbyCapture
+from audio_meter import BLOCK_SECONDS, AudioMeter, draw_level
+from command_builder import advanced_recorder_inputs
+from recording_session import FAILED, PAUSED, RecordingConfig, RecordingSession
+from desktop_discovery import detect_monitors, list_windows, run_async
+
+NO_BLUR = "(none)"
+
 
 class AdvancedRecorderGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Advanced Screen Recorder")
-        self.root.geometry("650x800")
-        
-        self.recording_process = None
+        self.root.geometry("650x950")
+        
+        self.session = None
+        self.transcode_queue = None
+        self.replay_buffer = None
+        self.standby = None
+        self.meter = None
+        self.meter_job = None
         self.is_recording = False
         self.monitors = []
         self.audio_devices = []
+        self.device_cache = get_cache()
+        self.windows_scanned = False
         
         self.setup_ui()
-        self.detect_monitors()
-        self.detect_audio_devices()
+        # Scans run on worker threads and fill the dropdowns as they finish;
+        # the window list is only fetched once window mode is picked
+        self.detect_monitors(notify=False)
+        self.detect_audio_devices(force=False)
     
     def setup_ui(self):
         """Create UI"""
         # Title
         title = tk.Label(self.root, text="🎥 Advanced Screen Recorder", 
                         font=("Arial", 18, "bold"), fg="#2563eb")
-        title.pack(pady=10)
+        title.pack(pady=(10, 0))
+        
+        self.discovery_label = tk.Label(self.root, text="", font=("Arial", 8), fg="#6b7280")
+        self.discovery_label.pack()
         
         # Monitor Selection
         monitor_frame = tk.LabelFrame(self.root, text="🖥️ Monitor Selection", 
@@ -60,8 +84,14 @@ class AdvancedRecorderGUI:
                       variable=self.mode_var, value="desktop").pack(anchor="w")
         tk.Radiobutton(mode_frame, text="🖥️ Selected Monitor Only",
                       variable=self.mode_var, value="monitor").pack(anchor="w")
+        tk.Radiobutton(mode_frame, text="🖥️🖥️ Every Monitor in Parallel (one stream each)",
+                      variable=self.mode_var, value="parallel").pack(anchor="w")
+        self.multitrack_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(mode_frame, text="Single multi-track MKV instead of one file per monitor",
+                      variable=self.multitrack_var, font=("Arial", 8)).pack(anchor="w", padx=20)
         tk.Radiobutton(mode_frame, text="🪟 Specific Window",
-                      variable=self.mode_var, value="window").pack(anchor="w")
+                      variable=self.mode_var, value="window",
+                      command=self.window_mode_selected).pack(anchor="w")
         
         # Window selection
         win_frame = tk.Frame(mode_frame)
@@ -93,6 +123,16 @@ class AdvancedRecorderGUI:
         self.audio_dropdown = ttk.Combobox(audio_frame, textvariable=self.audio_var,
                                           state="readonly", width=55)
         self.audio_dropdown.pack(fill="x", pady=2)
+        self.audio_dropdown.bind("<<ComboboxSelected>>", lambda e: self.restart_meter())
+        
+        level_row = tk.Frame(audio_frame)
+        level_row.pack(fill="x")
+        self.meter_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(level_row, text="🎚️ Levels", variable=self.meter_var,
+                      command=self.restart_meter, font=("Arial", 9)).pack(side="left")
+        self.audio_level = tk.Canvas(level_row, width=420, height=8, bg="#e5e7eb",
+                                     highlightthickness=0)
+        self.audio_level.pack(side="left", padx=5)
         
         self.audio_status = tk.Label(audio_frame, text="", fg="#dc2626", font=("Arial", 8))
         self.audio_status.pack(anchor="w")
@@ -118,6 +158,53 @@ class AdvancedRecorderGUI:
         ttk.Combobox(quality_frame, textvariable=self.quality_var,
                     values=["18 (Best)", "23 (Good)", "28 (Fast)"], state="readonly", width=15).pack(side="left", padx=5)
         
+        # Output mode
+        output_mode_frame = tk.Frame(settings_frame)
+        output_mode_frame.pack(fill="x", pady=2)
+        tk.Label(output_mode_frame, text="Output Mode:").pack(side="left")
+        self.output_mode_var = tk.StringVar(value="single")
+        ttk.Combobox(output_mode_frame, textvariable=self.output_mode_var,
+                    values=OUTPUT_MODES, state="readonly", width=15).pack(side="left", padx=5)
+        tk.Label(output_mode_frame, text="(segments survive crashes)",
+                font=("Arial", 8), fg="#6b7280").pack(side="left")
+        
+        # Variable frame rate
+        self.vfr_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(settings_frame, text="🧊 Skip static frames (variable frame rate, smaller files)",
+                      variable=self.vfr_var).pack(anchor="w")
+        
+        # Share copy from the same capture and decode
+        self.share_copy_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(settings_frame, text="📱 Also save a 720p share copy (same capture, one extra encode)",
+                      variable=self.share_copy_var).pack(anchor="w")
+        self.previews_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(settings_frame, text="🖼️ Thumbnails, scrub sprites and preview clip",
+                      variable=self.previews_var).pack(anchor="w")
+        
+        # Window blurred inside the capture's filter graph
+        blur_frame = tk.Frame(settings_frame)
+        blur_frame.pack(fill="x", pady=2)
+        tk.Label(blur_frame, text="🙈 Blur window:").pack(side="left")
+        self.blur_window_var = tk.StringVar(value=NO_BLUR)
+        self.blur_dropdown = ttk.Combobox(blur_frame, textvariable=self.blur_window_var,
+                                          values=[NO_BLUR], state="readonly", width=35)
+        self.blur_dropdown.pack(side="left", padx=10)
+        tk.Label(blur_frame, text="follows the window within 2 s",
+                 font=("Arial", 8), fg="#6b7280").pack(side="left")
+        
+        # Two-stage capture
+        self.two_stage_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(settings_frame, text="⚡ Lossless fast capture, compress after stop",
+                      variable=self.two_stage_var).pack(anchor="w")
+        self.defer_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(settings_frame, text="🌙 Queue compression for overnight run",
+                      variable=self.defer_var).pack(anchor="w", padx=20)
+        
+        # Hot standby
+        self.standby_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(settings_frame, text="🔥 Keep capture warm for instant start",
+                      variable=self.standby_var, command=self.toggle_standby).pack(anchor="w")
+        
         # Output location
         output_frame = tk.Frame(settings_frame)
         output_frame.pack(fill="x", pady=5)
@@ -126,6 +213,26 @@ class AdvancedRecorderGUI:
         tk.Entry(output_frame, textvariable=self.output_dir, width=35).pack(side="left", padx=5)
         tk.Button(output_frame, text="Browse", command=self.browse_output).pack(side="left")
         
+        # Instant replay
+        replay_frame = tk.LabelFrame(self.root, text="⏪ Instant Replay",
+                                    font=("Arial", 10, "bold"), padx=10, pady=5)
+        replay_frame.pack(fill="x", padx=20, pady=5)
+        
+        replay_row = tk.Frame(replay_frame)
+        replay_row.pack(fill="x")
+        self.replay_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(replay_row, text="Always keep the last 5 minutes",
+                      variable=self.replay_var, command=self.toggle_replay).pack(side="left")
+        
+        tk.Button(replay_row, text="💾 Save Replay", command=self.save_replay).pack(side="right")
+        self.replay_seconds = tk.StringVar(value="60")
+        ttk.Combobox(replay_row, textvariable=self.replay_seconds,
+                    values=["30", "60", "120", "300"], state="readonly", width=5).pack(side="right", padx=5)
+        tk.Label(replay_row, text="Seconds:").pack(side="right")
+        
+        self.replay_status = tk.Label(replay_frame, text="", font=("Arial", 8), fg="#6b7280")
+        self.replay_status.pack(anchor="w")
+        
         # Status
         status_frame = tk.Frame(self.root)
         status_frame.pack(pady=10)
@@ -138,6 +245,10 @@ class AdvancedRecorderGUI:
                                     font=("Arial", 16), fg="#6b7280")
         self.timer_label.pack()
         
+        self.stats_label = tk.Label(status_frame, text="",
+                                    font=("Arial", 9), fg="#6b7280")
+        self.stats_label.pack()
+        
         # Buttons
         btn_frame = tk.Frame(self.root)
         btn_frame.pack(pady=10)
@@ -148,6 +259,13 @@ class AdvancedRecorderGUI:
                                    font=("Arial", 12, "bold"), width=18, height=2)
         self.start_btn.pack(side="left", padx=5)
         
+        self.pause_btn = tk.Button(btn_frame, text="⏸️ Pause",
+                                   command=self.toggle_pause,
+                                   bg="#6b7280", fg="white",
+                                   font=("Arial", 12, "bold"), width=10, height=2,
+                                   state="disabled")
+        self.pause_btn.pack(side="left", padx=5)
+        
         self.stop_btn = tk.Button(btn_frame, text="⏹️ Stop",
                                   command=self.stop_recording,
                                   bg="#6b7280", fg="white",
@@ -160,104 +278,139 @@ class AdvancedRecorderGUI:
                                    fg="#6b7280", wraplength=600)
         self.info_label.pack(pady=5)
     
-    def detect_monitors(self):
-        """Detect all monitors using PowerShell"""
-        try:
-            ps_script = '''
-            Add-Type -AssemblyName System.Windows.Forms
-            $screens = [System.Windows.Forms.Screen]::AllScreens
-            $index = 0
-            foreach ($screen in $screens) {
-                $index++
-                $primary = if ($screen.Primary) { " (PRIMARY)" } else { "" }
-                Write-Output "Monitor $index$primary|$($screen.Bounds.X)|$($screen.Bounds.Y)|$($screen.Bounds.Width)|$($screen.Bounds.Height)"
-            }
-            '''
-            
-            result = subprocess.run(['powershell', '-Command', ps_script],
-                                  capture_output=True, text=True, timeout=10)
-            
-            self.monitors = []
-            for line in result.stdout.strip().split('\n'):
-                if '|' in line:
-                    parts = line.strip().split('|')
-                    if len(parts) == 5:
-                        self.monitors.append({
-                            'name': parts[0],
-                            'x': int(parts[1]),
-                            'y': int(parts[2]),
-                            'width': int(parts[3]),
-                            'height': int(parts[4])
-                        })
-            
-            if self.monitors:
-                options = [f"{m['name']} - {m['width']}x{m['height']}" for m in self.monitors]
-                self.monitor_dropdown['values'] = options
-                self.monitor_dropdown.current(0)
+    def detect_monitors(self, notify=True):
+        """Detect all monitors in the background (PowerShell, xrandr on Linux)"""
+        self.discovery_label.config(text="⏳ Detecting monitors...")
+        run_async(detect_monitors, lambda monitors, error: self.monitors_found(monitors, error, notify),
+                  self.root.after)
+    
+    def monitors_found(self, monitors, error, notify):
+        """Monitor scan finished (runs on the Tk thread)"""
+        if error:
+            self.discovery_label.config(text="✗ Monitor detection failed, will use full desktop")
+            if notify:
+                messagebox.showerror("Error", f"Failed to detect monitors: {error}")
+            return
+        self.monitors = monitors
+        self.show_monitors(notify)
+    
+    def show_monitors(self, notify=True):
+        """Populate the monitor dropdown"""
+        if self.monitors:
+            options = [f"{m['name']} - {m['width']}x{m['height']}" for m in self.monitors]
+            self.monitor_dropdown['values'] = options
+            self.monitor_dropdown.current(0)
+            self.discovery_label.config(text=f"✓ {len(self.monitors)} monitor(s)")
+            if notify:
                 messagebox.showinfo("Success", f"Found {len(self.monitors)} monitor(s)")
-            else:
+        else:
+            self.discovery_label.config(text="No monitors detected, will use full desktop")
+            if notify:
                 messagebox.showwarning("Warning", "No monitors detected, will use full desktop")
-                
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to detect monitors: {e}")
     
-    def detect_audio_devices(self):
-        """Detect audio devices"""
-        try:
-            cmd = ['ffmpeg', '-list_devices', 'true', '-f', 'dshow', '-i', 'dummy']
-            result = subprocess.run(cmd, capture_output=True, text=True,
-                                  stderr=subprocess.STDOUT, timeout=10)
-            
-            self.audio_devices = []
-            for line in result.stdout.split('\n'):
-                if '(audio)' in line and '"' in line:
-                    start = line.find('"') + 1
-                    end = line.find('"', start)
-                    if start > 0 and end > start:
-                        device = line[start:end]
-                        self.audio_devices.append(device)
-            
-            if self.audio_devices:
-                self.audio_dropdown['values'] = self.audio_devices
+    def detect_audio_devices(self, force=True):
+        """Detect audio devices (cached list first, fresh scan in the background)"""
+        def on_update(devices):
+            self.root.after(0, self.audio_scan_finished, devices, None, force)
+        
+        def on_error(error):
+            self.root.after(0, self.audio_scan_finished, None, error, force)
+        
+        cached = self.device_cache.get(on_update=on_update, on_error=on_error,
+                                       force_refresh=force)
+        if cached:
+            self.show_audio_devices(cached)
+        else:
+            self.audio_status.config(text="Scanning audio devices...", fg="#6b7280")
+    
+    def show_audio_devices(self, devices):
+        """Populate the audio dropdown"""
+        self.audio_devices = [d.name for d in devices]
+        if self.audio_devices:
+            self.audio_dropdown['values'] = self.audio_devices
+            if self.audio_var.get() not in self.audio_devices:
                 self.audio_dropdown.current(0)
-                self.audio_status.config(text=f"✓ Found {len(self.audio_devices)} device(s)", fg="#059669")
-                messagebox.showinfo("Audio Devices", 
-                                  f"Found {len(self.audio_devices)} audio device(s):\n\n" + 
-                                  "\n".join(f"• {d}" for d in self.audio_devices))
-            else:
-                self.audio_status.config(text="✗ No audio devices found!", fg="#dc2626")
-                messagebox.showwarning("No Audio", 
-                                     "No audio devices detected!\n\n" +
-                                     "To enable audio:\n" +
-                                     "1. Right-click speaker icon → Sounds\n" +
-                                     "2. Recording tab\n" +
-                                     "3. Right-click → Show Disabled Devices\n" +
-                                     "4. Enable 'Stereo Mix' or your microphone")
-                
-        except FileNotFoundError:
+            self.audio_status.config(text=f"✓ Found {len(self.audio_devices)} device(s)", fg="#059669")
+        else:
+            self.audio_status.config(text="✗ No audio devices found!", fg="#dc2626")
+        self.restart_meter()
+    
+    def restart_meter(self):
+        """Meter the selected device while levels are switched on"""
+        if self.meter:
+            self.meter.stop()
+            self.meter = None
+        if self.meter_var.get() and self.audio_var.get():
+            try:
+                self.meter = AudioMeter(
+                    self.device_cache.backend.input_args(self.audio_var.get())).start()
+            except OSError as e:
+                self.audio_status.config(text=f"✗ Level meter failed: {e}", fg="#dc2626")
+        self.update_meter()
+    
+    def update_meter(self):
+        """Redraw the level bar, 20 times a second while the meter runs"""
+        if self.meter_job:
+            self.root.after_cancel(self.meter_job)
+            self.meter_job = None
+        draw_level(self.audio_level, self.meter)
+        if self.meter:
+            self.meter_job = self.root.after(int(BLOCK_SECONDS * 1000), self.update_meter)
+    
+    def audio_scan_finished(self, devices, error, notify):
+        """Background device scan completed (runs on the Tk thread)"""
+        if isinstance(error, FileNotFoundError):
             self.audio_status.config(text="✗ FFmpeg not found!", fg="#dc2626")
-            messagebox.showerror("Error", "FFmpeg not found!")
-        except Exception as e:
-            self.audio_status.config(text=f"✗ Error: {str(e)}", fg="#dc2626")
+            if notify:
+                messagebox.showerror("Error", "FFmpeg not found!")
+            return
+        if error:
+            self.audio_status.config(text=f"✗ Error: {str(error)}", fg="#dc2626")
+            return
+        
+        self.show_audio_devices(devices)
+        if not notify:
+            return
+        if self.audio_devices:
+            messagebox.showinfo("Audio Devices", 
+                              f"Found {len(self.audio_devices)} audio device(s):\n\n" + 
+                              "\n".join(f"• {d}" for d in self.audio_devices))
+        else:
+            messagebox.showwarning("No Audio", 
+                                 "No audio devices detected!\n\n" +
+                                 "To enable audio:\n" +
+                                 "1. Right-click speaker icon → Sounds\n" +
+                                 "2. Recording tab\n" +
+                                 "3. Right-click → Show Disabled Devices\n" +
+                                 "4. Enable 'Stereo Mix' or your microphone")
     
-    def refresh_windows(self):
-        """Get list of windows"""
-        try:
-            ps_cmd = 'Get-Process | Where-Object {$_.MainWindowTitle -ne ""} | Select-Object -ExpandProperty MainWindowTitle'
-            result = subprocess.run(['powershell', '-Command', ps_cmd],
-                                  capture_output=True, text=True, timeout=10)
-            
-            windows = [w.strip() for w in result.stdout.split('\n') if w.strip()]
-            
-            if windows:
-                self.window_dropdown['values'] = windows
+    def window_mode_selected(self):
+        """Fetch the window list the first time window mode is chosen"""
+        if not self.windows_scanned:
+            self.refresh_windows(notify=False)
+    
+    def refresh_windows(self, notify=True):
+        """Get list of windows (in the background)"""
+        self.windows_scanned = True
+        run_async(list_windows, lambda windows, error: self.windows_found(windows, error, notify),
+                  self.root.after)
+    
+    def windows_found(self, windows, error, notify):
+        """Window scan finished (runs on the Tk thread)"""
+        if error:
+            if notify:
+                messagebox.showerror("Error", f"Failed to get windows: {error}")
+            return
+        
+        if windows:
+            self.window_dropdown['values'] = windows
+            self.blur_dropdown['values'] = [NO_BLUR] + windows
+            if self.window_var.get() not in windows:
                 self.window_dropdown.current(0)
+            if notify:
                 messagebox.showinfo("Windows", f"Found {len(windows)} windows")
-            else:
-                messagebox.showwarning("Warning", "No windows found")
-                
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to get windows: {e}")
+        elif notify:
+            messagebox.showwarning("Warning", "No windows found")
     
     def browse_output(self):
         """Browse for output directory"""
@@ -265,85 +418,76 @@ class AdvancedRecorderGUI:
         if directory:
             self.output_dir.set(directory)
     
-    def build_command(self):
-        """Build FFmpeg command"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output = os.path.join(self.output_dir.get(), f"recording_{timestamp}.mp4")
-        
-        cmd = ['ffmpeg']
-        
-        # Video input
-        mode = self.mode_var.get()
-        fps = self.fps_var.get()
-        
-        if mode == "desktop":
-            cmd.extend(['-f', 'gdigrab', '-framerate', fps, '-i', 'desktop'])
-        
-        elif mode == "monitor":
-            if not self.monitors:
-                raise ValueError("No monitors detected")
-            
-            idx = self.monitor_dropdown.current()
-            mon = self.monitors[idx]
-            cmd.extend([
-                '-f', 'gdigrab',
-                '-framerate', fps,
-                '-offset_x', str(mon['x']),
-                '-offset_y', str(mon['y']),
-                '-video_size', f"{mon['width']}x{mon['height']}",
-                '-i', 'desktop'
-            ])
-        
-        elif mode == "window":
-            window = self.window_var.get()
-            if not window:
-                raise ValueError("Please select a window")
-            cmd.extend(['-f', 'gdigrab', '-framerate', fps, '-i', f'title={window}'])
-        
-        # Audio input
+    def selected_audio_input(self):
+        """Input arguments for the chosen audio device, None if audio is off"""
         if self.audio_enabled.get() and self.audio_var.get():
-            cmd.extend(['-f', 'dshow', '-i', f'audio={self.audio_var.get()}'])
-        
-        # Codec settings
-        crf = self.quality_var.get().split()[0]
-        cmd.extend([
-            '-c:v', 'libx264',
-            '-preset', 'ultrafast',
-            '-crf', crf,
-            '-pix_fmt', 'yuv420p'  # Important for compatibility!
-        ])
-        
+            return self.device_cache.backend.input_args(self.audio_var.get())
+        return None
+    
+    def build_inputs(self):
+        """FFmpeg input arguments for the selected sources, plus the capture size"""
+        return advanced_recorder_inputs(self.mode_var.get(), self.fps_var.get(), self.monitors,
+                                        max(self.monitor_dropdown.current(), 0),
+                                        self.window_var.get(), self.selected_audio_input())
+    
+    def build_config(self):
+        """Recording configuration from the user's selections"""
+        mode = self.mode_var.get()
+        audio_devices = []
         if self.audio_enabled.get() and self.audio_var.get():
-            cmd.extend(['-c:a', 'aac', '-b:a', '192k'])
-        
-        cmd.append(output)
+            audio_devices.append(self.audio_var.get())
+        blur = self.blur_window_var.get()
+        
+        return RecordingConfig(
+            # Parallel mode: one pipeline per monitor, cheaper than one huge desktop grab
+            recorder='parallel' if mode == "parallel" else 'advanced_recorder',
+            mode=mode, fps=self.fps_var.get(), crf=self.quality_var.get().split()[0],
+            window=self.window_var.get(), monitors=self.monitors,
+            monitor_index=max(self.monitor_dropdown.current(), 0),
+            layout="multitrack" if self.multitrack_var.get() else "separate",
+            audio_devices=audio_devices, audio_backend=self.device_cache.backend.name,
+            output_mode=self.output_mode_var.get(), output_dir=self.output_dir.get(),
+            two_stage=self.two_stage_var.get(), deferred=self.defer_var.get(),
+            vfr=self.vfr_var.get(), renditions=['share'] if self.share_copy_var.get() else [],
+            previews=self.previews_var.get(),
+            redact=[{'window': blur}] if blur != NO_BLUR else [])
+    
+    def toggle_standby(self):
+        """Start or stop the warm capture pipeline used by Start Recording"""
+        if self.standby:
+            self.standby.stop()
+            self.standby = None
+        if not self.standby_var.get():
+            return
         
-        return cmd, output
+        try:
+            self.standby = StandbyCapture(self.build_config()).start()
+            self.info_label.config(text="🔥 Capture is warm; change settings and re-tick to rewarm")
+        except Exception as e:
+            self.standby_var.set(False)
+            messagebox.showerror("Error", f"Failed to start hot standby: {e}")
     
     def start_recording(self):
         """Start recording"""
+        clicked = time.time()
         try:
-            cmd, output = self.build_command()
+            config = self.build_config()
+            self.session = RecordingSession(config, standby=self.standby).start(clicked)
             
-            self.info_label.config(text=f"Saving to: {output}")
+            if self.standby and not self.session.parts[0]['standby']:
+                self.info_label.config(text=f"Saving to: {self.session.output}\n"
+                                            "(settings differ from the warm capture: cold start)")
+            elif config.recorder == 'parallel':
+                self.info_label.config(text=f"Saving {len(self.monitors)} streams to: "
+                                            f"{self.session.output}")
+            else:
+                self.info_label.config(text=f"Saving to: {self.session.output}")
             self.status_label.config(text="🔴 Recording...", fg="#dc2626")
             self.start_btn.config(state="disabled")
+            self.pause_btn.config(state="normal", bg="#d97706")
             self.stop_btn.config(state="normal", bg="#dc2626")
             
             self.is_recording = True
-            self.start_time = datetime.now()
-            self.output_file = output
-            
-            def run():
-                self.recording_process = subprocess.Popen(
-                    cmd,
-                    stdin=subprocess.PIPE,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE
-                )
-                self.recording_process.wait()
-            
-            threading.Thread(target=run, daemon=True).start()
             self.update_timer()
             
         except Exception as e:
@@ -352,48 +496,163 @@ class AdvancedRecorderGUI:
     
     def stop_recording(self):
         """Stop recording"""
-        if self.recording_process:
-            try:
-                self.recording_process.stdin.write(b'q')
-                self.recording_process.stdin.flush()
-                self.recording_process.wait(timeout=5)
-            except:
-                self.recording_process.terminate()
+        session = self.session
+        if session:
+            session.stop(timeout=5)
         
         self.is_recording = False
         self.reset_ui()
-        
-        if os.path.exists(self.output_file):
-            size = os.path.getsize(self.output_file) / (1024*1024)
+        if not session:
+            return
+        
+        static_info = ""
+        if session.decimation:
+            static_info = f"\n{session.decimation.summary().capitalize()}"
+        if session.start_latency is not None:
+            static_info += f"\nClick to first frame: {session.start_latency * 1000:+.0f} ms"
+        for r in session.rendition_stats()[1:]:
+            static_info += (f"\n{r['name'].capitalize()} copy: {os.path.basename(r['output'])} "
+                            f"({r['size_bytes'] / (1024*1024):.1f} MB)")
+        if session.previews:
+            static_info += f"\nPreviews: {os.path.basename(session.parts[0]['previews'])}"
+        if session.joined:
+            static_info += f"\n{len(session.parts)} paused parts joined"
+        elif session.join_error:
+            static_info += f"\nParts kept separately (join failed: {session.join_error})"
+        
+        if session.transcode_jobs:
+            for job in session.transcode_jobs:
+                self.queue_transcode(job)
+            return
+        
+        if session.output and os.path.exists(session.output):
+            size = output_size(session.output) / (1024*1024)
             messagebox.showinfo("Success", 
                               f"Recording saved!\n\n" +
-                              f"File: {os.path.basename(self.output_file)}\n" +
-                              f"Size: {size:.1f} MB")
+                              f"File: {os.path.basename(session.output)}\n" +
+                              f"Size: {size:.1f} MB" + static_info)
         else:
             messagebox.showerror("Error", "Recording file not created!")
     
+    def toggle_pause(self):
+        """Pause or resume; the parts are joined without re-encoding at stop"""
+        if not self.session:
+            return
+        try:
+            if self.session.state == PAUSED:
+                self.session.resume()
+                self.pause_btn.config(text="⏸️ Pause")
+                self.status_label.config(text="🔴 Recording...", fg="#dc2626")
+            else:
+                self.session.pause()
+                self.pause_btn.config(text="▶️ Resume")
+                self.status_label.config(text="⏸️ Paused", fg="#d97706")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to pause/resume: {e}")
+    
+    def queue_transcode(self, job):
+        """Hand the scratch capture to the background transcode queue"""
+        if self.transcode_queue is None:
+            def on_job_done(done):
+                self.root.after(0, self.transcode_finished, done)
+            self.transcode_queue = TranscodeQueue(workers=1, on_job_done=on_job_done).start()
+        
+        self.transcode_queue.submit(job)
+        if job.deferred:
+            self.info_label.config(text=f"🌙 Queued for overnight compression: {job.output}\n"
+                                        "(run: python transcode_queue.py run)")
+        else:
+            self.info_label.config(text=f"⏳ Compressing in background: {job.output}")
+    
+    def transcode_finished(self, job):
+        """Background compression finished (runs on the Tk thread)"""
+        if job.status == 'done':
+            size = output_size(job.output) / (1024*1024)
+            self.info_label.config(text=f"✅ Compressed: {job.output} ({size:.1f} MB)")
+        else:
+            self.info_label.config(text=f"❌ Compression failed, capture kept at {job.input}")
+    
+    def toggle_replay(self):
+        """Start or stop the always-on replay buffer"""
+        if not self.replay_var.get():
+            if self.replay_buffer:
+                self.replay_buffer.stop()
+                self.replay_buffer = None
+            self.replay_status.config(text="")
+            return
+        
+        try:
+            inputs, _ = self.build_inputs()
+            audio = bool(self.audio_enabled.get() and self.audio_var.get())
+            crf = self.quality_var.get().split()[0]
+            self.replay_buffer = ReplayBuffer(inputs, fps=self.fps_var.get(), crf=crf,
+                                              audio=audio).start()
+            self.update_replay_status()
+        except Exception as e:
+            self.replay_var.set(False)
+            messagebox.showerror("Error", f"Failed to start replay buffer: {e}")
+    
+    def update_replay_status(self):
+        """Show how much is buffered"""
+        buffer = self.replay_buffer
+        if not buffer:
+            return
+        if not buffer.running:
+            self.replay_var.set(False)
+            self.replay_buffer = None
+            self.replay_status.config(text=f"✗ Replay capture stopped: {buffer.process.log_tail(1)}",
+                                      fg="#dc2626")
+            buffer.stop()
+            return
+        self.replay_status.config(text=f"⏺ {buffer.buffered_seconds():.0f}s buffered", fg="#6b7280")
+        self.root.after(1000, self.update_replay_status)
+    
+    def save_replay(self):
+        """Write the last N seconds to the output folder without stopping the buffer"""
+        if not self.replay_buffer:
+            messagebox.showwarning("Replay", "Turn on the replay buffer first")
+            return
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output = os.path.join(self.output_dir.get(), f"replay_{timestamp}.mp4")
+        try:
+            result = self.replay_buffer.save_replay(int(self.replay_seconds.get()), output)
+            self.info_label.config(text=f"💾 Saved {result['seconds']:.0f}s replay to: {output}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save replay: {e}")
+    
     def reset_ui(self):
         """Reset UI after recording"""
         self.status_label.config(text="⏸️ Ready", fg="#059669")
         self.start_btn.config(state="normal")
+        self.pause_btn.config(state="disabled", text="⏸️ Pause", bg="#6b7280")
         self.stop_btn.config(state="disabled", bg="#6b7280")
         self.timer_label.config(text="00:00:00")
+        self.stats_label.config(text="")
     
     def update_timer(self):
         """Update timer"""
         if self.is_recording:
-            elapsed = (datetime.now() - self.start_time).total_seconds()
+            elapsed = self.session.elapsed()
             hours = int(elapsed // 3600)
             minutes = int((elapsed % 3600) // 60)
             seconds = int(elapsed % 60)
             self.timer_label.config(text=f"{hours:02d}:{minutes:02d}:{seconds:02d}")
+            
+            if self.session.state == FAILED:
+                self.is_recording = False
+                self.reset_ui()
+                messagebox.showerror("Error", self.session.error)
+                return
+            if self.session.latest:
+                summary = self.session.latest.summary()
+                if self.session.decimation:
+                    summary += " | " + self.session.decimation.summary()
+                self.stats_label.config(text=summary)
             self.root.after(1000, self.update_timer)
 
 def main():
-    # Check FFmpeg
-    try:
-        subprocess.run(['ffmpeg', '-version'], capture_output=True, check=True)
-    except:
+    # Check FFmpeg (a PATH lookup, so startup doesn't wait on a spawn)
+    if not shutil.which('ffmpeg'):
         messagebox.showerror("Error", 
                            "FFmpeg not found!\n\n" +
                            "Download from: https://www.gyan.dev/ffmpeg/builds/")
@@ -7,6 +7,8 @@ Finds ALL audio devices using multiple methods
 import subprocess
 import sys
 
+from device_discovery import list_audio_devices
+
 print("="*70)
 print("  AUDIO DEVICE DETECTION")
 print("="*70)
@@ -73,22 +75,11 @@ except Exception as e:
 print("\n4. Testing Alternative FFmpeg Method:")
 print("-"*70)
 try:
-    # Try listing sources
-    result = subprocess.run(
-        ['ffmpeg', '-list_devices', 'true', '-f', 'dshow', '-i', 'dummy'],
-        capture_output=True, text=True, timeout=10
-    )
-    
-    lines = result.stderr.split('\n')
-    
     print("\nExtracting device names:")
-    for line in lines:
-        if '"' in line and ('audio' in line.lower() or 'microphone' in line.lower()):
-            # Extract device name between quotes
-            parts = line.split('"')
-            if len(parts) >= 2:
-                device_name = parts[1]
-                print(f"  Found: {device_name}")
+    for device in list_audio_devices(use_cache=False):
+        print(f"  Found: {device.name}")
+        if device.alt_name:
+            print(f"         (alternative name: {device.alt_name})")
                 
 except Exception as e:
     print(f"ERROR: {e}")
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Audio Level Meter
+Streams downsampled PCM from an audio input and reports RMS/peak levels and silence
+"""
+
+import array
+import math
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from ffmpeg_progress import FFmpegProcess
+
+try:
+    import numpy as np  # vectorized levels; the pure-Python path is used without it
+except ImportError:
+    np = None
+
+SAMPLE_RATE = 8000       # plenty for levels, and 6x less to read than 48 kHz
+BLOCK_SECONDS = 0.05     # one level per block: 20 updates a second
+FLOOR_DB = -60.0         # bottom of the meter
+SILENCE_DB = -50.0       # peak below this counts as silence
+SILENCE_SECONDS = 3.0    # how long before a silence is reported
+PEAK_HOLD = 1.5          # seconds the peak marker stays up
+
+
+def meter_command(input_args, sample_rate=SAMPLE_RATE):
+    """FFmpeg command writing mono s16le PCM of an input to stdout"""
+    return (['ffmpeg', '-hide_banner', '-loglevel', 'error'] + list(input_args) +
+            ['-vn', '-ac', '1', '-ar', str(sample_rate), '-f', 's16le', 'pipe:1'])
+
+
+def block_levels(data, use_numpy=True):
+    """(rms, peak) of a block of s16le samples, as fractions of full scale"""
+    # A short read at EOF or on stop may end mid-sample
+    data = data[:len(data) - len(data) % 2]
+    if np is not None and use_numpy:
+        samples = np.frombuffer(data, dtype='<i2').astype(np.float32)
+        if not samples.size:
+            return 0.0, 0.0
+        return (float(np.sqrt(np.mean(samples * samples))) / 32768,
+                float(np.max(np.abs(samples))) / 32768)
+
+    samples = array.array('h', data)
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    if not samples:
+        return 0.0, 0.0
+    return (math.sqrt(sum(s * s for s in samples) / len(samples)) / 32768,
+            max(max(samples), -min(samples)) / 32768)
+
+
+def to_db(level):
+    """dBFS, clamped to the meter floor"""
+    return max(20 * math.log10(level), FLOOR_DB) if level > 0 else FLOOR_DB
+
+
+def meter_fraction(db):
+    """0..1 position of a dBFS value on the meter"""
+    return min(max((db - FLOOR_DB) / -FLOOR_DB, 0.0), 1.0)
+
+
+class AudioMeter:
+    """Live levels of one audio input, fed by its own small FFmpeg process.
+
+    The levels are read from any thread (GUIs poll them from a timer);
+    on_level(meter) runs on the reader thread after every block and
+    on_silence(meter) once each time the input has been silent for
+    silence_seconds. Silence times are in seconds of audio read.
+    """
+
+    def __init__(self, input_args, sample_rate=SAMPLE_RATE, block_seconds=BLOCK_SECONDS,
+                 silence_db=SILENCE_DB, silence_seconds=SILENCE_SECONDS,
+                 on_level=None, on_silence=None, use_numpy=True):
+        self.input_args = list(input_args)
+        self.use_numpy = use_numpy
+        self.sample_rate = sample_rate
+        self.block_bytes = int(sample_rate * block_seconds) * 2
+        self.silence_db = silence_db
+        self.silence_seconds = silence_seconds
+        self.on_level = on_level
+        self.on_silence = on_silence
+        self.process = None
+        self.rms_db = FLOOR_DB
+        self.peak_db = FLOOR_DB
+        self.peak_hold_db = FLOOR_DB
+        self.seconds = 0.0          # audio read so far
+        self.blocks = 0
+        self.analysis_time = 0.0    # CPU seconds spent computing levels
+        self.silent_since = None
+        self.silences = []          # (start, end) of finished silences >= silence_seconds
+        self._hold_at = 0.0
+        self._reported = False
+        self._lock = threading.Lock()
+        self._reader = None
+
+    def start(self):
+        self.process = FFmpegProcess(meter_command(self.input_args, self.sample_rate),
+                                     progress_pipe=2,
+                                     popen_kwargs={'stdout': subprocess.PIPE}).start()
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+        return self
+
+    @property
+    def running(self):
+        return self._reader is not None and self._reader.is_alive()
+
+    def _read(self):
+        stream = self.process.process.stdout
+        while True:
+            data = stream.read(self.block_bytes)
+            if not data:
+                break
+            self.feed(data)
+        with self._lock:
+            self._end_silence()
+
+    def feed(self, data):
+        """Analyse one block of PCM (also usable without FFmpeg)"""
+        started = time.perf_counter()
+        rms, peak = block_levels(data, self.use_numpy)
+        self.analysis_time += time.perf_counter() - started
+
+        report = False
+        with self._lock:
+            self.rms_db, self.peak_db = to_db(rms), to_db(peak)
+            if self.peak_db >= self.peak_hold_db or self.seconds - self._hold_at > PEAK_HOLD:
+                self.peak_hold_db, self._hold_at = self.peak_db, self.seconds
+            if self.peak_db < self.silence_db:
+                if self.silent_since is None:
+                    self.silent_since = self.seconds
+            else:
+                self._end_silence()
+            self.seconds += len(data) / 2 / self.sample_rate
+            self.blocks += 1
+            if self.silent_for() >= self.silence_seconds and not self._reported:
+                self._reported = report = True
+
+        if self.on_level:
+            self.on_level(self)
+        if report and self.on_silence:
+            self.on_silence(self)
+
+    def _end_silence(self):
+        if self.silent_since is not None and self.silent_for() >= self.silence_seconds:
+            self.silences.append((round(self.silent_since, 2), round(self.seconds, 2)))
+        self.silent_since = None
+        self._reported = False
+
+    def silent_for(self):
+        """Seconds of silence up to now (0 while there is signal)"""
+        return self.seconds - self.silent_since if self.silent_since is not None else 0.0
+
+    def is_silent(self, seconds=None):
+        return self.silent_for() >= (self.silence_seconds if seconds is None else seconds)
+
+    def level(self):
+        with self._lock:
+            return {
+                'rms_db': round(self.rms_db, 1),
+                'peak_db': round(self.peak_db, 1),
+                'peak_hold_db': round(self.peak_hold_db, 1),
+                'silent_for': round(self.silent_for(), 2),
+                'seconds': round(self.seconds, 2),
+            }
+
+    def wait(self, timeout=None):
+        if self._reader:
+            self._reader.join(timeout)
+
+    def stop(self):
+        if self.process:
+            self.process.stop()
+        self.wait(2)
+
+
+def check_levels(input_args, seconds=2.0, timeout=10):
+    """Meter an input briefly; returns its peak/mean RMS and whether it was silent"""
+    levels = []
+    meter = AudioMeter(input_args,
+                       on_level=lambda m: levels.append((m.rms_db, m.peak_db))).start()
+    deadline = time.time() + timeout
+    while meter.running and meter.seconds < seconds and time.time() < deadline:
+        time.sleep(0.05)
+    meter.stop()
+    if not meter.blocks:
+        raise RuntimeError(f"No audio from the input:\n{meter.process.log_tail(5)}")
+    peak = max(p for _, p in levels)
+    return {
+        'peak_db': round(peak, 1),
+        'rms_db': round(statistics.mean(r for r, _ in levels), 1),
+        'silent': peak < meter.silence_db,
+    }
+
+
+def draw_level(canvas, meter):
+    """Draw a meter's current level as a bar on a Tk canvas"""
+    canvas.delete('all')
+    width, height = int(canvas['width']), int(canvas['height'])
+    if meter is None:
+        return
+    level = meter.level()
+    rms = meter_fraction(level['rms_db'])
+    colour = '#dc2626' if level['rms_db'] > -3 else '#f59e0b' if level['rms_db'] > -12 else '#10b981'
+    canvas.create_rectangle(0, 0, width * rms, height, fill=colour, width=0)
+    hold = width * meter_fraction(level['peak_hold_db'])
+    canvas.create_line(hold, 0, hold, height, fill='#1f2937', width=2)
+    if meter.is_silent():
+        canvas.create_text(4, height // 2, text=f"silent {level['silent_for']:.0f}s",
+                           anchor='w', fill='#dc2626', font=('Arial', 7))
+
+
+def benchmark(seconds=5, use_numpy=True):
+    """Meter lavfi sine and silence in real time and measure the cost"""
+    sources = {
+        'sine': 'sine=frequency=1000:sample_rate=48000',  # amplitude 1/8: about -21 dB RMS
+        'anullsrc': 'anullsrc=r=48000:cl=stereo',
+    }
+    results = {}
+    for name, source in sources.items():
+        meter = AudioMeter(['-re', '-t', str(seconds), '-f', 'lavfi', '-i', source],
+                           silence_seconds=1.0, use_numpy=use_numpy)
+        before = time.process_time(), _children_cpu()
+        started = time.time()
+        meter.start().wait(seconds + 10)
+        wall = time.time() - started
+        results[name] = {
+            'blocks_per_second': round(meter.blocks / wall, 1),
+            'rms_db': meter.level()['rms_db'],
+            'peak_db': meter.level()['peak_db'],
+            'silences': meter.silences,
+            'ffmpeg_cpu_percent': round((_children_cpu() - before[1]) / wall * 100, 2),
+            'python_cpu_percent': round((time.process_time() - before[0]) / wall * 100, 2),
+            'analysis_us_per_block': round(meter.analysis_time / max(meter.blocks, 1) * 1e6, 1),
+        }
+    return results
+
+
+def _children_cpu():
+    t = os.times()
+    return t.children_user + t.children_system
+
+
+def main():
+    import argparse
+    from device_discovery import get_backend
+
+    parser = argparse.ArgumentParser(description="Live audio levels, or a metering benchmark "
+                                                 "on lavfi sine/anullsrc")
+    parser.add_argument('--device', help="meter this audio device until Ctrl+C")
+    parser.add_argument('--backend', help="audio backend for --device (default for this OS)")
+    parser.add_argument('--seconds', type=int, default=5, help="benchmark length per source")
+    args = parser.parse_args()
+
+    if args.device:
+        meter = AudioMeter(get_backend(args.backend).input_args(args.device)).start()
+        try:
+            while meter.running:
+                level = meter.level()
+                bar = '█' * int(meter_fraction(level['rms_db']) * 40)
+                note = f"  silent {level['silent_for']:.0f}s" if meter.is_silent() else ""
+                print(f"\r  {level['rms_db']:6.1f} dB |{bar:<40}| peak {level['peak_hold_db']:6.1f}{note}   ",
+                      end='', flush=True)
+                time.sleep(BLOCK_SECONDS)
+        except KeyboardInterrupt:
+            pass
+        meter.stop()
+        print()
+        return
+
+    modes = [True, False] if np is not None else [False]
+    for use_numpy in modes:
+        print(f"Levels with {'NumPy' if use_numpy else 'pure Python'}, "
+              f"{args.seconds}s per source in real time:")
+        for name, r in benchmark(args.seconds, use_numpy).items():
+            print(f"  {name:<9} {r['blocks_per_second']:5.1f} updates/s  "
+                  f"rms {r['rms_db']:6.1f} dB  peak {r['peak_db']:6.1f} dB  "
+                  f"silences {r['silences']}")
+            print(f"            ffmpeg {r['ffmpeg_cpu_percent']:.2f}% cpu, python "
+                  f"{r['python_cpu_percent']:.2f}% cpu, {r['analysis_us_per_block']:.0f} µs per block")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,8 @@ Helps enable Stereo Mix and other audio devices
 import subprocess
 import sys
 
+from device_discovery import list_audio_devices
+
 print("""
 ╔═══════════════════════════════════════════════════════════════╗
 ║                                                               ║
@@ -59,24 +61,15 @@ input("\nAfter you've enabled the devices, press ENTER to test...")
 
 # Test audio devices again
 print("\nTesting audio device detection...")
-result = subprocess.run(
-    ['ffmpeg', '-list_devices', 'true', '-f', 'dshow', '-i', 'dummy'],
-    capture_output=True, text=True
-)
+# Devices were just enabled, so skip the cache
+audio_devices = [d.name for d in list_audio_devices(use_cache=False)]
 
 print("\n" + "="*70)
 print("  DETECTED AUDIO DEVICES")
 print("="*70)
 
-audio_devices = []
-for line in result.stderr.split('\n'):
-    if '(audio)' in line and '"' in line:
-        start = line.find('"') + 1
-        end = line.find('"', start)
-        if start > 0 and end > start:
-            device = line[start:end]
-            audio_devices.append(device)
-            print(f"  ✓ {device}")
+for device in audio_devices:
+    print(f"  ✓ {device}")
 
 if audio_devices:
     print(f"\n✓ SUCCESS! Found {len(audio_devices)} audio device(s)")
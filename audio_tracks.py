@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Multi-Track Audio
+Each audio source on its own drift-corrected track, mixed down only when exporting
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ASYNC_SAMPLES = 1000     # most samples a second aresample may stretch/squeeze by
+SAMPLE_RATE = 48000
+MIX_BITRATE = '192k'
+
+
+def drift_filter():
+    """Resample to follow the input's timestamps instead of its sample count.
+
+    Capture devices stamp packets with the wall clock, but each has its own
+    sample clock: a 'slow' device delivers fewer samples per second than
+    it claims. async stretches or squeezes the audio to the timestamps, so
+    every track stays on the video's (wall) clock however long it runs.
+    """
+    return f'aresample=async={ASYNC_SAMPLES}:first_pts=0'
+
+
+def track_filters(count, copies=1, first_input=1):
+    """Chains giving each audio input its own drift-corrected track.
+
+    Inputs first_input..first_input+count-1 are corrected once and split
+    into `copies` (one per output using them). Returns (chains, labels):
+    labels[copy] is the list of track labels for that copy, in input order.
+    """
+    chains = []
+    labels = [[] for _ in range(copies)]
+    for n in range(count):
+        outs = [f'[t{n}_{c}]' for c in range(copies)]
+        split = f',asplit={copies}' if copies > 1 else ''
+        chains.append(f'[{first_input + n}:a]{drift_filter()}{split}' + ''.join(outs))
+        for c, label in enumerate(outs):
+            labels[c].append(label)
+    return chains, labels
+
+
+def track_metadata(titles):
+    """Output arguments naming each audio track; the first one plays by default"""
+    args = []
+    for n, title in enumerate(titles):
+        args.extend([f'-metadata:s:a:{n}', f'title={title}',
+                     f'-disposition:a:{n}', 'default' if n == 0 else '0'])
+    return args
+
+
+def stream_durations(path):
+    """[(codec_type, duration seconds or None)] of every stream in path"""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'stream=codec_type,duration',
+         '-of', 'json', path], capture_output=True, text=True, timeout=60)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed on {path}: {result.stderr.strip()[-300:]}")
+    streams = json.loads(result.stdout or '{}').get('streams', [])
+    return [(s.get('codec_type'), float(s['duration']) if s.get('duration') not in (None, 'N/A')
+             else None) for s in streams]
+
+
+def audio_seconds(path, rate=SAMPLE_RATE):
+    """Decoded length of each audio track: samples / rate.
+
+    This is what a player plays. A track's container duration follows its
+    timestamps and would hide a device clock's drift.
+    """
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-select_streams', 'a', '-show_entries',
+         'frame=stream_index,nb_samples', '-of', 'csv=p=0', path],
+        capture_output=True, text=True, timeout=600)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed on {path}: {result.stderr.strip()[-300:]}")
+    samples = {}
+    for line in result.stdout.split():
+        index, count = line.split(',')[:2]
+        samples[int(index)] = samples.get(int(index), 0) + int(count)
+    return [samples[i] / rate for i in sorted(samples)]
+
+
+def mixdown_command(path, output, tracks, weights=None, keep_tracks=False):
+    """Command mixing `tracks` audio tracks of path into one, video copied.
+
+    weights are per-track levels (e.g. [1, 0.6] to turn the second track
+    down). keep_tracks puts the separate tracks after the mix.
+    """
+    weight = f":weights='{' '.join(str(w) for w in weights)}'" if weights else ''
+    graph = (''.join(f'[0:a:{n}]' for n in range(tracks)) +
+             f'amix=inputs={tracks}:duration=longest{weight}[mix]')
+    cmd = ['ffmpeg', '-y', '-i', path, '-filter_complex', graph,
+           '-map', '0:v?', '-map', '[mix]']
+    if keep_tracks:
+        cmd.extend(['-map', '0:a'])
+    cmd.extend(['-c:v', 'copy', '-c:a', 'aac', '-b:a', MIX_BITRATE,
+                '-metadata:s:a:0', 'title=Mix', '-disposition:a:0', 'default'])
+    if keep_tracks:
+        # The original tracks are copied, not re-encoded
+        for n in range(tracks):
+            cmd.extend([f'-c:a:{n + 1}', 'copy', f'-disposition:a:{n + 1}', '0'])
+    cmd.extend(['-movflags', '+faststart', output])
+    return cmd
+
+
+def mixdown(path, output=None, weights=None, keep_tracks=False):
+    """Export a multi-track recording with its tracks mixed into one.
+
+    Only the audio is encoded; the video is stream-copied, so this takes
+    seconds even for long recordings. Returns the output path.
+    """
+    tracks = sum(1 for kind, _ in stream_durations(path) if kind == 'audio')
+    if tracks < 2:
+        raise ValueError(f"{path} has {tracks} audio track(s), nothing to mix")
+    if weights and len(weights) != tracks:
+        raise ValueError(f"{len(weights)} weights for {tracks} tracks")
+    if output is None:
+        root, ext = os.path.splitext(path)
+        output = f"{root}_mix{ext}"
+    result = subprocess.run(mixdown_command(path, output, tracks, weights, keep_tracks),
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-1000:])
+    return output
+
+
+def skew_source(lavfi, ppm, rate=SAMPLE_RATE):
+    """A lavfi audio source (with sample_rate=rate) behaving like a device
+    whose clock is off by ppm.
+
+    It delivers rate * (1 + ppm/1e6) samples per second while claiming
+    `rate`, and its timestamps follow the wall clock: exactly what a
+    capture device with a fast (ppm > 0) or slow crystal produces.
+    """
+    true_rate = round(rate * (1 + ppm / 1e6))
+    return (lavfi.replace(f'sample_rate={rate}', f'sample_rate={true_rate}') +
+            f',asetrate={rate},asetpts=N/{true_rate}/TB')
+
+
+def skewed_sine(ppm, frequency=440, rate=SAMPLE_RATE):
+    """Input arguments of a sine from a device whose clock is off by ppm"""
+    return ['-f', 'lavfi', '-i',
+            skew_source(f'sine=frequency={frequency}:sample_rate={rate}', ppm, rate)]
+
+
+def drift_test(seconds=600, ppm=(0, 150, -150), fps=30, correct=True, output_dir=None):
+    """Record seconds of video and skewed audio tracks; return drift per track.
+
+    Uses the same per-track chains as a recording (track_filters), with
+    correct=False mapping the raw tracks instead. Runs as fast as the
+    machine allows. Drift is each audio track's played length (decoded
+    samples) minus the video's.
+    """
+    tmp = None
+    if output_dir is None:
+        tmp = tempfile.TemporaryDirectory()
+        output_dir = tmp.name
+    try:
+        output = os.path.join(output_dir, f"drift_{'corrected' if correct else 'raw'}.mp4")
+        cmd = ['ffmpeg', '-y', '-f', 'lavfi', '-i', f'testsrc2=size=320x240:rate={fps}']
+        for n, skew in enumerate(ppm):
+            cmd.extend(skewed_sine(skew, frequency=440 + 110 * n))
+        if correct:
+            chains, labels = track_filters(len(ppm))
+            cmd.extend(['-filter_complex', ';'.join(chains), '-map', '0:v'])
+            for label in labels[0]:
+                cmd.extend(['-map', label])
+        else:
+            cmd.extend(['-map', '0:v'] + [arg for n in range(len(ppm))
+                                          for arg in ('-map', f'{n + 1}:a')])
+        cmd.extend(['-t', str(seconds), '-c:v', 'libx264', '-preset', 'ultrafast',
+                    '-c:a', 'aac', '-b:a', '96k',
+                    *track_metadata([f'{skew:+d} ppm' for skew in ppm]), output])
+
+        started = time.time()
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr[-1000:])
+        video = next(d for kind, d in stream_durations(output) if kind == 'video')
+        audio = audio_seconds(output)
+    finally:
+        if tmp:
+            tmp.cleanup()
+
+    tracks = [{'ppm': skew, 'duration': round(d, 4), 'drift': round(d - video, 4)}
+              for skew, d in zip(ppm, audio)]
+    return {
+        'corrected': correct,
+        'seconds': seconds,
+        'video_duration': round(video, 4),
+        'frame': round(1 / fps, 4),
+        'tracks': tracks,
+        'max_drift': max(abs(t['drift']) for t in tracks),
+        'wall_seconds': round(time.time() - started, 1),
+    }
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mix down multi-track recordings, or test "
+                                                 "audio drift correction")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    mix = sub.add_parser('mix', help="export with the audio tracks mixed into one")
+    mix.add_argument('recording')
+    mix.add_argument('-o', '--output')
+    mix.add_argument('--weights', help="per-track levels, e.g. 1,0.6")
+    mix.add_argument('--keep-tracks', action='store_true',
+                     help="keep the separate tracks after the mix")
+
+    test = sub.add_parser('drift-test', help="long run with skewed sine sources")
+    test.add_argument('--seconds', type=int, default=600)
+    test.add_argument('--ppm', default='0,150,-150',
+                      help="clock error of each audio source, in parts per million")
+    test.add_argument('--fps', type=int, default=30)
+    args = parser.parse_args()
+
+    if args.command == 'mix':
+        weights = [float(w) for w in args.weights.split(',')] if args.weights else None
+        try:
+            output = mixdown(args.recording, args.output, weights, args.keep_tracks)
+        except (ValueError, RuntimeError) as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+        print(f"✓ Mixed down to {output}")
+        return
+
+    ppm = [int(p) for p in args.ppm.split(',')]
+    print(f"Recording {args.seconds}s with audio clocks off by {args.ppm} ppm...\n")
+    failed = False
+    for correct in (False, True):
+        r = drift_test(args.seconds, ppm, args.fps, correct)
+        label = 'corrected' if correct else 'raw'
+        drifts = '  '.join(f"{t['ppm']:+d}ppm {t['drift'] * 1000:+7.1f} ms" for t in r['tracks'])
+        print(f"  {label:<10} {drifts}   ({r['wall_seconds']}s)")
+        if correct:
+            failed = r['max_drift'] > r['frame']
+    frame_ms = 1000 / args.fps
+    if failed:
+        print(f"\n✗ Corrected drift exceeds one frame ({frame_ms:.1f} ms)")
+        sys.exit(1)
+    print(f"\n✓ Corrected tracks stay within one frame ({frame_ms:.1f} ms) of the video")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+A/V Sync Harness
+Records a flash/beep test pattern through the real recording pipeline and measures audio/video offset, drift and jitter
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from array import array
+
+from audio_tracks import SAMPLE_RATE, skew_source, stream_durations
+from command_builder import SYNC_PERIOD
+from recording_session import FINISHED, RecordingConfig, RecordingSession
+
+# Pass/fail limits. Viewers notice audio about 45 ms early (ITU-R BT.1359)
+MAX_OFFSET_MS = 45.0     # worst |offset| anywhere in the recording
+MAX_DRIFT_MS = 20.0      # change of the offset from start to end (fitted)
+MAX_JITTER_MS = 10.0     # spread of the offsets around the fitted line
+MAX_MISSED = 0.05        # share of flashes without a matching beep
+
+FLASH_LEVEL = 128        # mean luma above this is a flash
+BEEP_LEVEL = 0.1         # peak amplitude (full scale = 1) above this is a beep
+WINDOW = 48              # audio samples per analysis window (1 ms)
+TIMED_GRACE = 30         # seconds a timed recording may take to finish after its duration
+
+# Pipeline variants of a regression run: (name, record() options)
+REGRESSION = [
+    ('plain', {}),
+    ('pauses', {'pauses': 3}),
+    ('timed-previews', {'timed': True, 'previews': True}),
+]
+
+
+class SkewedConfig(RecordingConfig):
+    """A config whose synthetic audio devices have clocks off by ppm.
+
+    ppm[n] applies to audio device n: it delivers 48000 * (1 + ppm/1e6)
+    samples per second but claims 48000, with wall-clock timestamps, the
+    way a real device with a fast or slow crystal does.
+    """
+
+    def __init__(self, ppm=(), **kwargs):
+        super().__init__(**kwargs)
+        self.ppm = list(ppm)
+
+    def command(self, base_name, redact=None):
+        cmd, output, job = super().command(base_name, redact)
+        audio = 0
+        for i, arg in enumerate(cmd):
+            if arg == '-i' and cmd[i + 1].startswith('aevalsrc='):
+                skew = self.ppm[audio] if audio < len(self.ppm) else 0
+                if skew:
+                    cmd[i + 1] = skew_source(cmd[i + 1], skew)
+                audio += 1
+        return cmd, output, job
+
+
+def start_times(path):
+    """{'video': seconds, 'audio': [seconds per track]} where each stream starts"""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'stream=codec_type,start_time',
+         '-of', 'json', path], capture_output=True, text=True, timeout=60)
+    video, audio = [], []
+    for stream in json.loads(result.stdout or '{}').get('streams', []):
+        try:
+            start = float(stream.get('start_time', 0))
+        except ValueError:
+            start = 0.0
+        if stream.get('codec_type') == 'video':
+            video.append(start)
+        elif stream.get('codec_type') == 'audio':
+            audio.append(start)
+    return {'video': video[0] if video else 0.0, 'audio': audio}
+
+
+def flash_times(path, level=FLASH_LEVEL):
+    """Timestamps of the frames where a flash starts (dark → bright)"""
+    cmd = ['ffmpeg', '-hide_banner', '-nostats', '-loglevel', 'info', '-i', path,
+           '-map', '0:v:0', '-vf', 'scale=64:36,signalstats,'
+           'metadata=mode=print:key=lavfi.signalstats.YAVG', '-f', 'null', '-']
+    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                               text=True, errors='replace')
+    onsets, pts, bright = [], None, False
+    for line in process.stderr:
+        if 'pts_time:' in line:
+            pts = float(line.split('pts_time:')[1].split()[0])
+        elif 'lavfi.signalstats.YAVG=' in line and pts is not None:
+            now = float(line.split('=')[-1]) > level
+            if now and not bright:
+                onsets.append(pts)
+            bright = now
+    if process.wait() != 0:
+        raise RuntimeError(f"Could not decode the video of {path}")
+    return onsets
+
+
+def beep_times(path, track=0, level=BEEP_LEVEL, hold=SYNC_PERIOD / 2):
+    """Times (seconds into the decoded track) where a beep starts.
+
+    The track is decoded to mono PCM and streamed through in 1 ms
+    windows; a beep starts at the first loud sample after at least `hold`
+    seconds of quiet. Decoded samples are what a player plays, so device
+    clock drift shows up here even when timestamps hide it.
+    """
+    cmd = ['ffmpeg', '-v', 'error', '-i', path, '-map', f'0:a:{track}', '-ac', '1',
+           '-ar', str(SAMPLE_RATE), '-f', 's16le', 'pipe:1']
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    threshold = int(level * 32767)
+    onsets, position, quiet_since = [], 0, -hold * SAMPLE_RATE
+    while True:
+        chunk = process.stdout.read(WINDOW * 2 * 100)
+        if not chunk:
+            break
+        samples = array('h')
+        samples.frombytes(chunk[:len(chunk) // 2 * 2])
+        if sys.byteorder == 'big':
+            samples.byteswap()
+        for start in range(0, len(samples), WINDOW):
+            window = samples[start:start + WINDOW]
+            if max(window) > threshold or -min(window) > threshold:
+                if position + start - quiet_since >= hold * SAMPLE_RATE:
+                    first = next(i for i, s in enumerate(window) if abs(s) > threshold)
+                    onsets.append((position + start + first) / SAMPLE_RATE)
+                quiet_since = position + start + WINDOW
+        position += len(samples)
+    if process.wait() != 0:
+        raise RuntimeError(f"Could not decode audio track {track} of {path}")
+    return onsets
+
+
+def _fit(points):
+    """Least-squares line through [(x, y)]: (slope, intercept)"""
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var = sum((x - mean_x) ** 2 for x, _ in points)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / var if var else 0.0
+    return slope, mean_y - slope * mean_x
+
+
+def analyze(flashes, beeps, period=SYNC_PERIOD):
+    """Offsets of each beep against its flash, plus drift and jitter.
+
+    offset > 0 means the audio is late. Each flash is paired with the
+    nearest beep within half a period. Drift is the fitted change of the
+    offset over the recording, jitter the standard deviation around that
+    line.
+    """
+    offsets = []
+    j = 0
+    for flash in flashes:
+        while j < len(beeps) and beeps[j] < flash - period / 2:
+            j += 1
+        if j < len(beeps) and beeps[j] <= flash + period / 2:
+            offsets.append((round(flash, 3), round((beeps[j] - flash) * 1000, 2)))
+            j += 1
+    report = {
+        'flashes': len(flashes),
+        'beeps': len(beeps),
+        'pairs': len(offsets),
+        'missed': round(1 - len(offsets) / len(flashes), 3) if flashes else 1.0,
+        'offsets': offsets,
+    }
+    if len(offsets) < 2:
+        return report
+    values = [ms for _, ms in offsets]
+    slope, intercept = _fit(offsets)
+    span = offsets[-1][0] - offsets[0][0]
+    residuals = [ms - (slope * t + intercept) for t, ms in offsets]
+    report.update({
+        'first_ms': values[0],
+        'last_ms': values[-1],
+        'mean_ms': round(statistics.fmean(values), 2),
+        'max_offset_ms': max(values, key=abs),
+        'drift_ms': round(slope * span, 2),
+        'drift_ms_per_hour': round(slope * 3600, 1),
+        'jitter_ms': round(statistics.pstdev(residuals), 2),
+    })
+    return report
+
+
+def evaluate(report, max_offset=MAX_OFFSET_MS, max_drift=MAX_DRIFT_MS,
+             max_jitter=MAX_JITTER_MS, max_missed=MAX_MISSED):
+    """Threshold failures of one track's report (empty if it passes)"""
+    if report['pairs'] < 2:
+        return [f"only {report['pairs']} flash/beep pair(s) found"]
+    failures = []
+    if abs(report['max_offset_ms']) > max_offset:
+        failures.append(f"offset {report['max_offset_ms']:+.1f} ms exceeds ±{max_offset:g} ms")
+    if abs(report['drift_ms']) > max_drift:
+        failures.append(f"drift {report['drift_ms']:+.1f} ms exceeds ±{max_drift:g} ms")
+    if report['jitter_ms'] > max_jitter:
+        failures.append(f"jitter {report['jitter_ms']:.1f} ms exceeds {max_jitter:g} ms")
+    if report['missed'] > max_missed:
+        failures.append(f"{report['missed'] * 100:.0f}% of flashes had no beep")
+    return failures
+
+
+def measure(path):
+    """Per-track sync reports of a flash/beep recording"""
+    starts = start_times(path)
+    flashes = [t - starts['video'] for t in flash_times(path)]
+    tracks = sum(1 for kind, _ in stream_durations(path) if kind == 'audio')
+    reports = []
+    for track in range(tracks):
+        start = starts['audio'][track] if track < len(starts['audio']) else 0.0
+        beeps = [t + start - starts['video'] for t in beep_times(path, track)]
+        reports.append(dict(analyze(flashes, beeps), track=track))
+    return reports
+
+
+def record(seconds=60, fps=30, size='640x360', devices=1, ppm=(), pauses=0,
+           output_dir='.', timed=False, **settings):
+    """Record the test pattern through RecordingSession; returns its result.
+
+    settings are any other RecordingConfig options (audio_tracks, vfr,
+    renditions, quality...), so each pipeline variant can be measured.
+    pauses splits the time into that many pause/resume cycles, exercising
+    the parts join. timed records with config.duration instead of calling
+    stop(), as --duration and the control server do; the recording must
+    then end by itself.
+    """
+    if timed and pauses:
+        raise ValueError("A timed recording can't be paused by the harness")
+    config = SkewedConfig(
+        ppm=ppm, synthetic='flash', synthetic_size=size, fps=fps,
+        audio_devices=[f'beep{n + 1}' for n in range(devices)], output_dir=output_dir,
+        base_name=time.strftime('av_sync_%Y%m%d_%H%M%S'),
+        duration=seconds if timed else None, **settings)
+    session = RecordingSession(config, catalog=None).start()
+    if timed:
+        if not session.wait(timeout=seconds + TIMED_GRACE):
+            session.stop()
+            raise RuntimeError(f"Timed recording of {seconds}s was still running "
+                               f"{TIMED_GRACE}s after its end")
+        return session.result()
+    part = seconds / (pauses + 1)
+    for _ in range(pauses):
+        time.sleep(part)
+        session.pause()
+        time.sleep(1)
+        session.resume()
+    time.sleep(part)
+    return session.stop()
+
+
+def run(seconds=60, fps=30, keep=None, limits=None, **options):
+    """Record, measure and judge; returns a dict usable as a regression result"""
+    tmp = None
+    if keep is None:
+        tmp = tempfile.TemporaryDirectory()
+    try:
+        result = record(seconds, fps, output_dir=keep or tmp.name, **options)
+        if result['state'] != FINISHED:
+            return {'passed': False, 'error': result['error'], 'tracks': []}
+        if options.get('previews') and not result['previews']:
+            return {'passed': False, 'error': "No previews were written", 'tracks': []}
+        # Decoding fails on an unfinished file (e.g. a killed recording)
+        reports = measure(result['output'])
+    except RuntimeError as e:
+        return {'passed': False, 'error': str(e), 'tracks': []}
+    finally:
+        if tmp:
+            tmp.cleanup()
+    for report in reports:
+        report['failures'] = evaluate(report, **(limits or {}))
+    return {
+        'passed': bool(reports) and not any(r['failures'] for r in reports),
+        'output': result['output'] if keep else None,
+        'seconds': seconds,
+        'fps': fps,
+        'options': {k: v for k, v in options.items() if v},
+        'tracks': reports,
+    }
+
+
+def regression(seconds=16, fps=30, cases=REGRESSION, log=print):
+    """run() every pipeline variant in cases; returns [(name, report)]"""
+    results = []
+    for name, options in cases:
+        report = run(seconds, fps, **options)
+        log(f"  {'✓' if report['passed'] else '✗'} {name:<16} " +
+            (report.get('error') or '  '.join(
+                f"track {r['track'] + 1}: worst {r.get('max_offset_ms', 0):+.1f} ms, "
+                f"drift {r.get('drift_ms', 0):+.1f} ms" for r in report['tracks'])))
+        results.append((name, report))
+    return results
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure A/V sync of the recording pipeline "
+                                                 "with a flash/beep test pattern")
+    parser.add_argument('--seconds', type=int, default=60)
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--size', default='640x360')
+    parser.add_argument('--devices', type=int, default=1, help="audio devices (1 or 2)")
+    parser.add_argument('--audio-tracks', action='store_true',
+                        help="separate drift-corrected tracks instead of a mix")
+    parser.add_argument('--ppm', default='',
+                        help="clock error per audio device, e.g. 0,200 (simulated)")
+    parser.add_argument('--vfr', action='store_true')
+    parser.add_argument('--quality', default='low')
+    parser.add_argument('--rendition', action='append', default=[])
+    parser.add_argument('--pauses', type=int, default=0, help="pause/resume cycles")
+    parser.add_argument('--max-offset', type=float, default=MAX_OFFSET_MS, help="ms")
+    parser.add_argument('--max-drift', type=float, default=MAX_DRIFT_MS, help="ms")
+    parser.add_argument('--max-jitter', type=float, default=MAX_JITTER_MS, help="ms")
+    parser.add_argument('--keep', metavar='DIR', help="keep the recording in this folder")
+    parser.add_argument('--json', help="also write the report to this file")
+    parser.add_argument('--regression', action='store_true',
+                        help="run every pipeline variant (plain, timed with previews, ...) "
+                             "for --seconds each")
+    args = parser.parse_args()
+
+    if args.regression:
+        print(f"Regression run, {args.seconds}s per case...")
+        results = regression(args.seconds, args.fps)
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(dict(results), f, indent=2)
+        passed = all(report['passed'] for _, report in results)
+        print(f"\n{'✓ PASS' if passed else '✗ FAIL'}")
+        sys.exit(0 if passed else 1)
+
+    ppm = [int(p) for p in args.ppm.split(',')] if args.ppm else []
+    print(f"Recording {args.seconds}s of flash/beep at {args.fps} fps "
+          f"({args.devices} audio device(s){', separate tracks' if args.audio_tracks else ''}"
+          f"{f', clocks {args.ppm} ppm' if ppm else ''})...")
+    report = run(args.seconds, args.fps, keep=args.keep and os.path.abspath(args.keep),
+                 limits={'max_offset': args.max_offset, 'max_drift': args.max_drift,
+                         'max_jitter': args.max_jitter},
+                 size=args.size, devices=args.devices, ppm=ppm, pauses=args.pauses,
+                 audio_tracks=args.audio_tracks, vfr=args.vfr, quality=args.quality,
+                 renditions=args.rendition)
+
+    if report.get('error'):
+        print(f"✗ Recording failed: {report['error']}")
+        sys.exit(1)
+    for r in report['tracks']:
+        print(f"\n  Audio track {r['track'] + 1}: {r['pairs']}/{r['flashes']} flashes matched")
+        if r['pairs'] >= 2:
+            print(f"    offset  start {r['first_ms']:+.1f} ms, end {r['last_ms']:+.1f} ms, "
+                  f"worst {r['max_offset_ms']:+.1f} ms (positive = audio late)")
+            print(f"    drift   {r['drift_ms']:+.1f} ms ({r['drift_ms_per_hour']:+.0f} ms/hour)")
+            print(f"    jitter  {r['jitter_ms']:.1f} ms")
+        for failure in r['failures']:
+            print(f"    ✗ {failure}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    print(f"\n{'✓ PASS' if report['passed'] else '✗ FAIL'}")
+    sys.exit(0 if report['passed'] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Recording Benchmark Suite
+Runs the recorders' real FFmpeg commands on synthetic lavfi sources and compares against a baseline
+"""
+
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+
+from ffmpeg_progress import FFmpegProcess
+from segmented_output import output_size
+from command_builder import (QUALITY_PRESETS, VIDEO_SOURCES, advanced_recorder_command,
+                             manual_recorder_command, screen_recorder_command,
+                             synthetic_inputs)
+
+try:
+    import psutil  # only needed for peak memory on Windows / macOS
+except ImportError:
+    psutil = None
+
+BASELINE_PATH = os.path.join(os.path.expanduser('~'), '.screen_recorder', 'benchmark_baseline.json')
+TOLERANCE = 0.10  # relative change that counts as a regression
+
+BUILDERS = ['screen_recorder', 'advanced_recorder', 'manual_recorder']
+MAX_AUDIO = {'screen_recorder': 2, 'advanced_recorder': 1, 'manual_recorder': 1}
+
+# Lower is better for these; speed is the only higher-is-better metric
+METRICS = ['speed', 'cpu_seconds', 'peak_rss_kb', 'size_bytes', 'drop_frames']
+# Absolute differences below these are measurement noise, whatever the ratio
+NOISE_FLOOR = {'speed': 0.05, 'cpu_seconds': 0.5, 'peak_rss_kb': 4096, 'size_bytes': 16 * 1024}
+
+
+def build_case(case, output_dir):
+    """Real recorder command for one benchmark case, still with capture inputs"""
+    builder = case['builder']
+    width, height = (int(v) for v in case['size'].split('x'))
+    fake_audio = [['-f', 'dshow', '-i', f'audio=Benchmark {n + 1}'] for n in range(case['audio'])]
+    base = f"bench_{case_key(case).replace('/', '_')}"
+
+    if builder == 'screen_recorder':
+        cmd, output, _ = screen_recorder_command(
+            base, mode='fullscreen', fps=case['fps'], quality=case['quality'],
+            screen_size=(width, height), audio_inputs=fake_audio, output_dir=output_dir)
+    elif builder == 'advanced_recorder':
+        monitor = {'name': 'benchmark', 'x': 0, 'y': 0, 'width': width, 'height': height}
+        cmd, output, _ = advanced_recorder_command(
+            base, mode='monitor', fps=case['fps'], crf=QUALITY_PRESETS[case['quality']][1],
+            monitors=[monitor], audio_input=fake_audio[0] if fake_audio else None,
+            output_dir=output_dir)
+    elif builder == 'manual_recorder':
+        output = os.path.join(output_dir, f"{base}.mp4")
+        cmd = manual_recorder_command(output, '1', case['fps'], QUALITY_PRESETS[case['quality']][1],
+                                      fake_audio[0] if fake_audio else None)
+    else:
+        raise ValueError(f"Unknown builder: {builder}")
+    return cmd, output
+
+
+def case_key(case):
+    return (f"{case['builder']}/{case['source']}/{case['size']}@{case['fps']}/"
+            f"{case['quality']}/audio{case['audio']}")
+
+
+def cases(builders=BUILDERS, sources=('testsrc2', 'static'), sizes=('1920x1080',),
+          fps=('30',), qualities=('medium',), audio=(0, 1)):
+    """Cartesian sweep; audio counts a builder can't produce are skipped"""
+    for b, src, size, rate, q, a in itertools.product(builders, sources, sizes, fps,
+                                                       qualities, audio):
+        if a <= MAX_AUDIO[b]:
+            yield {'builder': b, 'source': src, 'size': size, 'fps': str(rate),
+                   'quality': q, 'audio': a}
+
+
+def _peak_rss_kb(pid):
+    """Peak resident memory of a running process, None if it can't be read"""
+    try:
+        with open(f'/proc/{pid}/status', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    if psutil:
+        try:
+            info = psutil.Process(pid).memory_info()
+            return getattr(info, 'peak_wset', info.rss) // 1024
+        except psutil.Error:
+            pass
+    return None
+
+
+def run_case(case, duration=5, realtime=False):
+    """Encode one case for `duration` seconds and measure it"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cmd, output = build_case(case, tmp)
+        cmd = synthetic_inputs(cmd, case['source'], case['size'], realtime)
+        # -t before the output path: limits the recording, not one input
+        cmd = cmd[:-1] + ['-t', str(duration), cmd[-1]]
+
+        peak = [None]
+        cpu_before = os.times()
+        started = time.time()
+        proc = FFmpegProcess(cmd).start()
+
+        def sample():
+            while proc.running:
+                rss = _peak_rss_kb(proc.process.pid)
+                if rss:
+                    peak[0] = max(peak[0] or 0, rss)
+                time.sleep(0.1)
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        proc.wait()
+        wall = time.time() - started
+        cpu_after = os.times()
+        sampler.join(timeout=1)
+
+        if proc.returncode != 0:
+            raise RuntimeError(f"FFmpeg failed for {case_key(case)}:\n{proc.log_tail(10)}")
+
+        # Child CPU times are not reported on Windows; keep None there
+        cpu = ((cpu_after.children_user - cpu_before.children_user) +
+               (cpu_after.children_system - cpu_before.children_system))
+        stats = proc.latest
+        return {
+            'key': case_key(case),
+            'case': case,
+            'preset': cmd[cmd.index('-preset') + 1] if '-preset' in cmd else None,
+            'speed': round((stats.out_time or duration) / wall, 3) if wall else 0.0,
+            'wall_seconds': round(wall, 2),
+            'cpu_seconds': round(cpu, 2) if cpu > 0 else None,
+            'peak_rss_kb': peak[0],
+            'size_bytes': output_size(output),
+            'frames': stats.frame,
+            'drop_frames': stats.drop_frames,
+        }
+
+
+def run_suite(case_list, duration=5, realtime=False, log=print):
+    results = []
+    for case in case_list:
+        try:
+            result = run_case(case, duration, realtime)
+        except RuntimeError as e:
+            log(f"  ✗ {case_key(case)}\n{e}")
+            results.append({'key': case_key(case), 'case': case, 'error': str(e)})
+            continue
+        rss = f"{result['peak_rss_kb'] / 1024:.0f}MB" if result['peak_rss_kb'] else "n/a"
+        cpu = f"{result['cpu_seconds']:.1f}s" if result['cpu_seconds'] is not None else "n/a"
+        log(f"  ✓ {result['key']:<58} {result['speed']:6.2f}x  cpu {cpu:>6}  rss {rss:>6}  "
+            f"{result['size_bytes'] / 1024:8.0f}KB  drop {result['drop_frames']}")
+        results.append(result)
+    return {
+        'host': platform.node(),
+        'platform': platform.platform(),
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'duration': duration,
+        'realtime': realtime,
+        'results': results,
+    }
+
+
+def compare(report, baseline, tolerance=TOLERANCE):
+    """[(key, metric, baseline, current, relative change)] for every regression"""
+    old = {r['key']: r for r in baseline.get('results', []) if 'error' not in r}
+    regressions = []
+    for result in report['results']:
+        before = old.get(result['key'])
+        if before is None:
+            continue
+        if 'error' in result:
+            regressions.append((result['key'], 'error', None, result['error'], None))
+            continue
+        for metric in METRICS:
+            a, b = before.get(metric), result.get(metric)
+            if a is None or b is None:
+                continue
+            if metric == 'drop_frames':
+                # Any new drops are a regression, no matter how few there were
+                worse = b > a
+                change = (b - a) / a if a else float('inf') if b else 0.0
+            else:
+                change = (b - a) / a if a else 0.0
+                worse = change < -tolerance if metric == 'speed' else change > tolerance
+                worse = worse and abs(b - a) >= NOISE_FLOOR[metric]
+            if worse:
+                regressions.append((result['key'], metric, a, b, change))
+    return regressions
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the recorders' FFmpeg commands "
+                                                 "on synthetic sources")
+    parser.add_argument('--builders', nargs='+', choices=BUILDERS, default=BUILDERS)
+    # 'flash' is the A/V sync test pattern (av_sync_harness.py), not an encoding load
+    parser.add_argument('--sources', nargs='+', choices=list(VIDEO_SOURCES),
+                        default=[s for s in VIDEO_SOURCES if s != 'flash'])
+    parser.add_argument('--sizes', nargs='+', default=['1280x720', '1920x1080'])
+    parser.add_argument('--fps', nargs='+', default=['30', '60'])
+    parser.add_argument('--qualities', nargs='+', choices=list(QUALITY_PRESETS),
+                        default=['low', 'high'])
+    parser.add_argument('--audio', nargs='+', type=int, choices=[0, 1, 2], default=[0, 2],
+                        help="number of audio sources (2 = mixed)")
+    parser.add_argument('--quick', action='store_true',
+                        help="one size/fps/quality, testsrc2 and static only")
+    parser.add_argument('--duration', type=int, default=5, help="seconds encoded per case")
+    parser.add_argument('--realtime', action='store_true',
+                        help="feed sources at capture speed (-re) to measure dropped frames")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="store these results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    if args.quick:
+        case_list = list(cases(args.builders, ('testsrc2', 'static'), ('1280x720',),
+                               ('30',), ('medium',), (0, 1, 2)))
+    else:
+        case_list = list(cases(args.builders, args.sources, args.sizes, args.fps,
+                               args.qualities, args.audio))
+
+    print(f"Running {len(case_list)} case(s), {args.duration}s each...\n")
+    report = run_suite(case_list, args.duration, args.realtime)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Baseline saved to {args.baseline}")
+        return
+
+    try:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        print(f"\nNo baseline at {args.baseline} (create one with --save-baseline)")
+        return
+
+    if baseline.get('host') != report['host']:
+        print(f"\n⚠ Baseline is from {baseline.get('host')}, comparing anyway")
+    regressions = compare(report, baseline, args.tolerance)
+    if not regressions:
+        print(f"\n✓ No regressions against the baseline from {baseline.get('created')}")
+        return
+    print(f"\n✗ {len(regressions)} regression(s):")
+    for key, metric, before, now, change in regressions:
+        if metric == 'error':
+            print(f"  {key}: now fails")
+        else:
+            print(f"  {key}: {metric} {before} → {now} ({change * 100:+.0f}%)")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+FFmpeg Command Builders
+The recorders' command construction as plain functions, shared by the GUIs, the CLI and the benchmarks
+"""
+
+import os
+
+from audio_tracks import track_filters, track_metadata
+from encoder_calibration import choose_preset
+from frame_tap import tap_outputs
+from multi_monitor import grab_input_args
+from previews import preview_dir, preview_outputs
+from segmented_output import output_args
+from transcode_queue import SCRATCH_DIR, TranscodeJob, capture_args
+from video_filters import REDACT_STYLE, decimate_filter, redact_filter, vfr_args
+
+# screen_recorder.py quality names → (preset, crf)
+QUALITY_PRESETS = {
+    'low': ('ultrafast', '28'),
+    'medium': ('fast', '23'),
+    'high': ('medium', '20'),
+    'ultra': ('slow', '18'),
+}
+
+# advanced_recorder.py two-stage: the background encode has no real-time limit
+BACKGROUND_PRESET = 'slow'
+
+# manual_recorder.py menu choice → (offset_x, offset_y, width, height); None = whole desktop
+MANUAL_MODES = {
+    '1': None,
+    '2': None,
+    '3': (1920, 0, 1920, 1080),
+    '4': (3840, 0, 1920, 1080),
+}
+
+# Extra outputs encoded from the same capture as the main recording
+RENDITIONS = {
+    'share': {'height': 720, 'crf': '28', 'codec': 'libx264', 'preset': 'veryfast',
+              'audio_bitrate': '128k'},
+    'preview': {'height': 360, 'crf': '32', 'codec': 'libx264', 'preset': 'veryfast',
+                'audio_bitrate': '64k'},
+}
+PRESET_CODECS = ('libx264', 'libx265')  # encoders taking -preset
+
+# lavfi stand-ins for capture devices (benchmarks, tests, headless runs)
+SYNC_PERIOD = 1.0   # 'flash' source: a white flash and a beep at the start of every period
+SYNC_PULSE = 0.1    # seconds each flash/beep lasts
+VIDEO_SOURCES = {
+    'testsrc2': 'testsrc2=size={size}:rate={fps}',
+    'mandelbrot': 'mandelbrot=size={size}:rate={fps}',
+    'static': 'testsrc2=size={size}:rate=1/3,fps={fps}',  # a new slide every 3 s
+    'flash': ('color=c=black:size={size}:rate={fps},drawbox=color=white:t=fill'
+              f":enable='lt(mod(t,{SYNC_PERIOD}),{SYNC_PULSE})'"),
+}
+AUDIO_SOURCES = [
+    'sine=frequency=440:sample_rate=48000',
+    'anoisesrc=color=pink:amplitude=0.1:sample_rate=48000',
+]
+# Audio that belongs to a video source (replaces AUDIO_SOURCES for it)
+PAIRED_AUDIO = {
+    'flash': (f"aevalsrc=exprs='if(lt(mod(t,{SYNC_PERIOD}),{SYNC_PULSE}),0.5*sin(2*PI*1000*t),0)'"
+              ':sample_rate=48000'),
+}
+
+CAPTURE_VIDEO = ('gdigrab', 'x11grab')
+CAPTURE_AUDIO = ('dshow', 'pulse', 'alsa')
+# Demuxer options that only make sense for a real capture device
+CAPTURE_OPTIONS = ('-f', '-framerate', '-offset_x', '-offset_y', '-video_size', '-draw_mouse')
+
+
+def gdigrab_input(fps, target='desktop', x=None, y=None, width=None, height=None):
+    """gdigrab input arguments, optionally restricted to a region"""
+    args = ['-f', 'gdigrab', '-framerate', str(fps)]
+    if width and height:
+        args.extend(['-offset_x', str(x or 0), '-offset_y', str(y or 0),
+                     '-video_size', f'{width}x{height}'])
+    args.extend(['-i', target])
+    return args
+
+
+def desktop_size(monitors):
+    """Bounding box of all monitors, (None, None) if unknown"""
+    if not monitors:
+        return (None, None)
+    return (max(m['x'] + m['width'] for m in monitors) - min(m['x'] for m in monitors),
+            max(m['y'] + m['height'] for m in monitors) - min(m['y'] for m in monitors))
+
+
+def rendition(spec):
+    """Rendition settings from a RENDITIONS name, 'HEIGHTp[,key=value...]' or a dict.
+
+    e.g. 'share', '480p,crf=30' or '1080p,codec=libx265,audio_bitrate=96k';
+    anything not given comes from 'share'.
+    """
+    if isinstance(spec, dict):
+        settings = dict(RENDITIONS['share'], **spec)
+    elif spec in RENDITIONS:
+        settings = dict(RENDITIONS[spec], name=spec)
+    else:
+        size, *options = spec.split(',')
+        if not size.endswith('p') or not size[:-1].isdigit():
+            raise ValueError(f"Unknown rendition: {spec} (use {', '.join(RENDITIONS)} or e.g. 480p)")
+        settings = dict(RENDITIONS['share'], height=int(size[:-1]), name=size)
+        for option in options:
+            key, sep, value = option.partition('=')
+            if not sep or key not in settings:
+                raise ValueError(f"Unknown rendition option: {option}")
+            settings[key] = value
+    settings['height'] = int(settings['height'])
+    settings['crf'] = str(settings['crf'])
+    settings.setdefault('name', f"{settings['height']}p")
+    return settings
+
+
+def rendition_path(output_dir, base_name, settings):
+    return os.path.join(output_dir, f"{base_name}_{settings['name']}.mp4")
+
+
+def rendition_outputs(main_args, renditions, output_dir, base_name, audio_count=0,
+                      video_filter=None, vfr=False, previews=False, tap=None, redact=(),
+                      redact_style=REDACT_STYLE, audio_tracks=False):
+    """Output arguments encoding one capture several times from a single decode.
+
+    The capture is decoded once and split in one filter graph: the main
+    output (main_args: its codecs and muxer arguments) gets the frames
+    as captured, each rendition a scaled copy with its own encoder.
+    video_filter runs once before the split; two or more audio inputs are
+    mixed once and the mix split, or with audio_tracks kept as separate
+    drift-corrected tracks in the main output (renditions, meant to play
+    anywhere, still get a mix). Renditions are never upscaled.
+    previews adds thumbnails, sprite sheets and a preview clip
+    (previews.preview_outputs) as three more branches. tap (frame_tap
+    settings) adds a last branch writing raw frames to stdout. redact
+    regions (capture coordinates) are masked first, so every output,
+    preview and tap frame is redacted.
+    """
+    count = len(renditions) + 1
+    video_count = count + (3 if previews else 0) + (1 if tap else 0)
+    chain = f'{video_filter},' if video_filter else ''
+    source = '[0:v]'
+    graph = []
+    if redact:
+        graph.append(redact_filter(redact, redact_style, source, '[redacted]'))
+        source = '[redacted]'
+    graph.append(f"{source}{chain}split={video_count}" + ''.join(f'[v{i}]' for i in range(video_count)))
+    for i, settings in enumerate(renditions, 1):
+        graph.append(f"[v{i}]scale=-2:'trunc(min(ih,{settings['height']})/2)*2'[r{i}]")
+    preview_args = []
+    if previews:
+        chains, preview_args = preview_outputs([f'[v{i}]' for i in range(count, count + 3)],
+                                               preview_dir(output_dir, base_name))
+        graph.extend(chains)
+    if tap:
+        chain, tap_args = tap_outputs(f'[v{video_count - 1}]', tap)
+        graph.append(chain)
+        preview_args = preview_args + tap_args
+    # audio[i]: the audio labels output i maps
+    if audio_count > 1 and audio_tracks:
+        chains, labels = track_filters(audio_count, copies=2 if renditions else 1)
+        graph.extend(chains)
+        audio = [labels[0]]
+        if renditions:
+            graph.append(''.join(labels[1]) +
+                         f'amix=inputs={audio_count}:duration=longest,asplit={count - 1}' +
+                         ''.join(f'[a{i}]' for i in range(1, count)))
+            audio += [[f'[a{i}]'] for i in range(1, count)]
+    elif audio_count > 1:
+        graph.append(''.join(f'[{n}:a]' for n in range(1, audio_count + 1)) +
+                     f'amix=inputs={audio_count}:duration=longest,asplit={count}' +
+                     ''.join(f'[a{i}]' for i in range(count)))
+        audio = [[f'[a{i}]'] for i in range(count)]
+    else:
+        audio = [['1:a']] * count if audio_count else []
+    fps_mode = ['-fps_mode', 'vfr'] if vfr else []
+
+    args = ['-filter_complex', ';'.join(graph), '-map', '[v0]']
+    for label in (audio[0] if audio else []):
+        args.extend(['-map', label])
+    args.extend(fps_mode + list(main_args))
+    for i, settings in enumerate(renditions, 1):
+        args.extend(['-map', f'[r{i}]'])
+        for label in (audio[i] if audio else []):
+            args.extend(['-map', label])
+        args.extend(['-c:v', settings['codec']])
+        if settings['codec'] in PRESET_CODECS:
+            args.extend(['-preset', settings['preset']])
+        args.extend(['-crf', settings['crf'], '-pix_fmt', 'yuv420p'] + fps_mode)
+        if audio:
+            args.extend(['-c:a', 'aac', '-b:a', settings['audio_bitrate']])
+        args.append(rendition_path(output_dir, base_name, settings))
+    return args + preview_args
+
+
+def limit_duration(cmd, duration):
+    """cmd with every input cut off after duration seconds.
+
+    -t goes on the inputs: when they end, the whole graph is flushed and
+    every output finished, including a partial sprite sheet. As an output
+    option it would be checked against each output's own timestamps,
+    which the thumbnail and sprite outputs (a frame every 10 s, a sheet
+    every 200 s) may never reach, so FFmpeg would never exit.
+    """
+    result = []
+    for arg in cmd:
+        if arg == '-i':
+            result.extend(['-t', str(duration)])
+        result.append(arg)
+    return result
+
+
+def screen_recorder_command(base_name, mode='fullscreen', fps='30', quality='high',
+                            window=None, area=None, screen_size=(None, None),
+                            audio_inputs=(), output_mode='single', output_dir='.',
+                            two_stage=False, deferred=False, vfr=False,
+                            scratch_dir=SCRATCH_DIR, renditions=(), previews=False, tap=None,
+                            redact=(), redact_style=REDACT_STYLE, audio_tracks=False,
+                            track_titles=()):
+    """Command for ScreenRecorderGUI.
+
+    area is (x, y, w, h); audio_inputs is a list of input argument lists
+    (two or more are mixed, or with audio_tracks recorded as one
+    drift-corrected track each, named by track_titles). renditions are rendition() settings written
+    next to the main output (see rendition_path); previews adds thumbnails,
+    sprites and a preview clip in previews.preview_dir; tap (frame_tap
+    settings) streams raw frames to stdout; redact regions (capture
+    coordinates) are blurred, pixelated or boxed out before any of them.
+    Returns (cmd, output, transcode_job); the job is None unless
+    two_stage is set.
+    """
+    split = bool(renditions or previews or tap or redact)
+    if split and two_stage:
+        raise ValueError("Renditions, previews, the frame tap and redaction are encoded while "
+                         "recording, not with two-stage capture")
+    fps = str(fps)
+    cmd = ['ffmpeg']
+    capture_size = (None, None)
+
+    # Video input based on mode
+    if mode == "fullscreen":
+        cmd.extend(gdigrab_input(fps))
+        capture_size = screen_size
+    elif mode == "window":
+        if not window:
+            raise ValueError("Please select a window")
+        cmd.extend(gdigrab_input(fps, f'title={window}'))
+    elif mode == "area":
+        x, y, w, h = area
+        cmd.extend(gdigrab_input(fps, 'desktop', x, y, w, h))
+        capture_size = (w, h)
+    else:
+        raise ValueError(f"Unknown recording mode: {mode}")
+
+    # Audio inputs, mixed if there is more than one
+    for audio in audio_inputs:
+        cmd.extend(audio)
+    tracks = audio_tracks and len(audio_inputs) > 1
+    if tracks and not split:
+        chains, labels = track_filters(len(audio_inputs))
+        cmd.extend(['-filter_complex', ';'.join(chains), '-map', '0:v'])
+        for label in labels[0]:
+            cmd.extend(['-map', label])
+    elif len(audio_inputs) > 1 and not split:
+        cmd.extend(['-filter_complex', f'amix=inputs={len(audio_inputs)}:duration=longest'])
+
+    preset, crf = QUALITY_PRESETS[quality]
+    titles = (track_metadata(track_titles or [f'Audio {n + 1}' for n in range(len(audio_inputs))])
+              if tracks else [])
+
+    # Drop duplicate frames at capture time, before either encoder sees them
+    if vfr and not split:
+        cmd.extend(vfr_args(fps))
+
+    if two_stage:
+        # Capture cheaply now; the transcode queue encodes at the full
+        # preset later, so calibration limits don't apply
+        final_file = os.path.join(output_dir, f"{base_name}.mp4")
+        capture, scratch_file = capture_args(base_name, scratch_dir, audio=bool(audio_inputs))
+        # Track titles go on the scratch file; the transcode copies stream metadata
+        cmd.extend(capture[:-1] + titles + capture[-1:])
+        job = TranscodeJob(scratch_file, os.path.abspath(final_file), preset, crf,
+                           deferred=deferred, vfr=vfr)
+        return cmd, final_file, job
+
+    # Step down to a faster preset if calibration showed this machine
+    # can't sustain the requested one at this size/fps
+    preset = choose_preset(crf, *capture_size, fps=fps, default=preset, max_preset=preset)
+
+    encode = ['-c:v', 'libx264', '-preset', preset, '-crf', crf]
+    if audio_inputs:
+        encode.extend(['-c:a', 'aac', '-b:a', '192k'])
+    encode.extend(titles)
+
+    out_args, output = output_args(output_mode, output_dir, base_name)
+    if split:
+        cmd.extend(rendition_outputs(encode + out_args, renditions, output_dir, base_name,
+                                     audio_count=len(audio_inputs),
+                                     video_filter=decimate_filter(fps) if vfr else None, vfr=vfr,
+                                     previews=previews, tap=tap, redact=redact,
+                                     redact_style=redact_style, audio_tracks=audio_tracks))
+    else:
+        cmd.extend(encode + out_args)
+    return cmd, output, None
+
+
+def advanced_recorder_inputs(mode='desktop', fps='30', monitors=(), monitor_index=0,
+                             window=None, audio_input=None):
+    """Input arguments for AdvancedRecorderGUI, plus the capture size"""
+    fps = str(fps)
+    cmd = []
+    capture_size = (None, None)
+
+    if mode in ("desktop", "parallel"):
+        # Parallel mode records per monitor; anything else needing one
+        # input (e.g. the replay buffer) grabs the whole desktop
+        cmd.extend(gdigrab_input(fps))
+        capture_size = desktop_size(monitors)
+    elif mode == "monitor":
+        if not monitors:
+            raise ValueError("No monitors detected")
+        mon = monitors[monitor_index]
+        # gdigrab on Windows, x11grab at the monitor's offset elsewhere
+        cmd.extend(grab_input_args(mon, fps))
+        capture_size = (mon['width'], mon['height'])
+    elif mode == "window":
+        if not window:
+            raise ValueError("Please select a window")
+        cmd.extend(gdigrab_input(fps, f'title={window}'))
+    else:
+        raise ValueError(f"Unknown recording mode: {mode}")
+
+    if audio_input:
+        cmd.extend(audio_input)
+    return cmd, capture_size
+
+
+def advanced_recorder_command(base_name, mode='desktop', fps='30', crf='23', monitors=(),
+                              monitor_index=0, window=None, audio_input=None,
+                              output_mode='single', output_dir='.', two_stage=False,
+                              deferred=False, vfr=False, scratch_dir=SCRATCH_DIR,
+                              renditions=(), previews=False, tap=None, redact=(),
+                              redact_style=REDACT_STYLE):
+    """Command for AdvancedRecorderGUI; returns (cmd, output, transcode_job)"""
+    split = bool(renditions or previews or tap or redact)
+    if split and two_stage:
+        raise ValueError("Renditions, previews, the frame tap and redaction are encoded while "
+                         "recording, not with two-stage capture")
+    inputs, capture_size = advanced_recorder_inputs(mode, fps, monitors, monitor_index,
+                                                    window, audio_input)
+    cmd = ['ffmpeg'] + inputs
+    crf = str(crf)
+
+    # Duplicate frames are dropped before the (capture or final) encoder
+    if vfr and not split:
+        cmd.extend(vfr_args(fps))
+
+    if two_stage:
+        # Lossless capture now, CRF encode at a slow preset in the background
+        output = os.path.join(output_dir, f"{base_name}.mp4")
+        capture, scratch = capture_args(base_name, scratch_dir, audio=bool(audio_input))
+        cmd.extend(capture)
+        job = TranscodeJob(scratch, output, BACKGROUND_PRESET, crf, deferred=deferred,
+                           vfr=vfr)
+        return cmd, output, job
+
+    # Slowest preset calibration says this machine sustains (ultrafast if not calibrated)
+    preset = choose_preset(crf, *capture_size, fps=fps)
+    encode = [
+        '-c:v', 'libx264',
+        '-preset', preset,
+        '-crf', crf,
+        '-pix_fmt', 'yuv420p'  # Important for compatibility!
+    ]
+    if audio_input:
+        encode.extend(['-c:a', 'aac', '-b:a', '192k'])
+
+    out_args, output = output_args(output_mode, output_dir, base_name)
+    if split:
+        cmd.extend(rendition_outputs(encode + out_args, renditions, output_dir, base_name,
+                                     audio_count=1 if audio_input else 0,
+                                     video_filter=decimate_filter(fps) if vfr else None, vfr=vfr,
+                                     previews=previews, tap=tap, redact=redact,
+                                     redact_style=redact_style))
+    else:
+        cmd.extend(encode + out_args)
+    return cmd, output, None
+
+
+def manual_recorder_command(output_file, mode='1', fps='30', crf='23', audio_input=None,
+                            duration=None):
+    """Command for manual_recorder.py (menu choices as typed by the user)"""
+    cmd = ['ffmpeg']
+
+    region = MANUAL_MODES.get(mode)
+    if region:
+        cmd.extend(gdigrab_input(fps, 'desktop', *region))
+    else:
+        cmd.extend(gdigrab_input(fps))
+
+    if audio_input:
+        cmd.extend(audio_input)
+
+    # As an output option, so it limits the whole recording rather than
+    # only the input that happens to follow it
+    if duration:
+        cmd.extend(['-t', str(duration)])
+
+    cmd.extend([
+        '-c:v', 'libx264',
+        '-preset', 'ultrafast',
+        '-crf', str(crf),
+        '-pix_fmt', 'yuv420p'
+    ])
+    if audio_input:
+        cmd.extend(['-c:a', 'aac', '-b:a', '192k'])
+
+    cmd.append(output_file)
+    return cmd
+
+
+def synthetic_inputs(cmd, source='testsrc2', size='1920x1080', realtime=False):
+    """Swap capture devices in a recorder command for lavfi sources.
+
+    Everything else (filters, codecs, muxer options) is left exactly as the
+    builder produced it. Video size and rate come from the capture options
+    when present, otherwise from `size`.
+    """
+    result = [cmd[0]]
+    pending = []
+    audio_index = 0
+    i = 1
+    while i < len(cmd):
+        arg = cmd[i]
+        if arg != '-i':
+            pending.append(arg)
+            i += 1
+            continue
+        options = dict(zip(pending[::2], pending[1::2])) if len(pending) % 2 == 0 else {}
+        fmt = options.get('-f')
+        if fmt in CAPTURE_VIDEO or fmt in CAPTURE_AUDIO:
+            # Keep anything that isn't a capture option (e.g. -y)
+            keep, j = [], 0
+            while j < len(pending):
+                if pending[j] in CAPTURE_OPTIONS:
+                    j += 2
+                else:
+                    keep.append(pending[j])
+                    j += 1
+            result.extend(keep)
+            if fmt in CAPTURE_VIDEO:
+                lavfi = VIDEO_SOURCES[source].format(size=options.get('-video_size', size),
+                                                     fps=options.get('-framerate', '30'))
+                result.extend(['-re'] if realtime else [])
+            else:
+                lavfi = PAIRED_AUDIO.get(source) or AUDIO_SOURCES[audio_index % len(AUDIO_SOURCES)]
+                audio_index += 1
+            result.extend(['-f', 'lavfi', '-i', lavfi])
+        else:
+            result.extend(pending + ['-i', cmd[i + 1]])
+        pending = []
+        i += 2
+    result.extend(pending)
+    return result
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Recording Control Server
+Local HTTP API for starting, stopping and queueing recording sessions on this host
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from command_builder import QUALITY_PRESETS, VIDEO_SOURCES, desktop_size
+from transcode_queue import TranscodeQueue
+from recording_session import FAILED, FINISHED, RECORDERS, RecordingConfig, RecordingSession
+from video_filters import REDACT_STYLE, REDACT_STYLES
+
+HOST = '127.0.0.1'  # never listen beyond this machine: there is no authentication
+PORT = 8765
+
+QUEUED = 'queued'
+CANCELLED = 'cancelled'
+
+# Rough x264 cost of one 1080p30 capture, in cores; other sizes scale by pixel rate
+CORES_1080P30 = 2.0
+DEFAULT_SIZE = (1920, 1080)
+KEEP_FINISHED = 200  # finished sessions kept for querying
+
+
+def capture_size(config):
+    """Best guess at the pixel size a config will capture"""
+    if config.synthetic:
+        return tuple(int(v) for v in config.synthetic_size.split('x'))
+    if config.area:
+        return (int(config.area[2]), int(config.area[3]))
+    if config.mode == 'monitor' and config.monitors:
+        mon = config.monitors[config.monitor_index]
+        return (mon['width'], mon['height'])
+    if all(config.screen_size):
+        return config.screen_size
+    size = desktop_size(config.monitors)
+    return size if all(size) else DEFAULT_SIZE
+
+
+def estimate_cost(config):
+    """Estimated cores a recording will keep busy"""
+    if config.recorder == 'parallel' and config.monitors:
+        pixels = sum(m['width'] * m['height'] for m in config.monitors)
+    else:
+        width, height = capture_size(config)
+        pixels = width * height
+        # Each rendition is one more encode of a scaled copy (never upscaled)
+        pixels += sum(width * height * min(r['height'] / height, 1.0) ** 2
+                      for r in config.renditions)
+    return round(CORES_1080P30 * pixels * float(config.fps) / (1920 * 1080 * 30), 2)
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class SessionManager:
+    """Runs recording sessions within a per-host budget, queueing the rest.
+
+    A request is admitted while fewer than max_sessions are active and the
+    estimated cores of all active sessions stay within cpu_budget; anything
+    else waits in FIFO order and starts as soon as a running session ends.
+    A single request bigger than the whole budget runs when nothing else does.
+    """
+
+    def __init__(self, max_sessions=2, cpu_budget=None, transcode_workers=1):
+        self.max_sessions = max(1, int(max_sessions))
+        self.cpu_budget = float(cpu_budget or max(CORES_1080P30, (os.cpu_count() or 2) / 2))
+        self.sessions = {}    # id → RecordingSession
+        self.queue = []       # pending requests, oldest first
+        self.finished = []    # ids in the order they ended
+        self.cancelled = {}   # id → result of a request cancelled while queued
+        self.transcodes = TranscodeQueue(workers=transcode_workers)
+        self._lock = threading.RLock()
+
+    def start(self):
+        self.transcodes.start()
+        return self
+
+    def active(self):
+        return [s for s in self.sessions.values() if s.active]
+
+    def used(self):
+        return round(sum(estimate_cost(s.config) for s in self.active()), 2)
+
+    def _fits(self, cost):
+        active = self.active()
+        if not active:
+            return True
+        return len(active) < self.max_sessions and self.used() + cost <= self.cpu_budget
+
+    def submit(self, config, queue=True):
+        """Start a session now if it fits, else queue it (or refuse if queue is False)"""
+        cost = estimate_cost(config)
+        with self._lock:
+            if not self.queue and self._fits(cost):
+                return self._launch(RecordingSession(config, on_event=self._event)).result()
+            if not queue:
+                raise BudgetExceeded(f"Host budget in use ({len(self.active())} session(s), "
+                                     f"{self.used()}/{self.cpu_budget} cores)")
+            session = RecordingSession(config, on_event=self._event)
+            self.queue.append({'id': session.id, 'session': session, 'cost': cost,
+                               'queued': time.time()})
+            return self.describe(session.id)
+
+    def _launch(self, session):
+        self.sessions[session.id] = session
+        try:
+            session.start()
+        except Exception:
+            # start() already moved it to failed; keep it for querying
+            self._finished(session)
+        return session
+
+    def _event(self, session, event, data):
+        if event in ('finished', 'failed'):
+            with self._lock:
+                self._finished(session)
+                self._dispatch()
+
+    def _finished(self, session):
+        if session.state == FINISHED:
+            for job in session.transcode_jobs:
+                self.transcodes.submit(job)
+        if session.id not in self.finished:
+            self.finished.append(session.id)
+        while len(self.finished) > KEEP_FINISHED:
+            self.sessions.pop(self.finished.pop(0), None)
+
+    def _dispatch(self):
+        """Start queued requests, in order, while they fit"""
+        while self.queue and self._fits(self.queue[0]['cost']):
+            entry = self.queue.pop(0)
+            self._launch(entry['session'])
+
+    def _queued(self, session_id):
+        return next((e for e in self.queue if e['id'] == session_id), None)
+
+    def describe(self, session_id):
+        with self._lock:
+            entry = self._queued(session_id)
+            if entry:
+                result = entry['session'].result()
+                result.update(state=QUEUED, queued=entry['queued'], cost=entry['cost'],
+                              position=self.queue.index(entry) + 1)
+                return result
+            if session_id in self.cancelled:
+                return self.cancelled[session_id]
+            session = self.sessions.get(session_id)
+            if session is None:
+                raise KeyError(session_id)
+            result = session.result()
+            result['cost'] = estimate_cost(session.config)
+            return result
+
+    def list(self):
+        with self._lock:
+            ids = list(self.sessions) + [e['id'] for e in self.queue]
+            return [self.describe(i) for i in ids]
+
+    def control(self, session_id, action):
+        """stop/pause/resume a running session, or cancel a queued one"""
+        with self._lock:
+            entry = self._queued(session_id)
+            if entry:
+                if action not in ('stop', 'cancel'):
+                    raise RuntimeError(f"Cannot {action} a queued session")
+                self.queue.remove(entry)
+                result = entry['session'].result()
+                result.update(state=CANCELLED, queued=entry['queued'], cost=entry['cost'])
+                self.cancelled[session_id] = result
+                return result
+            session = self.sessions.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+        if action in ('stop', 'cancel'):
+            # Outside our lock: stop() waits for FFmpeg and then fires 'finished'
+            return session.stop()
+        if action == 'pause':
+            session.pause()
+        elif action == 'resume':
+            session.resume()
+        else:
+            raise ValueError(f"Unknown action: {action}")
+        return session.result()
+
+    def status(self):
+        with self._lock:
+            return {
+                'max_sessions': self.max_sessions,
+                'cpu_budget': self.cpu_budget,
+                'cpu_used': self.used(),
+                'active': len(self.active()),
+                'queued': len(self.queue),
+                'transcodes_pending': len(self.transcodes.pending()),
+            }
+
+    def shutdown(self):
+        """Drop the queue and stop everything still recording"""
+        with self._lock:
+            self.queue.clear()
+            active = self.active()
+        for session in active:
+            try:
+                session.stop()
+            except RuntimeError:
+                pass
+        self.transcodes.stop()
+
+
+class ControlHandler(BaseHTTPRequestHandler):
+    """JSON over HTTP:
+
+    GET  /status                    budget and queue
+    GET  /sessions                  all sessions, queued ones last
+    POST /sessions                  {"config": {...}, "queue": true} → session
+    GET  /sessions/<id>             one session
+    POST /sessions/<id>/<action>    stop, pause, resume or cancel
+    """
+
+    manager = None
+    quiet = False
+
+    def _send(self, status, body):
+        data = json.dumps(body, indent=2).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+    def _route(self, method):
+        parts = [p for p in self.path.split('?')[0].split('/') if p]
+        try:
+            if method == 'GET' and parts == ['status']:
+                return self._send(200, self.manager.status())
+            if method == 'GET' and parts == ['sessions']:
+                return self._send(200, self.manager.list())
+            if method == 'POST' and parts == ['sessions']:
+                body = self._body()
+                config = RecordingConfig.from_dict(body.get('config', {}))
+                result = self.manager.submit(config, queue=body.get('queue', True))
+                return self._send(202 if result['state'] == QUEUED else 201, result)
+            if method == 'GET' and len(parts) == 2 and parts[0] == 'sessions':
+                return self._send(200, self.manager.describe(parts[1]))
+            if method == 'POST' and len(parts) == 3 and parts[0] == 'sessions':
+                return self._send(200, self.manager.control(parts[1], parts[2]))
+            self._send(404, {'error': f"No route for {method} {self.path}"})
+        except KeyError as e:
+            self._send(404, {'error': f"Unknown session: {e.args[0]}"})
+        except BudgetExceeded as e:
+            self._send(429, {'error': str(e)})
+        except RuntimeError as e:
+            self._send(409, {'error': str(e)})
+        except (ValueError, TypeError) as e:
+            self._send(400, {'error': str(e)})
+
+    def do_GET(self):
+        self._route('GET')
+
+    def do_POST(self):
+        self._route('POST')
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def serve(host=HOST, port=PORT, manager=None, quiet=False):
+    """Create the server (not yet serving); the caller runs serve_forever()"""
+    manager = manager or SessionManager()
+    handler = type('Handler', (ControlHandler,), {'manager': manager, 'quiet': quiet})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+class ControlClient:
+    """Talks to a running control server"""
+
+    def __init__(self, host=HOST, port=PORT, timeout=30):
+        self.url = f"http://{host}:{port}"
+        self.timeout = timeout
+
+    def _request(self, method, path, body=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(self.url + path, data=data, method=method,
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get('error', e.reason)
+            except ValueError:
+                message = e.reason
+            raise RuntimeError(f"{e.code}: {message}") from None
+
+    def status(self):
+        return self._request('GET', '/status')
+
+    def sessions(self):
+        return self._request('GET', '/sessions')
+
+    def session(self, session_id):
+        return self._request('GET', f'/sessions/{session_id}')
+
+    def start(self, config, queue=True):
+        return self._request('POST', '/sessions', {'config': config, 'queue': queue})
+
+    def control(self, session_id, action):
+        return self._request('POST', f'/sessions/{session_id}/{action}', {})
+
+    def wait(self, session_id, timeout=None, interval=0.5):
+        """Poll until the session has finished, failed or been cancelled"""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            result = self.session(session_id)
+            if result['state'] in (FINISHED, FAILED, CANCELLED):
+                return result
+            if deadline and time.time() > deadline:
+                return result
+            time.sleep(interval)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Control recordings on this host over HTTP")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    server = commands.add_parser('serve', help="run the control server")
+    server.add_argument('--max-sessions', type=int, default=2)
+    server.add_argument('--cpu-budget', type=float,
+                        help=f"cores recordings may use (a 1080p30 capture ≈ {CORES_1080P30})")
+    server.add_argument('--transcode-workers', type=int, default=1)
+    server.add_argument('--quiet', action='store_true', help="don't log requests")
+
+    start = commands.add_parser('start', help="start (or queue) a recording")
+    start.add_argument('--recorder', choices=RECORDERS[:2], default='screen_recorder')
+    start.add_argument('--mode')
+    start.add_argument('--fps', default='30')
+    start.add_argument('--quality', choices=list(QUALITY_PRESETS), default='high')
+    start.add_argument('--crf')
+    start.add_argument('--audio', action='append', default=[])
+    start.add_argument('--audio-tracks', action='store_true')
+    start.add_argument('--output-mode', default='single')
+    start.add_argument('--output-dir', default='.')
+    start.add_argument('--name')
+    start.add_argument('--duration', type=int)
+    start.add_argument('--vfr', action='store_true')
+    start.add_argument('--two-stage', action='store_true')
+    start.add_argument('--rendition', action='append', default=[],
+                       help="extra output from the same capture, e.g. share or 480p")
+    start.add_argument('--previews', action='store_true')
+    start.add_argument('--redact', action='append', default=[], metavar='X,Y,W,H')
+    start.add_argument('--redact-window', action='append', default=[], metavar='TITLE')
+    start.add_argument('--redact-style', choices=REDACT_STYLES, default=REDACT_STYLE)
+    start.add_argument('--synthetic', choices=list(VIDEO_SOURCES))
+    start.add_argument('--size', default='1920x1080')
+    start.add_argument('--no-queue', action='store_true',
+                       help="fail instead of queueing when the host is busy")
+    start.add_argument('--wait', action='store_true', help="block until it has finished")
+
+    commands.add_parser('status', help="budget and queue")
+    commands.add_parser('list', help="all sessions")
+    for action in ('get', 'stop', 'pause', 'resume', 'cancel'):
+        commands.add_parser(action).add_argument('id')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        manager = SessionManager(args.max_sessions, args.cpu_budget,
+                                 args.transcode_workers).start()
+        httpd = serve(args.host, args.port, manager, args.quiet)
+        print(f"🎛️ Control server on http://{args.host}:{args.port} "
+              f"({manager.max_sessions} sessions, {manager.cpu_budget:g} cores)")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            print("\nStopping recordings...")
+        httpd.server_close()
+        manager.shutdown()
+        return
+
+    client = ControlClient(args.host, args.port)
+    try:
+        if args.command == 'start':
+            config = RecordingConfig(
+                recorder=args.recorder, mode=args.mode, fps=args.fps, quality=args.quality,
+                crf=args.crf, audio_devices=args.audio, output_mode=args.output_mode,
+                output_dir=os.path.abspath(args.output_dir), base_name=args.name,
+                two_stage=args.two_stage, vfr=args.vfr, synthetic=args.synthetic,
+                synthetic_size=args.size, duration=args.duration,
+                renditions=args.rendition, previews=args.previews,
+                redact=args.redact + [{'window': title} for title in args.redact_window],
+                redact_style=args.redact_style, audio_tracks=args.audio_tracks).to_dict()
+            result = client.start(config, queue=not args.no_queue)
+            if args.wait:
+                result = client.wait(result['id'])
+        elif args.command == 'status':
+            result = client.status()
+        elif args.command == 'list':
+            for s in client.sessions():
+                print(f"{s['id']}  {s['state']:<9}  {s['duration']:7.1f}s  "
+                      f"{s.get('cost', 0):4.1f} cores  {s['output'] or ''}")
+            return
+        elif args.command == 'get':
+            result = client.session(args.id)
+        else:
+            result = client.control(args.id, args.command)
+    except (RuntimeError, urllib.error.URLError) as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+    print(json.dumps(result, indent=2))
+    if result.get('state') == FAILED:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Dead-Air Removal
+Cuts stretches that are both silent and frozen out of finished recordings, stream-copying everything it can
+"""
+
+import bisect
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from ffmpeg_progress import FFmpegProcess
+
+SILENCE_DB = -50       # same threshold as the live audio meter
+FREEZE_NOISE = '-60dB'
+MIN_SECONDS = 3.0      # shorter pauses read as natural and are kept
+PADDING = 0.5          # seconds of each pause left in on either side
+SEEK_SLACK = 0.001     # nudge past a keyframe so input seeking lands on it
+REENCODE = ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '18']
+# ffprobe's H.264 profile names → libx264's
+X264_PROFILES = {
+    'baseline': 'baseline', 'constrained baseline': 'baseline', 'main': 'main',
+    'high': 'high', 'high 10': 'high10', 'high 4:2:2': 'high422',
+    'high 4:4:4 predictive': 'high444',
+}
+SELF_TEST_TOLERANCE = 0.15  # seconds: a frame plus an AAC frame either way
+
+FREEZE_RE = re.compile(r'freezedetect\.freeze_(start|end): (-?[\d.]+)')
+SILENCE_RE = re.compile(r'silence_(start|end): (-?[\d.]+)')
+
+
+def probe(path):
+    """Duration plus the first video and audio stream of a file"""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries',
+         'format=duration:stream=codec_type,codec_name,profile,level,width,height,pix_fmt,'
+         'sample_rate,channels',
+         '-of', 'json', path], capture_output=True, text=True, timeout=60)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"ffprobe failed on {path}")
+    data = json.loads(result.stdout)
+    streams = data.get('streams', [])
+    return {
+        'duration': float(data.get('format', {}).get('duration') or 0),
+        'video': next((s for s in streams if s.get('codec_type') == 'video'), None),
+        'audio': next((s for s in streams if s.get('codec_type') == 'audio'), None),
+    }
+
+
+def _pairs(events, duration):
+    """[(start, end)] from ordered start/end events; an open start runs to the end"""
+    intervals, start = [], None
+    for kind, t in events:
+        if kind == 'start':
+            start = max(t, 0.0)
+        elif start is not None:
+            intervals.append((start, t))
+            start = None
+    if start is not None:
+        intervals.append((start, duration))
+    return intervals
+
+
+def detect(path, info, min_seconds=MIN_SECONDS, silence_db=SILENCE_DB, on_progress=None):
+    """Frozen-video and silent-audio intervals, from one decoding pass.
+
+    The detectors' log lines are parsed as FFmpeg prints them, so memory
+    use does not grow with the length of the file. silence is None for a
+    file without audio.
+    """
+    freeze, silence = [], []
+
+    def on_log(line):
+        match = FREEZE_RE.search(line)
+        if match:
+            freeze.append((match.group(1), float(match.group(2))))
+            return
+        match = SILENCE_RE.search(line)
+        if match:
+            silence.append((match.group(1), float(match.group(2))))
+
+    # Frozen frames look the same at any size; shrink first to keep this cheap
+    cmd = ['ffmpeg', '-hide_banner', '-i', path, '-map', '0:v:0',
+           '-vf', f'scale=320:-2,freezedetect=n={FREEZE_NOISE}:d={min_seconds}']
+    if info['audio']:
+        cmd.extend(['-map', '0:a:0', '-af', f'silencedetect=n={silence_db}dB:d={min_seconds}'])
+    cmd.extend(['-f', 'null', '-'])
+
+    proc = FFmpegProcess(cmd, on_progress=on_progress, on_log=on_log, log_lines=50).start()
+    proc.wait()
+    if proc.returncode != 0:
+        raise RuntimeError(f"Detection failed:\n{proc.log_tail(10)}")
+    return {
+        'freeze': _pairs(freeze, info['duration']),
+        'silence': _pairs(silence, info['duration']) if info['audio'] else None,
+    }
+
+
+def intersect(a, b):
+    """Overlaps of two sorted interval lists"""
+    result, i, j = [], 0, 0
+    while i < len(a) and j < len(b):
+        start, end = max(a[i][0], b[j][0]), min(a[i][1], b[j][1])
+        if start < end:
+            result.append((start, end))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def dead_air(detected, min_seconds=MIN_SECONDS, padding=PADDING):
+    """Intervals to cut: frozen and silent at once, minus padding at both ends"""
+    intervals = detected['freeze']
+    if detected['silence'] is not None:
+        intervals = intersect(intervals, detected['silence'])
+    return [(round(s + padding, 3), round(e - padding, 3)) for s, e in intervals
+            if e - s >= min_seconds and e - s > 2 * padding]
+
+
+def keyframes(path):
+    """Video keyframe times, read from packet flags without decoding"""
+    proc = subprocess.Popen(
+        ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+         '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', path],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    times = []
+    for line in proc.stdout:
+        pts, _, flags = line.strip().partition(',')
+        if 'K' in flags and pts not in ('', 'N/A'):
+            times.append(float(pts))
+    _, errors = proc.communicate()
+    if proc.returncode != 0:
+        raise RuntimeError(errors.strip() or f"ffprobe failed on {path}")
+    return sorted(times)
+
+
+def plan(duration, cuts, keyframe_times):
+    """Pieces to keep: re-encode from each cut to the next keyframe, copy the rest"""
+    keep, position = [], 0.0
+    for start, end in cuts:
+        if start > position:
+            keep.append((position, start))
+        position = max(position, end)
+    if position < duration:
+        keep.append((position, duration))
+
+    pieces = []
+    for start, end in keep:
+        i = bisect.bisect_left(keyframe_times, start - SEEK_SLACK)
+        key = keyframe_times[i] if i < len(keyframe_times) else None
+        if key is None or key >= end:
+            pieces.append({'start': start, 'end': end, 'copy': False})
+            continue
+        if key - start > SEEK_SLACK:
+            pieces.append({'start': start, 'end': key, 'copy': False})
+        pieces.append({'start': key, 'end': end, 'copy': True})
+    return pieces
+
+
+def x264_profile(video):
+    """libx264 -profile:v for the source's H.264 profile, None if it has no equivalent"""
+    return X264_PROFILES.get((video.get('profile') or '').lower())
+
+
+def reencode_args(video):
+    """Encoder settings for re-encoded pieces, matching the source's profile and level"""
+    args = REENCODE + ['-profile:v', x264_profile(video)]
+    level = int(video.get('level') or 0)
+    if level > 0:
+        args.extend(['-level', f"{level / 10:g}"])
+    return args + ['-pix_fmt', video.get('pix_fmt') or 'yuv420p']
+
+
+def piece_command(path, piece, info, output):
+    """Write one piece as MPEG-TS, which carries codec headers in-band so copied
+    and re-encoded pieces join cleanly.
+
+    Re-encoded pieces keep the source's profile and level, but their own
+    sequence and picture parameter sets. The joined MP4's avcC describes the
+    first piece and later ones switch in-band, which FFmpeg-based players
+    (VLC, mpv, ffplay) follow; strict avc1 decoders may not.
+    """
+    start = piece['start'] + (SEEK_SLACK if piece['copy'] else 0)
+    cmd = ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error',
+           '-ss', f"{start:.6f}", '-i', path, '-t', f"{piece['end'] - piece['start']:.6f}",
+           '-map', '0:v:0', '-map', '0:a:0?']
+    if piece['copy']:
+        cmd.extend(['-c', 'copy'])
+    else:
+        video, audio = info['video'], info['audio']
+        cmd.extend(reencode_args(video))
+        if audio:
+            cmd.extend(['-c:a', 'aac', '-b:a', '192k', '-ar', str(audio.get('sample_rate') or 48000),
+                        '-ac', str(audio.get('channels') or 2)])
+    cmd.extend(['-f', 'mpegts', output])
+    return cmd
+
+
+def render(path, pieces, info, output, on_piece=None):
+    """Write the kept pieces and join them into output.
+
+    All pieces stay on disk until the join, about one more copy of the
+    result, so they are written next to the output rather than to the
+    (often RAM-backed) temp folder.
+    """
+    work_dir = tempfile.mkdtemp(prefix='.dead_air_', dir=os.path.dirname(os.path.abspath(output)))
+    try:
+        list_file = os.path.join(work_dir, 'pieces.txt')
+        with open(list_file, 'w', encoding='utf-8') as f:
+            for n, piece in enumerate(pieces):
+                piece_file = os.path.join(work_dir, f'piece_{n:05d}.ts')
+                result = subprocess.run(piece_command(path, piece, info, piece_file),
+                                        capture_output=True, text=True)
+                if result.returncode != 0:
+                    raise RuntimeError(f"Piece {n} failed: {result.stderr[-1000:]}")
+                f.write(f"file '{piece_file}'\n")
+                if on_piece:
+                    on_piece(n, piece)
+
+        result = subprocess.run(
+            ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error',
+             '-f', 'concat', '-safe', '0', '-i', list_file,
+             '-c', 'copy', '-movflags', '+faststart', output],
+            capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Join failed: {result.stderr[-1000:]}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def full_reencode(path, cuts, info, output):
+    """The same cut as one filter-graph re-encode (for comparison or non-H.264 input).
+
+    Frames keep their own timestamps, moved back by the length of the cuts
+    before them, so variable frame rate recordings (static frames skipped)
+    keep their timing and their audio sync.
+    """
+    cut = '+'.join(f'between(t,{s},{e})' for s, e in cuts) or '0'
+    shift = '+'.join(f'{e - s:.6f}*gte(T,{e})' for s, e in cuts) or '0'
+    cmd = ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error', '-i', path,
+           '-vf', f"select='not({cut})',setpts='PTS-STARTPTS-({shift})/TB'"]
+    if info['audio']:
+        cmd.extend(['-af', f"aselect='not({cut})',asetpts='PTS-STARTPTS-({shift})/TB'",
+                    '-c:a', 'aac', '-b:a', '192k'])
+    # MP4 would otherwise fill the gaps of a VFR recording with duplicates
+    cmd.extend(REENCODE + ['-pix_fmt', info['video'].get('pix_fmt') or 'yuv420p',
+                           '-fps_mode', 'vfr', output])
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Re-encode failed: {result.stderr[-1000:]}")
+
+
+def tighten(path, output=None, min_seconds=MIN_SECONDS, silence_db=SILENCE_DB,
+            padding=PADDING, dry_run=False, log=print):
+    """Detect dead air in a recording and write a version without it.
+
+    Returns a report dict: the cut intervals, seconds removed and how much
+    of the result had to be re-encoded.
+    """
+    info = probe(path)
+    if not info['video']:
+        raise ValueError(f"No video stream in {path}")
+    output = output or f"{os.path.splitext(path)[0]}_tight.mp4"
+
+    started = time.time()
+
+    def progress(stats):
+        if info['duration']:
+            log(f"\r  scanning {min(stats.out_time / info['duration'], 1) * 100:5.1f}%",
+                end='', flush=True)
+
+    detected = detect(path, info, min_seconds, silence_db, on_progress=progress)
+    log("")
+    cuts = dead_air(detected, min_seconds, padding)
+    detect_time = time.time() - started
+
+    removed = sum(e - s for s, e in cuts)
+    report = {
+        'input': path,
+        'output': None if dry_run or not cuts else output,
+        'duration': round(info['duration'], 2),
+        'intervals': cuts,
+        'removed_seconds': round(removed, 2),
+        'output_seconds': round(info['duration'] - removed, 2),
+        'detect_time': round(detect_time, 2),
+    }
+    if dry_run or not cuts:
+        return report
+
+    started = time.time()
+    if info['video'].get('codec_name') == 'h264' and x264_profile(info['video']):
+        pieces = plan(info['duration'], cuts, keyframes(path))
+        render(path, pieces, info, output,
+               on_piece=lambda n, p: log(f"\r  writing piece {n + 1}/{len(pieces)}",
+                                         end='', flush=True))
+        log("")
+        report['pieces'] = len(pieces)
+        report['reencoded_seconds'] = round(sum(p['end'] - p['start'] for p in pieces
+                                                if not p['copy']), 2)
+    else:
+        # Re-encoded pieces could not be joined to copied ones of another codec
+        # or of a profile x264 cannot produce
+        full_reencode(path, cuts, info, output)
+        report['pieces'] = 1
+        report['reencoded_seconds'] = report['output_seconds']
+    report['render_time'] = round(time.time() - started, 2)
+    return report
+
+
+def self_test(log=print):
+    """Tighten a generated recording and decode the result.
+
+    The source is 4 s of moving, loud video, 6 s frozen and silent, and 4 s
+    moving again, with 2 s GOPs so a cut lands mid-GOP and a piece is
+    re-encoded. Passes when the tightened file decodes without errors, is as
+    long as the report says and keeps the source's profile and level.
+    """
+    work_dir = tempfile.mkdtemp(prefix='dead_air_test_')
+    source = os.path.join(work_dir, 'source.mp4')
+    graph = ("testsrc2=s=640x360:r=30:d=4[v0];color=gray:s=640x360:r=30:d=6[v1];"
+             "testsrc2=s=640x360:r=30:d=4[v2];"
+             "sine=f=440:r=48000:d=4,aformat=channel_layouts=stereo[a0];"
+             "anullsrc=r=48000:cl=stereo,atrim=duration=6[a1];"
+             "sine=f=660:r=48000:d=4,aformat=channel_layouts=stereo[a2];"
+             "[v0][a0][v1][a1][v2][a2]concat=n=3:v=1:a=1[v][a]")
+    try:
+        # Main@3.1 rather than x264's default High, so a mismatch shows
+        result = subprocess.run(
+            ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error', '-filter_complex', graph,
+             '-map', '[v]', '-map', '[a]', '-c:v', 'libx264', '-preset', 'veryfast',
+             '-profile:v', 'main', '-level', '3.1', '-g', '60', '-pix_fmt', 'yuv420p',
+             '-c:a', 'aac', '-b:a', '128k', source], capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Could not generate the test recording: {result.stderr[-1000:]}")
+
+        report = tighten(source, log=lambda *a, **k: None)
+        if not report['output']:
+            raise RuntimeError("No dead air found in the test recording")
+        log(f"Cut {report['intervals']}, {report['reencoded_seconds']:.2f}s re-encoded "
+            f"in {report['pieces']} piece(s)")
+
+        proc = FFmpegProcess(['ffmpeg', '-v', 'error', '-i', report['output'],
+                              '-f', 'null', '-']).start()
+        proc.wait()
+        errors = proc.log_tail(10)
+        decoded = proc.latest.out_time
+        before, after = probe(source)['video'], probe(report['output'])['video']
+        checks = [
+            ("decodes without errors", proc.returncode == 0 and not errors,
+             errors or f"exit code {proc.returncode}"),
+            ("length", abs(decoded - report['output_seconds']) <= SELF_TEST_TOLERANCE,
+             f"{decoded:.2f}s decoded, {report['output_seconds']:.2f}s expected"),
+            ("profile and level",
+             (after.get('profile'), after.get('level')) == (before.get('profile'), before.get('level')),
+             f"{after.get('profile')} @ {after.get('level')}, "
+             f"source {before.get('profile')} @ {before.get('level')}"),
+        ]
+        for name, ok, detail in checks:
+            log(f"{'✓' if ok else '✗'} {name}: {detail}")
+        return all(ok for _, ok, _ in checks)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cut silent, frozen stretches out of a recording")
+    parser.add_argument('input', nargs='?')
+    parser.add_argument('-o', '--output', help="default: <input>_tight.mp4")
+    parser.add_argument('--min-seconds', type=float, default=MIN_SECONDS,
+                        help="shortest pause that is cut")
+    parser.add_argument('--silence-db', type=float, default=SILENCE_DB)
+    parser.add_argument('--padding', type=float, default=PADDING,
+                        help="seconds of each pause to keep on both sides")
+    parser.add_argument('--dry-run', action='store_true', help="only report the intervals")
+    parser.add_argument('--compare', action='store_true',
+                        help="also time a full re-encode of the same cut")
+    parser.add_argument('--json', action='store_true')
+    parser.add_argument('--self-test', action='store_true',
+                        help="cut a generated recording and check the result decodes cleanly")
+    args = parser.parse_args()
+
+    if args.self_test:
+        try:
+            passed = self_test()
+        except (RuntimeError, ValueError, OSError) as e:
+            print(f"✗ {e}")
+            passed = False
+        sys.exit(0 if passed else 1)
+    if not args.input:
+        parser.error("an input recording is required")
+
+    log = (lambda *a, **k: None) if args.json else print
+    try:
+        report = tighten(args.input, args.output, args.min_seconds, args.silence_db,
+                         args.padding, args.dry_run, log)
+        if args.compare and report['output']:
+            info = probe(args.input)
+            reference = f"{os.path.splitext(report['output'])[0]}_reencoded.mp4"
+            started = time.time()
+            full_reencode(args.input, report['intervals'], info, reference)
+            report['full_reencode_time'] = round(time.time() - started, 2)
+            os.remove(reference)
+    except (RuntimeError, ValueError, OSError) as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Found {len(report['intervals'])} dead-air interval(s):")
+    for start, end in report['intervals']:
+        print(f"  • {start:9.2f}s → {end:9.2f}s  ({end - start:.1f}s)")
+    print(f"Removed {report['removed_seconds']:.1f}s of {report['duration']:.1f}s "
+          f"({report['removed_seconds'] / max(report['duration'], 0.01) * 100:.0f}%), "
+          f"scan took {report['detect_time']:.1f}s")
+    if report['output']:
+        print(f"✓ Saved {report['output']}: {report['reencoded_seconds']:.1f}s re-encoded "
+              f"in {report['pieces']} piece(s), written in {report['render_time']:.1f}s")
+        if 'full_reencode_time' in report:
+            print(f"  A full re-encode took {report['full_reencode_time']:.1f}s "
+                  f"({report['render_time'] / max(report['full_reencode_time'], 0.01) * 100:.0f}% "
+                  f"of that)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Desktop Discovery
+Window and monitor enumeration for the GUIs, safe to run on a worker thread
+"""
+
+import os
+import subprocess
+import sys
+import threading
+
+from multi_monitor import detect_x11_monitors
+
+WINDOWS_SCRIPT = ('Get-Process | Where-Object {$_.MainWindowTitle -ne ""} | '
+                  'Select-Object -ExpandProperty MainWindowTitle')
+
+WINDOW_RECT_SCRIPT = '''
+Add-Type @"
+using System;
+using System.Runtime.InteropServices;
+public struct RECT { public int Left; public int Top; public int Right; public int Bottom; }
+public class User32 { [DllImport("user32.dll")] public static extern bool GetWindowRect(IntPtr hWnd, out RECT rect); }
+"@
+$rect = New-Object RECT
+foreach ($p in Get-Process | Where-Object {$_.MainWindowTitle -eq $env:WINDOW_TITLE}) {
+    [User32]::GetWindowRect($p.MainWindowHandle, [ref]$rect) | Out-Null
+    Write-Output "$($rect.Left)|$($rect.Top)|$($rect.Right - $rect.Left)|$($rect.Bottom - $rect.Top)"
+    break
+}
+'''
+
+MONITORS_SCRIPT = '''
+Add-Type -AssemblyName System.Windows.Forms
+$screens = [System.Windows.Forms.Screen]::AllScreens
+$index = 0
+foreach ($screen in $screens) {
+    $index++
+    $primary = if ($screen.Primary) { " (PRIMARY)" } else { "" }
+    Write-Output "Monitor $index$primary|$($screen.Bounds.X)|$($screen.Bounds.Y)|$($screen.Bounds.Width)|$($screen.Bounds.Height)"
+}
+'''
+
+
+def list_windows(timeout=10):
+    """Titles of visible top-level windows (PowerShell; wmctrl on Linux)"""
+    if sys.platform.startswith('win'):
+        result = subprocess.run(['powershell', '-Command', WINDOWS_SCRIPT],
+                                capture_output=True, text=True, timeout=timeout)
+        return [w.strip() for w in result.stdout.split('\n') if w.strip()]
+    try:
+        result = subprocess.run(['wmctrl', '-l'], capture_output=True, text=True,
+                                timeout=timeout)
+    except FileNotFoundError:
+        return []
+    # "0x03a00007  0 host Title with spaces"
+    return [parts[3] for parts in (line.split(None, 3) for line in result.stdout.splitlines())
+            if len(parts) == 4]
+
+
+def window_rect(title, timeout=10):
+    """Screen rectangle of the window with this exact title, None if not found"""
+    if sys.platform.startswith('win'):
+        # Title via the environment, so quotes in it can't break the script
+        result = subprocess.run(['powershell', '-Command', WINDOW_RECT_SCRIPT],
+                                capture_output=True, text=True, timeout=timeout,
+                                env=dict(os.environ, WINDOW_TITLE=title))
+        lines = result.stdout.split()
+    else:
+        try:
+            result = subprocess.run(['wmctrl', '-lG'], capture_output=True, text=True,
+                                    timeout=timeout)
+        except FileNotFoundError:
+            return None
+        # "0x03a00007  0 x y w h host Title with spaces"
+        lines = ['|'.join(parts[2:6]) for parts in
+                 (line.split(None, 7) for line in result.stdout.splitlines())
+                 if len(parts) == 8 and parts[7] == title]
+    for line in lines:
+        parts = line.strip().split('|')
+        if len(parts) == 4:
+            x, y, w, h = (int(v) for v in parts)
+            return {'x': x, 'y': y, 'width': w, 'height': h}
+    return None
+
+
+def detect_monitors(timeout=10):
+    """Monitor geometry dicts (PowerShell on Windows, xrandr elsewhere)"""
+    if not sys.platform.startswith('win'):
+        return detect_x11_monitors()
+
+    result = subprocess.run(['powershell', '-Command', MONITORS_SCRIPT],
+                            capture_output=True, text=True, timeout=timeout)
+    monitors = []
+    for line in result.stdout.strip().split('\n'):
+        parts = line.strip().split('|')
+        if len(parts) == 5:
+            monitors.append({
+                'name': parts[0],
+                'x': int(parts[1]),
+                'y': int(parts[2]),
+                'width': int(parts[3]),
+                'height': int(parts[4])
+            })
+    return monitors
+
+
+def run_async(func, on_done, schedule):
+    """Run func() on a worker thread and hand (result, error) back.
+
+    schedule is the GUI's root.after, so on_done(result, error) always runs
+    on the Tk thread and may touch widgets.
+    """
+    def worker():
+        try:
+            result, error = func(), None
+        except Exception as e:
+            result, error = None, e
+        schedule(0, on_done, result, error)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    print("Monitors:")
+    for m in detect_monitors():
+        print(f"  • {m['name']}: {m['width']}x{m['height']} at {m['x']},{m['y']}")
+    print("\nWindows:")
+    for title in list_windows():
+        print(f"  • {title}")
+
+
+if __name__ == "__main__":
+    main()
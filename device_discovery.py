@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Audio Device Discovery
+One place to enumerate capture devices, with pluggable backends and a TTL cache
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+CACHE_PATH = os.path.join(os.path.expanduser('~'), '.screen_recorder', 'devices.json')
+DEFAULT_TTL = 300  # seconds before a background rescan is started
+
+LOOPBACK_HINTS = ('stereo mix', 'wave out', 'loopback', 'what u hear', 'monitor', 'cable output')
+MIC_HINTS = ('microphone', 'mic', 'headset', 'line in')
+
+
+class AudioDevice:
+    """An audio capture device as FFmpeg sees it"""
+
+    def __init__(self, name, backend, alt_name=None, description=None):
+        self.name = name
+        self.backend = backend
+        self.alt_name = alt_name
+        self.description = description or name
+
+    def __repr__(self):
+        return f"AudioDevice({self.name!r}, {self.backend!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, AudioDevice) and self.to_dict() == other.to_dict()
+
+    @property
+    def is_loopback(self):
+        text = f"{self.name} {self.description}".lower()
+        return any(hint in text for hint in LOOPBACK_HINTS)
+
+    @property
+    def is_microphone(self):
+        text = f"{self.name} {self.description}".lower()
+        return not self.is_loopback and any(hint in text for hint in MIC_HINTS)
+
+    def input_args(self):
+        """FFmpeg input arguments for recording from this device"""
+        return get_backend(self.backend).input_args(self.name)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'backend': self.backend,
+            'alt_name': self.alt_name,
+            'description': self.description,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], data['backend'], data.get('alt_name'), data.get('description'))
+
+
+def parse_dshow_output(text):
+    """Parse 'ffmpeg -list_devices true -f dshow' output (old and new FFmpeg formats)"""
+    devices = []
+    section = None
+    last = None  # device the next "Alternative name" line belongs to
+    for line in text.split('\n'):
+        if 'DirectShow audio devices' in line:
+            section = 'audio'
+            continue
+        if 'DirectShow video devices' in line:
+            section = 'video'
+            continue
+        start = line.find('"') + 1
+        end = line.find('"', start)
+        if start <= 0 or end <= start:
+            continue
+        value = line[start:end]
+        if 'Alternative name' in line:
+            if last is not None:
+                last.alt_name = value
+            continue
+        # New FFmpeg tags each device; old FFmpeg groups them under a header
+        if '(audio)' in line or (section == 'audio' and '(video)' not in line):
+            last = AudioDevice(value, 'dshow')
+            devices.append(last)
+        else:
+            last = None
+    return devices
+
+
+class DShowBackend:
+    """DirectShow devices on Windows"""
+    name = 'dshow'
+
+    def scan(self, timeout=10):
+        cmd = ['ffmpeg', '-hide_banner', '-list_devices', 'true', '-f', 'dshow', '-i', 'dummy']
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout,
+                                errors='replace')
+        return parse_dshow_output(result.stderr + result.stdout)
+
+    def input_args(self, name):
+        return ['-f', 'dshow', '-i', f'audio={name}']
+
+
+class PulseBackend:
+    """PulseAudio / PipeWire sources on Linux (monitor sources are loopback)"""
+    name = 'pulse'
+
+    def scan(self, timeout=10):
+        result = subprocess.run(['pactl', 'list', 'short', 'sources'],
+                                capture_output=True, text=True, timeout=timeout)
+        devices = []
+        for line in result.stdout.splitlines():
+            parts = line.split('\t')
+            if len(parts) >= 2:
+                devices.append(AudioDevice(parts[1], 'pulse', description=parts[1]))
+        return devices
+
+    def input_args(self, name):
+        return ['-f', 'pulse', '-i', name]
+
+
+class AlsaBackend:
+    """ALSA PCM capture devices on Linux"""
+    name = 'alsa'
+
+    def scan(self, timeout=10):
+        result = subprocess.run(['arecord', '-L'], capture_output=True, text=True,
+                                timeout=timeout)
+        devices = []
+        for line in result.stdout.splitlines():
+            if not line.strip():
+                continue
+            if line.startswith((' ', '\t')):
+                # Indented lines describe the device above
+                if devices and devices[-1].description == devices[-1].name:
+                    devices[-1].description = line.strip()
+            elif line.strip() != 'null':
+                devices.append(AudioDevice(line.strip(), 'alsa'))
+        return devices
+
+    def input_args(self, name):
+        return ['-f', 'alsa', '-i', name]
+
+
+BACKENDS = {}
+
+
+def register_backend(backend):
+    """Add or replace a discovery backend"""
+    BACKENDS[backend.name] = backend
+
+
+for _backend in (DShowBackend(), PulseBackend(), AlsaBackend()):
+    register_backend(_backend)
+
+
+def get_backend(name=None):
+    return BACKENDS[name or default_backend_name()]
+
+
+def default_backend_name():
+    """dshow on Windows, pulse if pactl is available, otherwise alsa"""
+    if sys.platform.startswith('win'):
+        return 'dshow'
+    if shutil.which('pactl'):
+        return 'pulse'
+    return 'alsa'
+
+
+class DeviceCache:
+    """In-memory + on-disk device list that refreshes itself in the background.
+
+    get() always returns immediately with whatever is cached; when the
+    cache is older than ttl (or a refresh is forced) a scan runs on a worker
+    thread and on_update(devices) / on_error(exception) are called from it.
+    """
+
+    def __init__(self, backend=None, ttl=DEFAULT_TTL, path=CACHE_PATH):
+        self.backend = get_backend(backend)
+        self.ttl = ttl
+        self.path = path
+        self.devices = None
+        self.scanned_at = 0
+        self._lock = threading.Lock()
+        self._scanning = None
+        self._callbacks = []
+
+    def _load_disk(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                entry = json.load(f).get(self.backend.name)
+        except (OSError, ValueError):
+            return
+        if entry:
+            self.devices = [AudioDevice.from_dict(d) for d in entry['devices']]
+            self.scanned_at = entry['scanned']
+
+    def _save_disk(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        data[self.backend.name] = {
+            'scanned': self.scanned_at,
+            'devices': [d.to_dict() for d in self.devices],
+        }
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # cache is an optimisation only
+
+    @property
+    def stale(self):
+        return time.time() - self.scanned_at > self.ttl
+
+    def scan(self, timeout=10):
+        """Scan synchronously and update the cache"""
+        devices = self.backend.scan(timeout=timeout)
+        with self._lock:
+            self.devices = devices
+            self.scanned_at = time.time()
+        self._save_disk()
+        return devices
+
+    def get(self, on_update=None, on_error=None, force_refresh=False):
+        """Cached devices right away ([] if never scanned), refreshing if stale"""
+        with self._lock:
+            if self.devices is None:
+                self._load_disk()
+            devices = list(self.devices or [])
+            needs_scan = force_refresh or self.devices is None or self.stale
+        if needs_scan:
+            self.refresh_async(on_update, on_error)
+        return devices
+
+    def refresh_async(self, on_update=None, on_error=None):
+        """Start a background scan; concurrent requests share one scan"""
+        with self._lock:
+            self._callbacks.append((on_update, on_error))
+            if self._scanning and self._scanning.is_alive():
+                return self._scanning
+            self._scanning = threading.Thread(target=self._scan_worker, daemon=True)
+            self._scanning.start()
+            return self._scanning
+
+    def _scan_worker(self):
+        try:
+            devices = self.scan()
+            error = None
+        except Exception as e:
+            devices, error = None, e
+        with self._lock:
+            callbacks, self._callbacks = self._callbacks, []
+        for on_update, on_error in callbacks:
+            if error is None and on_update:
+                on_update(devices)
+            elif error is not None and on_error:
+                on_error(error)
+
+
+_caches = {}
+
+
+def get_cache(backend=None):
+    """Shared DeviceCache for a backend"""
+    name = get_backend(backend).name
+    if name not in _caches:
+        _caches[name] = DeviceCache(name)
+    return _caches[name]
+
+
+def list_audio_devices(backend=None, use_cache=True, timeout=10):
+    """Synchronous device list for scripts; returns the cache if it is fresh"""
+    cache = get_cache(backend)
+    if use_cache:
+        devices = cache.get()
+        if devices and not cache.stale:
+            return devices
+    return cache.scan(timeout=timeout)
+
+
+def split_system_and_mic(devices):
+    """(system, microphone) candidate lists; everything if nothing matches"""
+    system = [d for d in devices if d.is_loopback] or list(devices)
+    mics = [d for d in devices if d.is_microphone] or list(devices)
+    return system, mics
+
+
+def main():
+    backend = sys.argv[1] if len(sys.argv) > 1 else None
+    print(f"Scanning {get_backend(backend).name} audio devices...\n")
+    try:
+        devices = list_audio_devices(backend, use_cache=False)
+    except FileNotFoundError as e:
+        print(f"✗ Tool not found: {e}")
+        sys.exit(1)
+    for device in devices:
+        kind = 'loopback' if device.is_loopback else 'mic' if device.is_microphone else 'other'
+        print(f"  • {device.name}  [{kind}]")
+        if device.description != device.name:
+            print(f"      {device.description}")
+    print(f"\n✓ {len(devices)} device(s), cached in {CACHE_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,22 @@
 """
 Complete Recording Diagnostic Tool
 Tests everything and creates working recordings
+
+Independent checks run in parallel; use --json report.json for fleet health checks.
 """
 
 import subprocess
 import sys
 import os
+import json
+import platform
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
 
+from device_discovery import list_audio_devices as scan_audio_devices
+from verify_recordings import verify_file
+
 def print_header(text):
     print("\n" + "="*70)
     print(f"  {text}")
@@ -17,33 +26,25 @@ def print_header(text):
 def run_command(cmd, timeout=30):
     """Run command and return result"""
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, 
-                              timeout=timeout, stderr=subprocess.STDOUT)
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              text=True, errors='replace', timeout=timeout)
         return result.stdout, result.returncode
     except subprocess.TimeoutExpired:
         return "TIMEOUT", -1
     except Exception as e:
         return f"ERROR: {str(e)}", -1
 
-def test_ffmpeg():
-    """Test FFmpeg"""
-    print_header("1. Testing FFmpeg")
+# Probes run concurrently: they only gather data and never print.
+
+def probe_ffmpeg():
+    """Check that FFmpeg runs"""
     output, code = run_command(['ffmpeg', '-version'], timeout=5)
-    
     if code == 0:
-        print("✓ FFmpeg is working!")
-        version = output.split('\n')[0]
-        print(f"  {version}")
-        return True
-    else:
-        print("✗ FFmpeg NOT working!")
-        print(f"  Error: {output}")
-        return False
+        return {'ok': True, 'version': output.split('\n')[0]}
+    return {'ok': False, 'error': output}
 
-def get_screen_info():
+def probe_monitors():
     """Get information about all monitors"""
-    print_header("2. Detecting Monitors")
-    
     # Use PowerShell to get screen info
     ps_cmd = '''
     Add-Type -AssemblyName System.Windows.Forms
@@ -79,6 +80,113 @@ def get_screen_info():
             monitors.append(current.copy())
             current = {}
     
+    # No monitors is not fatal: recording falls back to the full desktop
+    return {'ok': True, 'monitors': monitors}
+
+def probe_audio():
+    """List all audio devices"""
+    devices = scan_audio_devices(use_cache=False)
+    return {'ok': bool(devices), 'devices': [d.name for d in devices]}
+
+def probe_recording():
+    """Test simple 3-second recording"""
+    output = f"test_{datetime.now().strftime('%H%M%S')}.mp4"
+    
+    cmd = [
+        'ffmpeg',
+        '-f', 'gdigrab',
+        '-framerate', '15',
+        '-t', '3',
+        '-i', 'desktop',
+        '-c:v', 'libx264',
+        '-preset', 'ultrafast',
+        '-pix_fmt', 'yuv420p',
+        '-y',
+        output
+    ]
+    
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, 
+                              stderr=subprocess.PIPE, text=True, errors='replace')
+    try:
+        stdout, stderr = process.communicate(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        stdout, stderr = process.communicate()
+    
+    size = os.path.getsize(output) if os.path.exists(output) else 0
+    result = {'ok': size > 1000, 'file': output, 'size': size}
+    if not result['ok']:
+        result['error'] = '\n'.join(stderr.split('\n')[-30:])
+        return result
+    
+    # A file of the right size can still be unplayable
+    _, problems = verify_file(output, expected=3, tolerance=1)
+    if problems:
+        result.update(ok=False, error='\n'.join(problems))
+    return result
+
+# name: (probe, probes it depends on)
+PROBES = {
+    'ffmpeg': (probe_ffmpeg, []),
+    'monitors': (probe_monitors, []),
+    'audio': (probe_audio, ['ffmpeg']),
+    'recording': (probe_recording, ['ffmpeg']),
+}
+
+def timed(probe):
+    """Run one probe, never raising, and record how long it took"""
+    started = time.perf_counter()
+    try:
+        result = probe()
+    except Exception as e:
+        result = {'ok': False, 'error': str(e)}
+    result['seconds'] = round(time.perf_counter() - started, 3)
+    return result
+
+def run_probes(probes=PROBES, max_workers=4):
+    """Run probes on a thread pool, each one as soon as its dependencies passed"""
+    results = {}
+    pending = dict(probes)
+    running = {}
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for name, (probe, deps) in list(pending.items()):
+                if not all(dep in results for dep in deps):
+                    continue
+                del pending[name]
+                failed = [dep for dep in deps if not results[dep]['ok']]
+                if failed:
+                    results[name] = {'ok': False, 'skipped': True, 'seconds': 0,
+                                     'error': f"skipped, needs {', '.join(failed)}"}
+                else:
+                    running[pool.submit(timed, probe)] = name
+            
+            if not running:
+                # Anything left depends on an unknown probe or a cycle
+                for name in pending:
+                    results[name] = {'ok': False, 'skipped': True, 'seconds': 0,
+                                     'error': "unresolvable dependencies"}
+                break
+            
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+    
+    return {name: results[name] for name in probes}
+
+def print_ffmpeg(result):
+    print_header("1. Testing FFmpeg")
+    if result['ok']:
+        print("✓ FFmpeg is working!")
+        print(f"  {result['version']}")
+    else:
+        print("✗ FFmpeg NOT working!")
+        print(f"  Error: {result.get('error')}")
+
+def print_monitors(result):
+    print_header("2. Detecting Monitors")
+    monitors = result.get('monitors', [])
     if monitors:
         print(f"\n✓ Found {len(monitors)} monitor(s):\n")
         for i, mon in enumerate(monitors, 1):
@@ -89,79 +197,55 @@ def get_screen_info():
     else:
         print("✗ Could not detect monitors")
         print("  Defaulting to full desktop capture")
-    
-    return monitors
 
-def list_audio_devices():
-    """List all audio devices"""
+def print_audio(result):
     print_header("3. Detecting Audio Devices")
-    
-    cmd = ['ffmpeg', '-list_devices', 'true', '-f', 'dshow', '-i', 'dummy']
-    output, _ = run_command(cmd, timeout=10)
-    
-    audio_devices = []
+    audio_devices = result.get('devices', [])
     
     print("\n🔊 Audio Devices Found:\n")
-    for line in output.split('\n'):
-        if '(audio)' in line and '"' in line:
-            start = line.find('"') + 1
-            end = line.find('"', start)
-            if start > 0 and end > start:
-                device = line[start:end]
-                audio_devices.append(device)
-                print(f"  • {device}")
+    for device in audio_devices:
+        print(f"  • {device}")
     
-    if not audio_devices:
+    if result.get('skipped'):
+        print(f"  ✗ {result['error']}")
+    elif result.get('error'):
+        print(f"  ✗ Device scan failed: {result['error']}")
+    elif not audio_devices:
         print("  ✗ NO audio devices detected!")
         print("\n  Possible reasons:")
         print("    - Audio drivers not properly installed")
         print("    - Devices disabled in Windows Sound settings")
         print("    - Need to enable 'Stereo Mix' for system audio")
-    
-    return audio_devices
 
-def test_simple_recording():
-    """Test simple 3-second recording"""
+def print_recording(result):
     print_header("4. Test Recording (3 seconds, no audio)")
+    if result['ok']:
+        print(f"\n✓ SUCCESS! Test file created: {result['file']}")
+        print(f"  Size: {result['size']/1024:.1f} KB")
+        print(f"\n  Try playing: {result['file']}")
+        return
     
-    output = f"test_{datetime.now().strftime('%H%M%S')}.mp4"
-    
-    print("\nStarting 3-second test recording...")
-    print("Move your mouse to see if it's working...")
-    
-    cmd = [
-        'ffmpeg',
-        '-f', 'gdigrab',
-        '-framerate', '15',
-        '-t', '3',
-        '-i', 'desktop',
-        '-c:v', 'libx264',
-        '-preset', 'ultrafast',
-        '-pix_fmt', 'yuv420p',
-        '-y',
-        output
-    ]
-    
-    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, 
-                              stderr=subprocess.PIPE, text=True)
-    
-    stdout, stderr = process.communicate(timeout=10)
-    
-    if os.path.exists(output):
-        size = os.path.getsize(output)
-        if size > 1000:
-            print(f"\n✓ SUCCESS! Test file created: {output}")
-            print(f"  Size: {size/1024:.1f} KB")
-            print(f"\n  Try playing: {output}")
-            return True, output
-        else:
-            print(f"\n✗ File too small ({size} bytes)")
+    if result.get('skipped'):
+        print(f"\n✗ {result['error']}")
+    elif result.get('size'):
+        print(f"\n✗ File too small ({result['size']} bytes)")
     else:
         print("\n✗ File not created")
     
-    print("\nFFmpeg errors (last 30 lines):")
-    print('\n'.join(stderr.split('\n')[-30:]))
-    return False, None
+    if result.get('error') and not result.get('skipped'):
+        print("\nFFmpeg errors (last 30 lines):")
+        print(result['error'])
+
+def build_report(results, total_seconds):
+    """Machine-readable summary for fleet-wide health checks"""
+    return {
+        'host': platform.node(),
+        'platform': platform.platform(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'ok': all(r['ok'] for r in results.values()),
+        'total_seconds': round(total_seconds, 3),
+        'probes': results,
+    }
 
 def test_monitor_recording(monitors):
     """Test recording from specific monitor"""
@@ -218,7 +302,19 @@ def test_monitor_recording(monitors):
         print(f"Error: {e}")
 
 def main():
-    print("""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Screen recorder diagnostics")
+    parser.add_argument('--json', metavar='PATH',
+                        help="write a JSON report to PATH ('-' for stdout); implies --batch")
+    parser.add_argument('--batch', action='store_true',
+                        help="no prompts (skip the interactive monitor test)")
+    args = parser.parse_args()
+    batch = args.batch or args.json is not None
+    quiet = args.json == '-'
+    
+    if not quiet:
+        print("""
     ╔═══════════════════════════════════════════════════════════════╗
     ║                                                               ║
     ║         SCREEN RECORDER DIAGNOSTIC TOOL                       ║
@@ -226,21 +322,36 @@ def main():
     ║                                                               ║
     ╚═══════════════════════════════════════════════════════════════╝
     """)
+        print("Running all checks in parallel...")
     
-    # Test 1: FFmpeg
-    if not test_ffmpeg():
-        print("\n❌ Cannot continue without FFmpeg")
-        input("\nPress ENTER to exit...")
-        return
+    started = time.perf_counter()
+    results = run_probes()
+    report = build_report(results, time.perf_counter() - started)
     
-    # Test 2: Monitors
-    monitors = get_screen_info()
+    if args.json:
+        text = json.dumps(report, indent=2)
+        if quiet:
+            print(text)
+        else:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                f.write(text)
+    if quiet:
+        sys.exit(0 if report['ok'] else 1)
     
-    # Test 3: Audio
-    audio_devices = list_audio_devices()
+    print_ffmpeg(results['ffmpeg'])
+    print_monitors(results['monitors'])
+    print_audio(results['audio'])
+    print_recording(results['recording'])
     
-    # Test 4: Simple recording
-    success, filename = test_simple_recording()
+    monitors = results['monitors'].get('monitors', [])
+    audio_devices = results['audio'].get('devices', [])
+    success = results['recording']['ok']
+    
+    if not results['ffmpeg']['ok']:
+        print("\n❌ Cannot continue without FFmpeg")
+        if not batch:
+            input("\nPress ENTER to exit...")
+        sys.exit(1)
     
     if not success:
         print("\n❌ Basic recording failed!")
@@ -248,11 +359,12 @@ def main():
         print("  1. FFmpeg cannot access your screen")
         print("  2. Missing codecs")
         print("  3. Permission issues")
-        input("\nPress ENTER to exit...")
-        return
+        if not batch:
+            input("\nPress ENTER to exit...")
+        sys.exit(1)
     
-    # Test 5: Multi-monitor
-    if len(monitors) > 1:
+    # Test 5: Multi-monitor (interactive, so it runs after the parallel probes)
+    if len(monitors) > 1 and not batch:
         test_monitor_recording(monitors)
     
     # Summary
@@ -262,6 +374,13 @@ def main():
     print(f"{'✓' if audio_devices else '✗'} Audio: {len(audio_devices)} devices")
     print(f"{'✓' if success else '✗'} Recording: {'Working' if success else 'Failed'}")
     
+    print("\nTimings:")
+    for name, result in results.items():
+        print(f"  {name:<10} {result['seconds']:6.2f}s")
+    print(f"  {'total':<10} {report['total_seconds']:6.2f}s")
+    if args.json:
+        print(f"\nReport written to {args.json}")
+    
     if not audio_devices:
         print("\n⚠️  AUDIO ISSUE DETECTED:")
         print("  To enable audio recording:")
@@ -271,7 +390,8 @@ def main():
         print("  4. Enable 'Stereo Mix' or 'Microphone'")
     
     print("\n" + "="*70)
-    input("\nPress ENTER to exit...")
+    if not batch:
+        input("\nPress ENTER to exit...")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
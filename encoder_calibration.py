@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Encoder Auto-Calibration
+Benchmarks libx264 presets on a synthetic source and stores a per-machine profile
+"""
+
+import json
+import os
+import platform
+import sys
+import time
+
+from ffmpeg_progress import FFmpegProcess
+
+# Fastest first; slower presets compress better at the same CRF
+PRESETS = ['ultrafast', 'superfast', 'veryfast', 'faster', 'fast', 'medium', 'slow']
+CRFS = ['28', '23', '20', '18']
+HEADROOM = 1.5  # capture + encode must run this much faster than realtime
+
+PROFILE_DIR = os.path.join(os.path.expanduser('~'), '.screen_recorder')
+PROFILE_PATH = os.path.join(PROFILE_DIR, 'encoder_profile.json')
+_uncalibrated = set()  # sizes already reported as missing a calibration
+
+
+def profile_key(width, height, fps):
+    return f"{width}x{height}@{fps}"
+
+
+def measure(preset, crf, width, height, fps, duration=8):
+    """Encode a lavfi testsrc2 clip as fast as possible and measure speed and CPU"""
+    cmd = [
+        'ffmpeg', '-y',
+        '-f', 'lavfi', '-i', f'testsrc2=size={width}x{height}:rate={fps}',
+        '-t', str(duration),
+        '-c:v', 'libx264', '-preset', preset, '-crf', crf,
+        '-pix_fmt', 'yuv420p',
+        '-f', 'null', '-'
+    ]
+    cpu_before = os.times()
+    started = time.time()
+    proc = FFmpegProcess(cmd).start()
+    proc.wait()
+    wall = time.time() - started
+    cpu_after = os.times()
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"FFmpeg failed for {preset}/{crf}:\n{proc.log_tail(10)}")
+
+    # Child CPU times are not reported on Windows; keep None there
+    cpu = ((cpu_after.children_user - cpu_before.children_user) +
+           (cpu_after.children_system - cpu_before.children_system))
+    encoded = proc.latest.out_time or duration
+    return {
+        'preset': preset,
+        'crf': crf,
+        'speed': round(encoded / wall, 3) if wall else 0.0,
+        'wall_seconds': round(wall, 2),
+        'cpu_seconds': round(cpu, 2) if cpu > 0 else None,
+        'cpu_percent': round(100 * cpu / wall / (os.cpu_count() or 1), 1) if cpu > 0 else None,
+    }
+
+
+def calibrate(width, height, fps, duration=8, headroom=HEADROOM, crfs=CRFS,
+              presets=PRESETS, log=print):
+    """Find the slowest sustainable preset for each CRF.
+
+    Speed falls monotonically with slower presets, so each CRF is a binary
+    search over PRESETS rather than a full sweep.
+    """
+    results = []
+    best = {}
+    for crf in crfs:
+        lo, hi = 0, len(presets) - 1
+        chosen = None
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            result = measure(presets[mid], crf, width, height, fps, duration)
+            results.append(result)
+            ok = result['speed'] >= headroom
+            log(f"  {'✓' if ok else '✗'} crf {crf:>2} {presets[mid]:<10} "
+                f"{result['speed']:.2f}x")
+            if ok:
+                chosen = presets[mid]
+                lo = mid + 1
+            else:
+                hi = mid - 1
+        best[crf] = chosen or presets[0]
+
+    return {
+        'width': width,
+        'height': height,
+        'fps': fps,
+        'headroom': headroom,
+        'calibrated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'best_preset': best,
+        'results': results,
+    }
+
+
+def load_profiles(path=PROFILE_PATH):
+    """All calibrations for this machine, keyed by resolution@fps"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data.get(platform.node(), {})
+
+
+def save_profile(profile, path=PROFILE_PATH):
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    key = profile_key(profile['width'], profile['height'], profile['fps'])
+    data.setdefault(platform.node(), {})[key] = profile
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def choose_preset(crf, width=None, height=None, fps=30, default='ultrafast',
+                  max_preset=None, profiles=None):
+    """Best calibrated preset for a capture, or default when not calibrated.
+
+    Uses the smallest calibrated workload at least as heavy as the requested
+    one (the heaviest if the size is unknown), and never goes slower than
+    max_preset. A capture heavier than every calibrated workload gets
+    default, with a hint to calibrate at that size.
+    """
+    if profiles is None:
+        profiles = load_profiles()
+    candidates = [p for p in profiles.values() if str(crf) in p.get('best_preset', {})]
+    if not candidates:
+        return default
+
+    def load(p):
+        return p['width'] * p['height'] * float(p['fps'])
+
+    candidates.sort(key=load)
+    profile = candidates[-1]
+    if width and height:
+        wanted = int(width) * int(height) * float(fps)
+        heavier = [p for p in candidates if load(p) >= wanted]
+        if not heavier:
+            # A lighter workload's preset would be too slow here
+            key = profile_key(width, height, fps)
+            if key not in _uncalibrated:
+                _uncalibrated.add(key)
+                print(f"No encoder calibration for {key}, using '{default}'. Run: "
+                      f"python encoder_calibration.py --size {width}x{height} --fps {fps}",
+                      file=sys.stderr)
+            return default
+        profile = heavier[0]
+
+    preset = profile['best_preset'][str(crf)]
+    if max_preset in PRESETS and PRESETS.index(preset) > PRESETS.index(max_preset):
+        preset = max_preset
+    return preset
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Calibrate x264 presets for this machine")
+    parser.add_argument('--size', default='1920x1080', help="capture resolution, e.g. 3840x2160")
+    parser.add_argument('--fps', default='30')
+    parser.add_argument('--duration', type=int, default=8, help="seconds encoded per run")
+    parser.add_argument('--headroom', type=float, default=HEADROOM,
+                        help="required speed, e.g. 1.5 = 50%% spare")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    print(f"Calibrating {args.size} @ {args.fps} fps on {platform.node()} "
+          f"(need ≥{args.headroom:.2f}x)...")
+    try:
+        profile = calibrate(width, height, args.fps, args.duration, args.headroom)
+    except (RuntimeError, FileNotFoundError) as e:
+        print(f"✗ Calibration failed: {e}")
+        sys.exit(1)
+
+    save_profile(profile)
+    print("\nBest sustainable preset per CRF:")
+    for crf, preset in profile['best_preset'].items():
+        print(f"  CRF {crf}: {preset}")
+    print(f"\n✓ Saved to {PROFILE_PATH}")
+
+
+if __name__ == "__main__":
+    main()
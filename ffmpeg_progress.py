@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+FFmpeg Progress Monitor
+Runs FFmpeg with a machine-readable progress stream and drains its pipes on reader threads
+"""
+
+import subprocess
+import threading
+import time
+import sys
+from collections import deque
+
+PROGRESS_KEYS = {
+    'frame', 'fps', 'bitrate', 'total_size', 'out_time_us', 'out_time_ms',
+    'out_time', 'dup_frames', 'drop_frames', 'speed', 'progress',
+}
+
+
+def with_progress(cmd, pipe=1):
+    """Return cmd with '-progress pipe:N -nostats' inserted after the executable"""
+    return [cmd[0], '-progress', f'pipe:{pipe}', '-nostats'] + list(cmd[1:])
+
+
+def _number(value, default=0.0):
+    """Parse '2534.1kbits/s', '1.02x', 'N/A' style values"""
+    value = value.strip().rstrip('x')
+    for suffix in ('kbits/s', 'bits/s'):
+        if value.endswith(suffix):
+            value = value[:-len(suffix)]
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+class ProgressStats:
+    """One block of FFmpeg progress output"""
+
+    def __init__(self):
+        self.frame = 0
+        self.fps = 0.0
+        self.bitrate_kbps = 0.0
+        self.total_size = 0
+        self.out_time = 0.0
+        self.speed = 0.0
+        self.dup_frames = 0
+        self.drop_frames = 0
+        self.finished = False
+        self.quality = {}  # output file index → encoder quantizer of its first stream
+        self.timestamp = time.time()
+
+    @classmethod
+    def from_block(cls, block):
+        """Build stats from a dict of key=value pairs"""
+        stats = cls()
+        stats.frame = int(_number(block.get('frame', '0')))
+        stats.fps = _number(block.get('fps', '0'))
+        stats.bitrate_kbps = _number(block.get('bitrate', '0'))
+        stats.total_size = int(_number(block.get('total_size', '0')))
+        # out_time_ms is in microseconds too (long-standing FFmpeg quirk)
+        micros = block.get('out_time_us', block.get('out_time_ms', '0'))
+        stats.out_time = max(_number(micros), 0.0) / 1_000_000
+        stats.speed = _number(block.get('speed', '0'))
+        stats.dup_frames = int(_number(block.get('dup_frames', '0')))
+        stats.drop_frames = int(_number(block.get('drop_frames', '0')))
+        stats.finished = block.get('progress') == 'end'
+        for key, value in block.items():
+            # stream_<file>_<stream>_q, one per encoded stream
+            parts = key.split('_')
+            if len(parts) == 4 and parts[0] == 'stream' and parts[1].isdigit():
+                stats.quality.setdefault(int(parts[1]), _number(value))
+        return stats
+
+    def to_dict(self):
+        return {
+            'frame': self.frame,
+            'fps': self.fps,
+            'bitrate_kbps': self.bitrate_kbps,
+            'total_size': self.total_size,
+            'out_time': self.out_time,
+            'speed': self.speed,
+            'dup_frames': self.dup_frames,
+            'drop_frames': self.drop_frames,
+            'finished': self.finished,
+            'quality': self.quality,
+        }
+
+    def summary(self):
+        """Short one-line status for labels and consoles"""
+        return (f"{self.fps:.1f} fps | {self.speed:.2f}x | "
+                f"{self.bitrate_kbps:.0f} kbit/s | "
+                f"dropped {self.drop_frames} | dup {self.dup_frames}")
+
+
+class FFmpegProcess:
+    """Run an FFmpeg command and keep both of its output pipes drained.
+
+    on_progress(stats) is called from the reader thread for every progress
+    block, on_log(line) for every other line (e.g. filter output such as
+    silencedetect); on_exit(returncode) once the process has finished.
+    """
+
+    def __init__(self, cmd, on_progress=None, on_exit=None, progress_pipe=1,
+                 log_lines=200, popen_kwargs=None, on_log=None):
+        self.cmd = with_progress(cmd, progress_pipe)
+        self.on_progress = on_progress
+        self.on_log = on_log
+        self.on_exit = on_exit
+        self.progress_pipe = progress_pipe
+        self.popen_kwargs = popen_kwargs or {}
+        self.process = None
+        self.latest = ProgressStats()
+        self.history = deque(maxlen=600)
+        self.log = deque(maxlen=log_lines)
+        self.started_at = None
+        self._threads = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def start(self):
+        """Spawn FFmpeg and the reader threads"""
+        # With progress on stderr, stdout is left for the caller (e.g. raw frames)
+        kwargs = {
+            'stdin': subprocess.PIPE,
+            'stdout': subprocess.PIPE if self.progress_pipe == 1 else subprocess.DEVNULL,
+            'stderr': subprocess.PIPE,
+        }
+        kwargs.update(self.popen_kwargs)
+        self.process = subprocess.Popen(self.cmd, **kwargs)
+        self.started_at = time.time()
+
+        readers = [(self.process.stderr, self.progress_pipe == 2)]
+        if self.progress_pipe == 1:
+            readers.append((self.process.stdout, True))
+        for stream, parse_progress in readers:
+            thread = threading.Thread(target=self._drain,
+                                      args=(stream, parse_progress), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        threading.Thread(target=self._watch, daemon=True).start()
+        return self
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    @property
+    def returncode(self):
+        return self.process.returncode if self.process else None
+
+    def _drain(self, stream, parse_progress):
+        """Read a pipe until EOF, splitting progress blocks from log lines"""
+        block = {}
+        for raw in iter(stream.readline, b''):
+            line = raw.decode('utf-8', errors='replace').strip()
+            if not line:
+                continue
+            key, sep, value = line.partition('=')
+            if parse_progress and sep and (key in PROGRESS_KEYS or key.startswith('stream_')):
+                block[key] = value
+                if key == 'progress':
+                    self._publish(block)
+                    block = {}
+            else:
+                self.log.append(line)
+                if self.on_log:
+                    self.on_log(line)
+        stream.close()
+
+    def _publish(self, block):
+        stats = ProgressStats.from_block(block)
+        with self._lock:
+            self.latest = stats
+            self.history.append(stats)
+        if self.on_progress:
+            try:
+                self.on_progress(stats)
+            except Exception as e:
+                self.log.append(f"progress callback failed: {e}")
+
+    def _watch(self):
+        self.process.wait()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._done.set()
+        if self.on_exit:
+            self.on_exit(self.process.returncode)
+
+    def wait(self, timeout=None):
+        """Wait until FFmpeg exited and its pipes are drained"""
+        return self._done.wait(timeout)
+
+    def stop(self, timeout=5):
+        """Ask FFmpeg to finish with 'q', terminate if it does not comply"""
+        if not self.process:
+            return None
+        if self.running:
+            try:
+                self.process.stdin.write(b'q')
+                self.process.stdin.flush()
+                self.process.wait(timeout=timeout)
+            except Exception:
+                self.process.terminate()
+                try:
+                    self.process.wait(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+        self.wait(timeout=timeout)
+        return self.process.returncode
+
+    def log_tail(self, lines=30):
+        """Last lines FFmpeg wrote to stderr"""
+        return '\n'.join(list(self.log)[-lines:])
+
+
+def main():
+    """Soak test: encode a lavfi testsrc for a while and print live stats"""
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="FFmpeg progress soak test")
+    parser.add_argument('--duration', type=int, default=120, help="seconds to record")
+    parser.add_argument('--size', default='1920x1080')
+    parser.add_argument('--fps', default='30')
+    parser.add_argument('--output', default='progress_test.mp4')
+    args = parser.parse_args()
+
+    cmd = [
+        'ffmpeg', '-y',
+        '-re', '-f', 'lavfi', '-i', f'testsrc=size={args.size}:rate={args.fps}',
+        '-t', str(args.duration),
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p',
+        args.output
+    ]
+
+    def show(stats):
+        print(f"\r  {stats.out_time:8.1f}s  {stats.summary()}", end='', flush=True)
+
+    print(f"Recording {args.duration}s of testsrc to {args.output}...")
+    proc = FFmpegProcess(cmd, on_progress=show).start()
+    try:
+        proc.wait()
+    except KeyboardInterrupt:
+        proc.stop()
+    print()
+
+    if proc.returncode == 0 and os.path.exists(args.output):
+        expected = args.duration * float(args.fps)
+        print(f"✓ Done: {proc.latest.frame} frames (expected {expected:.0f}), "
+              f"dropped {proc.latest.drop_frames}")
+    else:
+        print(f"✗ FFmpeg exited with {proc.returncode}")
+        print(proc.log_tail())
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Raw Frame Tap
+Streams decoded capture frames from FFmpeg into a shared-memory ring for in-process analysis
+"""
+
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+from ffmpeg_progress import FFmpegProcess
+
+try:
+    import numpy as np  # frames as arrays; plain memoryviews without it
+except ImportError:
+    np = None
+
+PIX_FMTS = {'rgb24': 3, 'bgr24': 3, 'rgba': 4, 'bgra': 4, 'gray': 1}
+TAP_SIZE = (640, 360)   # analysis rarely needs full resolution
+TAP_PIX_FMT = 'rgb24'
+SLOTS = 8               # frames held in the ring
+DROP_OLDEST = 'drop-oldest'
+BLOCK = 'block'
+POLICIES = (DROP_OLDEST, BLOCK)
+
+
+def tap_settings(tap):
+    """{'width', 'height', 'pix_fmt'} from True (defaults) or a partial dict"""
+    settings = {'width': TAP_SIZE[0], 'height': TAP_SIZE[1], 'pix_fmt': TAP_PIX_FMT}
+    if isinstance(tap, dict):
+        settings.update(tap)
+    settings['width'], settings['height'] = int(settings['width']), int(settings['height'])
+    if settings['pix_fmt'] not in PIX_FMTS:
+        raise ValueError(f"Unsupported tap pixel format: {settings['pix_fmt']}")
+    return settings
+
+
+def tap_outputs(label, settings):
+    """Filter chain from a split label to [tap], and the output writing it to stdout.
+
+    Frames are letterboxed to exactly width x height, so every frame has
+    the same byte size. Passthrough keeps VFR captures from being padded
+    back to a constant rate.
+    """
+    w, h = settings['width'], settings['height']
+    chain = (f"{label}scale={w}:{h}:force_original_aspect_ratio=decrease,"
+             f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,format={settings['pix_fmt']}[tap]")
+    return chain, ['-map', '[tap]', '-fps_mode', 'passthrough', '-f', 'rawvideo', 'pipe:1']
+
+
+class Frame:
+    """One frame in the ring, valid only until the callback returns.
+
+    data is a memoryview of the shared memory and array a NumPy view of
+    the same bytes (None without NumPy); neither is a copy. Call
+    array.copy() to keep a frame.
+    """
+
+    __slots__ = ('seq', 'timestamp', 'data', 'array')
+
+    def __init__(self, seq, timestamp, data, array):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.data = data
+        self.array = array
+
+
+class Subscription:
+    """A consumer of the ring, with its own thread and counters"""
+
+    def __init__(self, callback, policy):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        self.callback = callback
+        self.policy = policy
+        self.cursor = 0        # next frame it will see
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.busy = 0.0        # seconds spent in the callback
+        self.active = True
+        self.thread = None
+
+    def stats(self):
+        return {
+            'policy': self.policy,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'avg_ms': round(self.busy / self.delivered * 1000, 3) if self.delivered else 0.0,
+        }
+
+
+class FrameTap:
+    """A ring of raw frames in shared memory, fed from an FFmpeg pipe.
+
+    FFmpeg writes straight into the ring slots (readinto), and
+    subscribers get views of those slots: a frame is never copied in
+    Python. Each subscriber runs on its own thread, in frame order:
+
+    - 'block': FFmpeg's pipe stalls until the subscriber has seen every
+      frame, so nothing is lost but a slow consumer slows the capture;
+    - 'drop-oldest': frames the subscriber didn't get to before they were
+      overwritten are skipped and counted.
+
+    New frames go to the slot holding the oldest frame nobody is reading
+    (or, for 'block' subscribers, still owed), so a slow 'drop-oldest'
+    subscriber never stalls the pipe while slots > subscribers + 1.
+
+    The ring survives pauses: feed() each new FFmpeg stdout in turn, and
+    close() once the recording is finished. shm_name lets another process
+    attach to the same memory (without backpressure).
+    """
+
+    def __init__(self, width=TAP_SIZE[0], height=TAP_SIZE[1], pix_fmt=TAP_PIX_FMT,
+                 slots=SLOTS, use_numpy=True):
+        settings = tap_settings({'width': width, 'height': height, 'pix_fmt': pix_fmt})
+        self.width, self.height, self.pix_fmt = settings['width'], settings['height'], pix_fmt
+        self.channels = PIX_FMTS[pix_fmt]
+        self.frame_bytes = self.width * self.height * self.channels
+        self.slots = max(3, int(slots))
+        self.shm = shared_memory.SharedMemory(create=True, size=self.frame_bytes * self.slots)
+        self._views = [self.shm.buf[i * self.frame_bytes:(i + 1) * self.frame_bytes]
+                       for i in range(self.slots)]
+        self._arrays = [None] * self.slots
+        if np is not None and use_numpy:
+            shape = ((self.height, self.width) if self.channels == 1
+                     else (self.height, self.width, self.channels))
+            self._arrays = [np.frombuffer(view, dtype=np.uint8).reshape(shape)
+                            for view in self._views]
+        self._timestamps = [0.0] * self.slots
+        self._pins = [0] * self.slots      # subscribers reading each slot
+        self._held = [-1] * self.slots     # frame seq in each slot, -1 if none
+        self._cond = threading.Condition()
+        self.subscriptions = []
+        self.written = 0          # frames written so far (the next frame's seq)
+        self.bytes = 0
+        self.first_frame = None
+        self.last_frame = None
+        self.stalled = 0.0        # seconds the pipe waited on 'block' subscribers
+        self.feeding = False
+        self.closed = False
+        self._reader = None
+
+    @property
+    def shm_name(self):
+        return self.shm.name
+
+    def subscribe(self, callback, policy=DROP_OLDEST):
+        """callback(frame) on a new thread for every frame from now on"""
+        sub = Subscription(callback, policy)
+        with self._cond:
+            sub.cursor = self.written
+            self.subscriptions.append(sub)
+        sub.thread = threading.Thread(target=self._deliver, args=(sub,), daemon=True)
+        sub.thread.start()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._cond:
+            sub.active = False
+            if sub in self.subscriptions:
+                self.subscriptions.remove(sub)
+            self._cond.notify_all()
+
+    def feed(self, stream):
+        """Read frames from an FFmpeg stdout until it ends.
+
+        A previous pipe (the part before a pause) is read to its end first,
+        so frames keep their order across parts.
+        """
+        if self.closed:
+            raise RuntimeError("The frame tap is closed")
+        if self._reader:
+            self._reader.join()
+        self.feeding = True
+        self._reader = threading.Thread(target=self._read, args=(stream,), daemon=True)
+        self._reader.start()
+        return self
+
+    def _free_slot(self):
+        """Slot with the oldest frame nobody reads or is owed, None if all busy"""
+        owed = min((s.cursor for s in self.subscriptions if s.policy == BLOCK and s.active),
+                   default=self.written)
+        free = [slot for slot in range(self.slots)
+                if not self._pins[slot] and self._held[slot] < owed]
+        return min(free, key=self._held.__getitem__) if free else None
+
+    def _next_frame(self, cursor):
+        """Slot of the oldest frame at or after cursor, None if there is none"""
+        held = [slot for slot in range(self.slots) if self._held[slot] >= cursor]
+        return min(held, key=self._held.__getitem__) if held else None
+
+    def _read(self, stream):
+        try:
+            while True:
+                with self._cond:
+                    seq = self.written
+                    slot = self._free_slot()
+                    if slot is None:
+                        started = time.perf_counter()
+                        while slot is None and not self.closed:
+                            self._cond.wait(0.1)
+                            slot = self._free_slot()
+                        self.stalled += time.perf_counter() - started
+                    if self.closed:
+                        return
+                    self._held[slot] = -1
+                if not _read_full(stream, self._views[slot]):
+                    return
+                now = time.time()
+                with self._cond:
+                    self._timestamps[slot] = now
+                    self._held[slot] = seq
+                    self.written = seq + 1
+                    self.bytes += self.frame_bytes
+                    self.first_frame = self.first_frame or now
+                    self.last_frame = now
+                    self._cond.notify_all()
+        finally:
+            with self._cond:
+                self.feeding = False
+                self._cond.notify_all()
+
+    def _deliver(self, sub):
+        while True:
+            with self._cond:
+                while sub.active and sub.cursor >= self.written and not self.closed:
+                    self._cond.wait(0.1)
+                if not sub.active or sub.cursor >= self.written:
+                    return
+                # Frames overwritten before this subscriber got to them are dropped
+                slot = self._next_frame(sub.cursor)
+                if slot is None:
+                    sub.dropped += self.written - sub.cursor
+                    sub.cursor = self.written
+                    continue
+                seq = self._held[slot]
+                sub.dropped += seq - sub.cursor
+                self._pins[slot] += 1
+                frame = Frame(seq, self._timestamps[slot], self._views[slot], self._arrays[slot])
+
+            started = time.perf_counter()
+            try:
+                sub.callback(frame)
+            except Exception as e:
+                sub.errors += 1
+                if sub.errors == 1:
+                    print(f"Frame tap subscriber failed: {e}", file=sys.stderr)
+            sub.busy += time.perf_counter() - started
+
+            with self._cond:
+                self._pins[slot] -= 1
+                sub.cursor = seq + 1
+                sub.delivered += 1
+                self._cond.notify_all()
+
+    def wait(self, timeout=None):
+        """Wait until the current pipe has ended and subscribers caught up"""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self.feeding or any(s.cursor < self.written and s.active
+                                      and s.policy == BLOCK for s in self.subscriptions):
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(0.1 if remaining is None else min(remaining, 0.1))
+        return True
+
+    def stats(self):
+        seconds = (self.last_frame - self.first_frame) if self.first_frame else 0.0
+        return {
+            'frames': self.written,
+            'frame_bytes': self.frame_bytes,
+            'fps': round((self.written - 1) / seconds, 2) if seconds else 0.0,
+            'mb_per_second': round(self.bytes / seconds / 1e6, 1) if seconds else 0.0,
+            'stalled_seconds': round(self.stalled, 3),
+            'slots': self.slots,
+            'shm_name': self.shm.name,
+            'subscribers': [s.stats() for s in self.subscriptions],
+        }
+
+    def close(self, timeout=5):
+        """Stop delivering, let callbacks return and free the shared memory"""
+        self.wait(timeout)
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+        for sub in self.subscriptions:
+            if sub.thread:
+                sub.thread.join(timeout)
+        if self._reader:
+            self._reader.join(timeout)
+        self._arrays = []
+        for view in self._views:
+            view.release()
+        self._views = []
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # a subscriber kept a view; the memory goes with the process
+        self.shm.unlink()
+
+
+def _read_full(stream, view):
+    """Fill view from stream; False at end of stream"""
+    filled, size = 0, len(view)
+    while filled < size:
+        n = stream.readinto(view[filled:])
+        if not n:
+            return False
+        filled += n
+    return True
+
+
+def benchmark(seconds=10, size='1920x1080', fps=60, tap_size=None, realtime=True,
+              slow_ms=50):
+    """Tap a lavfi source with a fast blocking and a slow dropping subscriber"""
+    width, height = (int(v) for v in (tap_size or size).split('x'))
+    tap = FrameTap(width, height)
+    chain, output = tap_outputs('[0:v]', tap_settings({'width': width, 'height': height}))
+    cmd = (['ffmpeg', '-hide_banner'] + (['-re'] if realtime else []) +
+           ['-f', 'lavfi', '-i', f'testsrc2=size={size}:rate={fps}', '-t', str(seconds),
+            '-filter_complex', chain] + output)
+
+    checksums = []
+
+    def fast(frame):
+        # Touch the frame without copying it: a cheap sample of one row
+        if frame.array is not None:
+            checksums.append(int(frame.array[frame.array.shape[0] // 2, ::64].sum()))
+        else:
+            checksums.append(sum(frame.data[:4096:16]))
+
+    def slow(frame):
+        time.sleep(slow_ms / 1000)
+
+    tap.subscribe(fast, BLOCK)
+    tap.subscribe(slow, DROP_OLDEST)
+    process = FFmpegProcess(cmd, progress_pipe=2, popen_kwargs={'stdout': subprocess.PIPE}).start()
+    started = time.time()
+    tap.feed(process.process.stdout)
+    process.wait()
+    tap.wait(10)
+    wall = time.time() - started
+    result = dict(tap.stats(), wall_seconds=round(wall, 2), expected_frames=int(seconds * fps),
+                  returncode=process.returncode, ffmpeg_speed=process.latest.speed)
+    if process.returncode != 0:
+        result['error'] = process.log_tail(5)
+    tap.close()
+    return result
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Frame tap throughput on a lavfi source")
+    parser.add_argument('--seconds', type=int, default=10)
+    parser.add_argument('--size', default='1920x1080')
+    parser.add_argument('--fps', type=int, default=60)
+    parser.add_argument('--tap-size', help="tap resolution (default: the source size)")
+    parser.add_argument('--as-fast-as-possible', action='store_true',
+                        help="don't pace the source in real time")
+    parser.add_argument('--slow-ms', type=int, default=50,
+                        help="time the dropping subscriber spends per frame")
+    args = parser.parse_args()
+
+    print(f"Tapping {args.seconds}s of {args.size}@{args.fps} "
+          f"({'NumPy views' if np is not None else 'memoryviews'})...")
+    r = benchmark(args.seconds, args.size, args.fps, args.tap_size,
+                  realtime=not args.as_fast_as_possible, slow_ms=args.slow_ms)
+    if r.get('error'):
+        print(f"✗ FFmpeg exited with {r['returncode']}:\n{r['error']}")
+        sys.exit(1)
+    print(f"  {r['frames']} frames of {r['expected_frames']} in {r['wall_seconds']}s: "
+          f"{r['fps']} fps, {r['mb_per_second']} MB/s through the ring")
+    print(f"  pipe stalled {r['stalled_seconds']}s waiting on blocking subscribers")
+    for name, s in zip(('block', 'drop-oldest'), r['subscribers']):
+        print(f"  {name:<12} delivered {s['delivered']}, dropped {s['dropped']}, "
+              f"{s['avg_ms']} ms per frame")
+
+
+if __name__ == "__main__":
+    main()
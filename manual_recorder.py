@@ -9,6 +9,11 @@ import os
 from datetime import datetime
 import sys
 
+from device_discovery import get_backend, list_audio_devices
+from command_builder import manual_recorder_command
+from audio_meter import check_levels
+from verify_recordings import verify_file
+
 print("""
 ╔═══════════════════════════════════════════════════════════════╗
 ║                                                               ║
@@ -22,21 +27,19 @@ print("This tool lets you manually enter your audio device names.")
 print("First, let's find your audio devices...\n")
 
 # Show available devices
-print("Running: ffmpeg -list_devices true -f dshow -i dummy\n")
-result = subprocess.run(
-    ['ffmpeg', '-list_devices', 'true', '-f', 'dshow', '-i', 'dummy'],
-    capture_output=True, text=True
-)
+try:
+    devices = [d.name for d in list_audio_devices()]
+except Exception as e:
+    print(f"Device scan failed: {e}")
+    devices = []
 
 print("="*70)
-print(result.stderr)
+for i, device in enumerate(devices, 1):
+    print(f"  {i}. {device}")
+if not devices:
+    print("  (no audio devices detected)")
 print("="*70)
 
-print("\nLook for lines like:")
-print('  [dshow @ ...] "Stereo Mix (Realtek Audio)" (audio)')
-print('  [dshow @ ...] "Microphone Array (Intel)" (audio)')
-print("\nThe device name is between the quotes.")
-
 # Get configuration
 print("\n" + "="*70)
 print("  RECORDING CONFIGURATION")
@@ -64,7 +67,10 @@ if use_audio:
     print("     - Microphone Array (Realtek Audio)")
     print("     - Microphone (USB Audio Device)")
     print("\n   Copy the name EXACTLY as shown (including spaces and parentheses)")
+    print("   or type its number from the list above")
     audio_device = input("\n   Audio device name: ").strip()
+    if audio_device.isdigit() and 1 <= int(audio_device) <= len(devices):
+        audio_device = devices[int(audio_device) - 1]
     
     if not audio_device:
         print("   No device entered, recording without audio.")
@@ -97,53 +103,9 @@ duration = input("\n4. Recording duration in seconds (or press ENTER for manual
 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 output_file = f"recording_{timestamp}.mp4"
 
-cmd = ['ffmpeg']
-
-# Video input based on mode
-if mode == '1':
-    cmd.extend(['-f', 'gdigrab', '-framerate', fps, '-i', 'desktop'])
-elif mode == '2':
-    cmd.extend(['-f', 'gdigrab', '-framerate', fps, '-i', 'desktop'])
-elif mode == '3':
-    # For monitor 2, you'll need to adjust offset_x and video_size
-    # Example for a 1920x1080 second monitor
-    cmd.extend([
-        '-f', 'gdigrab', '-framerate', fps,
-        '-offset_x', '1920', '-offset_y', '0',
-        '-video_size', '1920x1080',
-        '-i', 'desktop'
-    ])
-elif mode == '4':
-    # For monitor 3, adjust accordingly
-    cmd.extend([
-        '-f', 'gdigrab', '-framerate', fps,
-        '-offset_x', '3840', '-offset_y', '0',
-        '-video_size', '1920x1080',
-        '-i', 'desktop'
-    ])
-
-# Duration
-if duration and duration.isdigit():
-    cmd.extend(['-t', duration])
-
-# Audio input
-if use_audio and audio_device:
-    cmd.extend(['-f', 'dshow', '-i', f'audio={audio_device}'])
-
-# Video codec
-cmd.extend([
-    '-c:v', 'libx264',
-    '-preset', 'ultrafast',
-    '-crf', crf,
-    '-pix_fmt', 'yuv420p'
-])
-
-# Audio codec
-if use_audio and audio_device:
-    cmd.extend(['-c:a', 'aac', '-b:a', '192k'])
-
-# Output
-cmd.append(output_file)
+audio_input = get_backend().input_args(audio_device) if use_audio and audio_device else None
+cmd = manual_recorder_command(output_file, mode, fps, crf, audio_input,
+                              duration if duration.isdigit() else None)
 
 # Show command
 print("\n" + "="*70)
@@ -152,6 +114,19 @@ print("="*70)
 print(" ".join(cmd))
 print("="*70)
 
+# The probe after recording only shows a stream exists; check there is signal now
+if audio_input:
+    print("\nChecking audio level for 2 seconds (play something)...")
+    try:
+        level = check_levels(audio_input)
+        if level['silent']:
+            print(f"  ⚠ '{audio_device}' is silent (peak {level['peak_db']:.0f} dB)")
+            print("    Is it enabled and is sound playing? Stereo Mix is often muted.")
+        else:
+            print(f"  ✓ Signal detected (peak {level['peak_db']:.0f} dB, average {level['rms_db']:.0f} dB)")
+    except Exception as e:
+        print(f"  ⚠ Could not meter the device: {e}")
+
 confirm = input("\nStart recording? (y/n): ").strip().lower()
 
 if confirm != 'y':
@@ -171,14 +146,14 @@ try:
         print(f"\n✓ Recording saved: {output_file}")
         print(f"  Size: {size:.2f} MB")
         
-        # Check if it has audio
-        probe_cmd = ['ffprobe', '-i', output_file, '-show_streams', '-select_streams', 'a', '-loglevel', 'error']
-        probe_result = subprocess.run(probe_cmd, capture_output=True, text=True)
-        
-        if probe_result.stdout:
+        # One probe checks the container, the streams and the A/V lengths
+        facts, problems = verify_file(output_file, require_audio=bool(audio_input))
+        if facts.get('audio'):
             print("  ✓ Audio stream detected")
         else:
             print("  ⚠ No audio stream (video only)")
+        for problem in problems:
+            print(f"  ⚠ {problem}")
     else:
         print("\n✗ Recording file was not created")
         
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Parallel Multi-Monitor Capture
+One capture/encode pipeline per monitor, started together, with per-stream progress
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+from ffmpeg_progress import FFmpegProcess
+
+LAYOUTS = ['separate', 'multitrack']
+
+
+def grab_input_args(monitor, fps):
+    """Capture input for one monitor: gdigrab on Windows, x11grab elsewhere.
+
+    Monitors may carry a 'display' key (e.g. ':99.1' for a second Xvfb
+    screen); otherwise $DISPLAY is used with the monitor's offset.
+    """
+    size = f"{monitor['width']}x{monitor['height']}"
+    if sys.platform.startswith('win'):
+        return ['-f', 'gdigrab', '-framerate', str(fps),
+                '-offset_x', str(monitor['x']), '-offset_y', str(monitor['y']),
+                '-video_size', size, '-i', 'desktop']
+    display = monitor.get('display') or os.environ.get('DISPLAY', ':0')
+    return ['-f', 'x11grab', '-framerate', str(fps), '-video_size', size,
+            '-i', f"{display}+{monitor['x']},{monitor['y']}"]
+
+
+def detect_x11_monitors(display=None):
+    """Monitors of every screen of an X display (xrandr + xdpyinfo)"""
+    display = display or os.environ.get('DISPLAY', ':0')
+    base = display.split('.')[0]
+    screens = 1
+    try:
+        info = subprocess.run(['xdpyinfo', '-display', base], capture_output=True,
+                              text=True, timeout=10).stdout
+        match = re.search(r'number of screens:\s+(\d+)', info)
+        if match:
+            screens = int(match.group(1))
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+
+    monitors = []
+    for screen in range(screens):
+        screen_display = f"{base}.{screen}"
+        try:
+            out = subprocess.run(['xrandr', '--display', screen_display, '--listmonitors'],
+                                 capture_output=True, text=True, timeout=10).stdout
+        except (OSError, subprocess.TimeoutExpired):
+            continue
+        # " 0: +*HDMI-1 1920/509x1080/286+0+0  HDMI-1"
+        for match in re.finditer(r'^\s*\d+:\s+\S+\s+(\d+)/\d+x(\d+)/\d+\+(\d+)\+(\d+)\s+(\S+)',
+                                 out, re.MULTILINE):
+            width, height, x, y, name = match.groups()
+            monitors.append({
+                'name': f"{name} ({screen_display})",
+                'x': int(x), 'y': int(y),
+                'width': int(width), 'height': int(height),
+                'display': screen_display,
+            })
+    return monitors
+
+
+def encoder_threads(streams):
+    """Split the cores between parallel encoders"""
+    return str(max(1, (os.cpu_count() or 1) // max(1, streams)))
+
+
+class MultiStats:
+    """Per-monitor progress, shaped like FFmpegProcess.latest for the GUIs"""
+
+    def __init__(self, streams):
+        self.streams = streams
+
+    @property
+    def drop_frames(self):
+        return sum(s['drop_frames'] for s in self.streams)
+
+    def summary(self):
+        return ' | '.join(f"M{i + 1} {s['fps']:.0f}fps {s['speed']:.2f}x"
+                          for i, s in enumerate(self.streams))
+
+
+class MultiMonitorCapture:
+    """Capture several monitors at once.
+
+    'separate' runs one FFmpeg per monitor (one file each, encoders on
+    separate cores) launched together behind a barrier. The files are not
+    trimmed to a common start: the measured first-frame offsets go into
+    sync.json for lining them up afterwards. 'multitrack' runs a single FFmpeg
+    with one input and one encoder per monitor into a multi-track MKV.
+    """
+
+    def __init__(self, monitors, output_dir, base_name, fps='30', crf='23',
+                 preset='ultrafast', layout='separate', audio_args=None, on_progress=None):
+        if not monitors:
+            raise ValueError("No monitors to capture")
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout: {layout}")
+        self.monitors = monitors
+        self.output_dir = output_dir
+        self.base_name = base_name
+        self.fps = str(fps)
+        self.crf = str(crf)
+        self.preset = preset
+        self.layout = layout
+        self.audio_args = audio_args or []
+        self.on_progress = on_progress
+        self.processes = []
+        self.outputs = []
+        self.first_frame = {}
+        self.launched_at = {}
+
+    @property
+    def output(self):
+        """What the user gets: the MKV, or the directory of per-monitor files"""
+        if self.layout == 'multitrack':
+            return os.path.join(self.output_dir, f"{self.base_name}.mkv")
+        return os.path.join(self.output_dir, self.base_name)
+
+    def _codec_args(self, streams):
+        return ['-c:v', 'libx264', '-preset', self.preset, '-crf', self.crf,
+                '-pix_fmt', 'yuv420p', '-threads', encoder_threads(streams)]
+
+    def commands(self):
+        """[(cmd, output)] for the selected layout"""
+        audio = ['-c:a', 'aac', '-b:a', '192k'] if self.audio_args else []
+        if self.layout == 'multitrack':
+            cmd = ['ffmpeg', '-y']
+            for monitor in self.monitors:
+                cmd.extend(grab_input_args(monitor, self.fps))
+            cmd.extend(self.audio_args)
+            for i in range(len(self.monitors)):
+                cmd.extend(['-map', f'{i}:v'])
+            if self.audio_args:
+                cmd.extend(['-map', f'{len(self.monitors)}:a'])
+            cmd.extend(self._codec_args(len(self.monitors)))
+            for i, monitor in enumerate(self.monitors):
+                cmd.extend([f'-metadata:s:v:{i}', f"title={monitor['name']}"])
+            cmd.extend(audio)
+            cmd.append(self.output)
+            return [(cmd, self.output)]
+
+        os.makedirs(self.output, exist_ok=True)
+        commands = []
+        for i, monitor in enumerate(self.monitors):
+            output = os.path.join(self.output, f"monitor{i + 1}.mp4")
+            cmd = ['ffmpeg', '-y'] + grab_input_args(monitor, self.fps)
+            # Audio rides along with the first monitor's file
+            if i == 0 and self.audio_args:
+                cmd.extend(self.audio_args)
+            cmd.extend(self._codec_args(len(self.monitors)))
+            if i == 0:
+                cmd.extend(audio)
+            cmd.append(output)
+            commands.append((cmd, output))
+        return commands
+
+    def start(self):
+        """Launch all pipelines together (start offsets are measured, not corrected)"""
+        commands = self.commands()
+        barrier = threading.Barrier(len(commands))
+        self.processes = [None] * len(commands)
+        self.outputs = [output for _, output in commands]
+        errors = []
+
+        def launch(index, cmd):
+            proc = FFmpegProcess(cmd, on_progress=lambda s: self._progress(index, s))
+            barrier.wait()
+            try:
+                proc.start()
+                self.launched_at[index] = time.time()
+            except OSError as e:
+                errors.append(e)
+            self.processes[index] = proc
+
+        threads = [threading.Thread(target=launch, args=(i, cmd))
+                   for i, (cmd, _) in enumerate(commands)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            self.stop()
+            raise errors[0]
+        return self
+
+    def _progress(self, index, stats):
+        if stats.frame and index not in self.first_frame:
+            # Wallclock of the first captured frame of this stream
+            self.first_frame[index] = time.time() - stats.out_time
+        if self.on_progress:
+            self.on_progress(index, stats)
+
+    @property
+    def running(self):
+        return bool(self.processes) and all(p and p.running for p in self.processes)
+
+    @property
+    def returncode(self):
+        codes = [p.returncode for p in self.processes if p]
+        return next((c for c in codes if c), codes[0] if codes else None)
+
+    @property
+    def latest(self):
+        return MultiStats([p.latest.to_dict() for p in self.processes if p])
+
+    def log_tail(self, lines=10):
+        return '\n'.join(p.log_tail(lines) for p in self.processes if p and p.returncode)
+
+    def stop(self, timeout=5):
+        """Stop all pipelines together and write the sync manifest"""
+        threads = [threading.Thread(target=p.stop, args=(timeout,))
+                   for p in self.processes if p]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.write_manifest()
+        return self.returncode
+
+    def start_offsets(self):
+        """Seconds each stream started after the earliest one"""
+        if not self.first_frame:
+            return {}
+        earliest = min(self.first_frame.values())
+        return {i: round(t - earliest, 4) for i, t in self.first_frame.items()}
+
+    def write_manifest(self):
+        offsets = self.start_offsets()
+        manifest = {
+            'layout': self.layout,
+            'fps': self.fps,
+            'streams': [{
+                'monitor': monitor,
+                'output': self.output if self.layout == 'multitrack' else self.outputs[i],
+                'start_offset': offsets.get(i) if self.layout == 'separate' else 0.0,
+                'stats': self.processes[i].latest.to_dict()
+                         if self.layout == 'separate' and self.processes[i] else None,
+            } for i, monitor in enumerate(self.monitors)],
+        }
+        path = (os.path.join(self.output, 'sync.json') if self.layout == 'separate'
+                else os.path.splitext(self.output)[0] + '.sync.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Record every monitor in parallel")
+    parser.add_argument('--duration', type=int, default=10)
+    parser.add_argument('--fps', default='30')
+    parser.add_argument('--layout', choices=LAYOUTS, default='separate')
+    parser.add_argument('--display', help="X display, e.g. :99 for Xvfb")
+    parser.add_argument('--output-dir', default='.')
+    args = parser.parse_args()
+
+    if sys.platform.startswith('win'):
+        print("On Windows use the 'Every Monitor in Parallel' mode in advanced_recorder.py")
+        sys.exit(1)
+    monitors = detect_x11_monitors(args.display)
+    if not monitors:
+        print("✗ No monitors found (is DISPLAY set / xrandr installed?)")
+        sys.exit(1)
+
+    base = time.strftime("recording_%Y%m%d_%H%M%S")
+    capture = MultiMonitorCapture(monitors, args.output_dir, base, fps=args.fps,
+                                  layout=args.layout)
+    print(f"Recording {len(monitors)} monitor(s) for {args.duration}s...")
+    capture.start()
+    try:
+        for _ in range(args.duration):
+            time.sleep(1)
+            print(f"\r  {capture.latest.summary()}", end='', flush=True)
+    except KeyboardInterrupt:
+        pass
+    manifest_offsets = capture.start_offsets()
+    capture.stop()
+    print(f"\n✓ Saved to {capture.output}")
+    for i, offset in sorted(manifest_offsets.items()):
+        print(f"  Monitor {i + 1}: start offset {offset * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
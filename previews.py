@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Recording Previews
+Thumbnails, scrubbing sprite sheets and a short timelapse clip, encoded as side outputs of the capture itself
+"""
+
+import glob
+import json
+import math
+import os
+import shutil
+
+from segmented_output import join_files
+
+THUMBNAIL_SECONDS = 10   # one thumbnail every N seconds of recording
+THUMBNAIL_WIDTH = 320
+SPRITE_SECONDS = 2       # one sprite cell every N seconds
+SPRITE_COLUMNS = 10
+SPRITE_ROWS = 10
+TILE_SIZE = (160, 90)    # cell size; other aspect ratios are letterboxed
+CLIP_SPEED = 16          # preview clip plays the recording this much faster
+CLIP_FPS = 15
+CLIP_HEIGHT = 360
+
+INDEX_VTT = 'sprites.vtt'
+INDEX_JSON = 'previews.json'
+CLIP_NAME = 'preview.mp4'
+
+
+def preview_dir(output_dir, base_name):
+    return os.path.join(output_dir, f'{base_name}_previews')
+
+
+def preview_outputs(inputs, folder):
+    """Filter chains and output arguments for the three preview outputs.
+
+    inputs are three labels of the decoded capture (branches of a split).
+    Returns (chains, args); the chains end in the labels [thumbs],
+    [sprite] and [clip], which the args map to their files in folder.
+    A sheet is written once its cells are full, or partly filled when the
+    input ends; timed recordings therefore end their inputs, not their
+    outputs (command_builder.limit_duration).
+    """
+    os.makedirs(folder, exist_ok=True)
+    w, h = TILE_SIZE
+    chains = [
+        f"{inputs[0]}fps=1/{THUMBNAIL_SECONDS},scale={THUMBNAIL_WIDTH}:-2[thumbs]",
+        f"{inputs[1]}fps=1/{SPRITE_SECONDS},"
+        f"scale={w}:{h}:force_original_aspect_ratio=decrease,pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,"
+        f"tile={SPRITE_COLUMNS}x{SPRITE_ROWS}[sprite]",
+        # Sample CLIP_FPS / CLIP_SPEED frames a second and play them at CLIP_FPS
+        f"{inputs[2]}fps={CLIP_FPS}/{CLIP_SPEED},setpts=N/{CLIP_FPS}/TB,"
+        f"scale=-2:'trunc(min(ih,{CLIP_HEIGHT})/2)*2'[clip]",
+    ]
+    args = [
+        '-map', '[thumbs]', '-q:v', '4', '-f', 'image2',
+        os.path.join(folder, 'thumb_%04d.jpg'),
+        '-map', '[sprite]', '-q:v', '4', '-f', 'image2',
+        os.path.join(folder, 'sprite_%03d.jpg'),
+        '-map', '[clip]', '-c:v', 'libx264', '-preset', 'veryfast', '-crf', '30',
+        '-pix_fmt', 'yuv420p', '-movflags', '+faststart',
+        os.path.join(folder, CLIP_NAME),
+    ]
+    return chains, args
+
+
+def _timestamp(seconds):
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{seconds:06.3f}"
+
+
+def finish_previews(parts):
+    """Index the previews of a recording and merge those of paused parts.
+
+    parts is [(folder, seconds)] in recording order. Everything ends up in
+    the first folder: later parts' images are moved in with a 'partN_'
+    prefix and their clips joined (stream copy). Writes the WebVTT sprite
+    index and a JSON index of all previews; returns the JSON index.
+    """
+    target = parts[0][0]
+    per_sheet = SPRITE_COLUMNS * SPRITE_ROWS
+    w, h = TILE_SIZE
+    offset = 0.0
+    thumbnails, cues, clips = [], [], []
+    for n, (folder, seconds) in enumerate(parts):
+        prefix = '' if n == 0 else f'part{n + 1}_'
+        names = {}
+        for pattern in ('thumb_*.jpg', 'sprite_*.jpg', CLIP_NAME):
+            for path in sorted(glob.glob(os.path.join(folder, pattern))):
+                name = prefix + os.path.basename(path)
+                if folder != target:
+                    os.replace(path, os.path.join(target, name))
+                names.setdefault(pattern, []).append(name)
+        if folder != target:
+            shutil.rmtree(folder, ignore_errors=True)
+
+        for i, name in enumerate(names.get('thumb_*.jpg', [])):
+            thumbnails.append({'time': round(offset + i * THUMBNAIL_SECONDS, 3), 'file': name})
+        sheets = names.get('sprite_*.jpg', [])
+        cells = min(math.ceil(seconds / SPRITE_SECONDS), len(sheets) * per_sheet)
+        for i in range(cells):
+            cell = i % per_sheet
+            cues.append({
+                'start': round(offset + i * SPRITE_SECONDS, 3),
+                'end': round(offset + min((i + 1) * SPRITE_SECONDS, seconds), 3),
+                'file': sheets[i // per_sheet],
+                'x': (cell % SPRITE_COLUMNS) * w, 'y': (cell // SPRITE_COLUMNS) * h, 'w': w, 'h': h,
+            })
+        clips.extend(os.path.join(target, name) for name in names.get(CLIP_NAME, []))
+        offset += seconds
+
+    clip = os.path.join(target, CLIP_NAME)
+    if len(clips) > 1:
+        try:
+            first = os.path.join(target, 'part1_' + CLIP_NAME)
+            os.replace(clip, first)
+            join_files([first] + clips[1:], clip)
+            for path in [first] + clips[1:]:
+                os.remove(path)
+        except (RuntimeError, OSError):
+            pass  # the parts' clips stay as they are
+
+    with open(os.path.join(target, INDEX_VTT), 'w', encoding='utf-8') as f:
+        f.write('WEBVTT\n')
+        for cue in cues:
+            f.write(f"\n{_timestamp(cue['start'])} --> {_timestamp(cue['end'])}\n"
+                    f"{cue['file']}#xywh={cue['x']},{cue['y']},{cue['w']},{cue['h']}\n")
+
+    index = {
+        'duration': round(offset, 3),
+        'thumbnails': thumbnails,
+        'sprites': {'interval': SPRITE_SECONDS, 'columns': SPRITE_COLUMNS, 'rows': SPRITE_ROWS,
+                    'tile_width': w, 'tile_height': h, 'vtt': INDEX_VTT, 'cells': cues},
+        'clip': ({'file': CLIP_NAME, 'speed': CLIP_SPEED}
+                 if os.path.exists(clip) else None),
+    }
+    with open(os.path.join(target, INDEX_JSON), 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2)
+    return index
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild the sprite/preview index of a "
+                                                 "recording's preview folder")
+    parser.add_argument('folder', help="<recording>_previews folder")
+    parser.add_argument('--duration', type=float, required=True,
+                        help="recording length in seconds")
+    args = parser.parse_args()
+
+    index = finish_previews([(args.folder, args.duration)])
+    print(f"✓ {len(index['thumbnails'])} thumbnails, {len(index['sprites']['cells'])} sprite "
+          f"cells, clip: {index['clip']['file'] if index['clip'] else 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Hot-Standby Capture
+Keeps a recorder's capture pipeline running before the click, so recordings start without a cold FFmpeg launch
+"""
+
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+from replay_buffer import ReplayBuffer
+
+SEGMENT_SECONDS = 1   # keyframe/segment spacing: the most a recording starts early
+STANDBY_SECONDS = 10  # ring kept while idle, enough to cover the click
+FINISH_TIMEOUT = 5    # extra wait for FFmpeg to close the segment holding the stop time
+
+
+def default_scratch_dir():
+    """On disk, not tmpfs: a long recording is held here until it is joined"""
+    return os.path.join(tempfile.gettempdir(), f'screen_recorder_standby_{uuid.uuid4().hex[:8]}')
+
+
+def standby_command(config):
+    """(inputs, codec args) of a config's real recording command.
+
+    Standby reuses whatever the recorder would run (capture devices,
+    audio mix, preset, CRF), only the output side is swapped for a ring.
+    """
+    if config.recorder == 'parallel':
+        raise ValueError("Hot standby does not support parallel monitor capture")
+    if (config.output_mode != 'single' or config.two_stage or config.vfr or config.duration
+            or config.renditions or config.previews or config.tap or config.redact
+            or (config.audio_tracks and len(config.audio_devices) > 1)):
+        raise ValueError("Hot standby needs single-file output without two-stage, VFR, "
+                         "renditions, previews, a frame tap, redaction, separate audio "
+                         "tracks or a fixed duration")
+    cmd, _, _ = config.command('standby')
+    split = cmd.index('-c:v')
+    return cmd[1:split], cmd[split:-1]
+
+
+def first_frame_latency(stats, clicked):
+    """Seconds from the click to the first frame an FFmpeg run produced.
+
+    stats is any ProgressStats of the run: its out_time was reached at its
+    timestamp, so frame zero was captured out_time earlier. Encoder delay
+    makes this a slight overestimate.
+    """
+    if not stats or not stats.frame:
+        return None
+    return stats.timestamp - stats.out_time - clicked
+
+
+class StandbyCapture(ReplayBuffer):
+    """A recorder's capture pipeline kept warm in a short segment ring.
+
+    begin() marks the click and pins every segment from the one holding
+    it; finish() waits for the segment holding the stop time and joins the
+    pinned run with stream copy. Segments start on keyframes, so a
+    recording starts at most SEGMENT_SECONDS before the click, never after.
+    """
+
+    def __init__(self, config, segment_seconds=SEGMENT_SECONDS, max_age=STANDBY_SECONDS,
+                 scratch_dir=None):
+        inputs, self.codec = standby_command(config)
+        super().__init__(inputs, fps=config.fps, segment_seconds=segment_seconds,
+                         max_age=max_age, scratch_dir=scratch_dir or default_scratch_dir())
+        self.marked = None  # {'clicked', 'from'} while a recording is running
+
+    def codec_args(self):
+        # Keyframes only where segments are cut, as in the normal recording
+        return self.codec + ['-g', str(int(float(self.fps) * self.segment_seconds))]
+
+    def matches(self, config):
+        """True if config would record exactly what this standby captures"""
+        try:
+            return standby_command(config) == (self.input_args, self.codec)
+        except ValueError:
+            return False
+
+    @property
+    def ready(self):
+        """Warm: FFmpeg is running and has produced frames"""
+        return self.running and self.process.latest.frame > 0
+
+    def stream_time(self, wall):
+        """Capture timeline position at wall-clock time `wall`"""
+        stats = self.process.latest
+        return stats.out_time + (wall - stats.timestamp)
+
+    def begin(self, clicked=None):
+        """Start a recording at `clicked` (default now); returns its start latency.
+
+        The latency is negative: the file starts on the keyframe before
+        the click.
+        """
+        clicked = clicked or time.time()
+        if self.marked:
+            raise RuntimeError("Standby capture is already recording")
+        if not self.ready:
+            raise RuntimeError("Standby capture is still warming up")
+        start = self.stream_time(clicked)
+        self.collect()
+        with self._lock:
+            self.hold = start
+            holding = next((s for s in self.segments if s['start'] <= start < s['end']), None)
+            first = holding['start'] if holding else (
+                self.segments[-1]['end'] if self.segments else 0.0)
+            self.marked = {'clicked': clicked, 'from': start}
+        return first - start
+
+    def finish(self, output, stopped=None):
+        """Write everything from the click to `stopped` (default now) to output"""
+        stopped = stopped or time.time()
+        if not self.marked:
+            raise RuntimeError("Standby capture is not recording")
+        start, end = self.marked['from'], self.stream_time(stopped)
+        deadline = time.time() + self.segment_seconds + FINISH_TIMEOUT
+        while True:
+            self.collect()
+            if self.segments and self.segments[-1]['end'] >= end:
+                break
+            if not self.running or time.time() > deadline:
+                # Keep what made it to disk rather than losing the recording
+                end = self.segments[-1]['end'] if self.segments else start
+                break
+            time.sleep(0.05)
+
+        with self._lock:
+            chosen = [s for s in self.segments if s['end'] > start and s['start'] < end]
+            self.marked = None
+            if not chosen:
+                self.hold = None
+                raise RuntimeError("Standby capture produced no frames for this recording")
+            os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+            last = chosen[-1]
+            outpoint = end - last['start'] if end < last['end'] else None
+            try:
+                elapsed = self.join(chosen, output, outpoint=outpoint)
+            finally:
+                self.hold = None
+        return {
+            'output': output,
+            'seconds': round(min(end, last['end']) - chosen[0]['start'], 3),
+            'start_latency': round(chosen[0]['start'] - start, 3),
+            'segments': len(chosen),
+            'save_time': round(elapsed, 3),
+        }
+
+
+def main():
+    import argparse
+    from recording_session import RecordingConfig, RecordingSession
+
+    parser = argparse.ArgumentParser(description="Compare click-to-first-frame latency of cold "
+                                                 "starts and hot standby on a lavfi source")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--seconds', type=float, default=3, help="length of each recording")
+    parser.add_argument('--size', default='1920x1080')
+    parser.add_argument('--fps', default='30')
+    parser.add_argument('--output-dir', default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    def config():
+        return RecordingConfig(fps=args.fps, quality='medium', synthetic='testsrc2',
+                               synthetic_size=args.size, output_dir=args.output_dir)
+
+    cold = []
+    print(f"Cold start: {args.runs} recording(s)...")
+    for n in range(args.runs):
+        cfg = config()
+        cfg.base_name = f'prewarm_cold_{n}'
+        session = RecordingSession(cfg, catalog=None).start(clicked=time.time())
+        while session.start_latency is None and session.active:
+            time.sleep(0.05)
+        time.sleep(args.seconds)
+        session.stop()
+        if session.start_latency is not None:
+            cold.append(session.start_latency)
+
+    warm = []
+    standby = StandbyCapture(config()).start()
+    print("Hot standby: warming up...")
+    try:
+        while not standby.ready:
+            if not standby.running:
+                raise RuntimeError(standby.process.log_tail(5))
+            time.sleep(0.1)
+        time.sleep(SEGMENT_SECONDS * 2)
+        for n in range(args.runs):
+            cfg = config()
+            cfg.base_name = f'prewarm_standby_{n}'
+            session = RecordingSession(cfg, standby=standby,
+                                           catalog=None).start(clicked=time.time())
+            time.sleep(args.seconds)
+            session.stop()
+            warm.append(session.start_latency)
+    finally:
+        standby.stop()
+
+    for name, samples in (("cold start", cold), ("hot standby", warm)):
+        if samples:
+            print(f"  {name:<12} click → first frame: median {statistics.median(samples) * 1000:+6.0f} ms, "
+                  f"worst {max(samples) * 1000:+6.0f} ms")
+    print(f"  (one frame at {args.fps} fps = {1000 / float(args.fps):.0f} ms; "
+          f"negative = file starts before the click)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Recording Catalog
+SQLite index of recordings: filled at stop time and by an incremental ffprobe scan, queried in milliseconds
+"""
+
+import json
+import os
+import re
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from segmented_output import output_size
+
+CATALOG_PATH = os.path.join(os.path.expanduser('~'), '.screen_recorder', 'catalog.db')
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.mov')
+PROBE_WORKERS = min(8, os.cpu_count() or 2)
+COMMIT_EVERY = 100  # scanned files per transaction
+NAME_TIME = re.compile(r'(\d{8}_\d{6})')  # recording_YYYYMMDD_HHMMSS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    path TEXT PRIMARY KEY,
+    size INTEGER,             -- bytes; NULL until the file exists (two-stage)
+    mtime REAL,               -- size and mtime decide whether a file is probed again
+    created REAL,             -- when the recording started
+    duration REAL,
+    width INTEGER,
+    height INTEGER,
+    fps REAL,
+    video_codec TEXT,
+    audio_codec TEXT,
+    streams INTEGER,
+    audio_streams INTEGER,
+    source TEXT,              -- what was captured, e.g. 'window:Chrome'
+    rendition TEXT,           -- NULL for the main output
+    session_id TEXT,
+    settings TEXT,            -- RecordingConfig as JSON
+    scanned REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS recordings_created ON recordings(created);
+CREATE INDEX IF NOT EXISTS recordings_duration ON recordings(duration);
+CREATE INDEX IF NOT EXISTS recordings_source ON recordings(source);
+"""
+
+def _rate(value):
+    """'30000/1001' → 29.97"""
+    num, _, den = (value or '0').partition('/')
+    try:
+        return round(float(num) / float(den or 1), 3)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def probe_file(path):
+    """Duration, video format and stream counts of a file"""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries',
+         'format=duration:stream=codec_type,codec_name,width,height,avg_frame_rate',
+         '-of', 'json', path], capture_output=True, text=True, timeout=60)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"ffprobe failed on {path}")
+    data = json.loads(result.stdout)
+    streams = data.get('streams', [])
+    video = next((s for s in streams if s.get('codec_type') == 'video'), {})
+    audio = [s for s in streams if s.get('codec_type') == 'audio']
+    return {
+        'duration': float(data.get('format', {}).get('duration') or 0),
+        'width': video.get('width'),
+        'height': video.get('height'),
+        'fps': _rate(video.get('avg_frame_rate')),
+        'video_codec': video.get('codec_name'),
+        'audio_codec': audio[0].get('codec_name') if audio else None,
+        'streams': len(streams),
+        'audio_streams': len(audio),
+    }
+
+
+def file_info(path, stat=None):
+    """Probe a file; failures are recorded rather than raised"""
+    stat = stat or os.stat(path)
+    info = {'size': stat.st_size, 'mtime': stat.st_mtime, 'scanned': time.time(), 'error': None}
+    try:
+        info.update(probe_file(path))
+    except (OSError, ValueError, RuntimeError, subprocess.TimeoutExpired) as e:
+        info['error'] = str(e)[:500]
+    return info
+
+
+def name_time(path, default=None):
+    """Start time from a 'recording_YYYYMMDD_HHMMSS' style file name"""
+    match = NAME_TIME.search(os.path.basename(path))
+    if match:
+        try:
+            return datetime.strptime(match.group(1), '%Y%m%d_%H%M%S').timestamp()
+        except ValueError:
+            pass
+    return default
+
+
+def describe_source(config):
+    """Short description of what a RecordingConfig (as a dict) captured"""
+    if config.get('synthetic'):
+        return f"synthetic:{config['synthetic']}"
+    mode = config.get('mode')
+    if mode == 'window':
+        return f"window:{config.get('window')}"
+    if mode == 'area' and config.get('area'):
+        x, y, w, h = config['area']
+        return f"area:{x},{y},{w}x{h}"
+    if mode == 'monitor' and config.get('monitors'):
+        index = config.get('monitor_index') or 0
+        mon = config['monitors'][index]
+        return f"monitor:{index + 1} ({mon['width']}x{mon['height']})"
+    if config.get('recorder') == 'parallel':
+        return f"monitors:{len(config.get('monitors') or [])}"
+    return mode or 'desktop'
+
+
+class Catalog:
+    """The catalog database; safe to share between threads"""
+
+    def __init__(self, path=CATALOG_PATH):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self.db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+    def _upsert(self, path, values):
+        # Only the given columns change: a rescan keeps the session data
+        columns = ['path'] + list(values)
+        updates = ', '.join(f'{c} = excluded.{c}' for c in values)
+        self.db.execute(
+            f"INSERT INTO recordings ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT(path) DO UPDATE SET {updates}",
+            [path] + list(values.values()))
+
+    def add(self, path, **values):
+        """Insert or update one recording; unknown columns are an error"""
+        with self._lock:
+            self._upsert(os.path.abspath(path), values)
+            self.db.commit()
+
+    def add_session(self, session, probe=True):
+        """Catalog a finished RecordingSession: its output and any renditions.
+
+        Files that don't exist yet (a two-stage capture still waiting for
+        its transcode) get the session data only; the next scan fills in
+        the rest.
+        """
+        config = session.config.to_dict()
+        outputs = [(session.output, None)]
+        outputs += [(path, name) for name, path in session.parts[0]['renditions'].items()]
+        for path, rendition in outputs:
+            values = {
+                'created': session.parts[0]['started'],
+                'duration': round(session.elapsed(), 3),
+                'fps': float(config['fps']),
+                'source': describe_source(config),
+                'rendition': rendition,
+                'session_id': session.id,
+                'settings': json.dumps(config),
+            }
+            if os.path.isdir(path):
+                # Segment directory: no single file to probe
+                values.update(size=output_size(path), mtime=os.path.getmtime(path),
+                              scanned=time.time())
+            elif os.path.exists(path) and probe:
+                values.update((k, v) for k, v in file_info(path).items() if v is not None)
+            self.add(path, **values)
+
+    def known(self):
+        """path → (size, mtime) of everything catalogued"""
+        with self._lock:
+            rows = self.db.execute('SELECT path, size, mtime FROM recordings').fetchall()
+        return {row['path']: (row['size'], row['mtime']) for row in rows}
+
+    def scan(self, folders, workers=PROBE_WORKERS, recursive=False, prune=True, on_file=None):
+        """Probe new and modified recordings in folders; returns counts.
+
+        A file is probed again only if its size or mtime changed, so a
+        rescan of thousands of unchanged files costs one stat each. Files
+        gone from a scanned folder are dropped if prune is set.
+        on_file(path, info) runs on this thread after each probe.
+        """
+        started = time.perf_counter()
+        known = self.known()
+        found, todo = set(), []
+        for folder in folders:
+            for path, stat in _walk(os.path.abspath(folder), recursive):
+                found.add(path)
+                if known.get(path) != (stat.st_size, stat.st_mtime):
+                    todo.append((path, stat))
+
+        counts = {'files': len(found), 'probed': 0, 'failed': 0, 'removed': 0}
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {pool.submit(file_info, path, stat): path for path, stat in todo}
+            for n, future in enumerate(as_completed(futures), 1):
+                path, info = futures[future], future.result()
+                if path not in known:
+                    info['created'] = name_time(path, info['mtime'] - (info.get('duration') or 0))
+                with self._lock:
+                    self._upsert(path, info)
+                    if n % COMMIT_EVERY == 0:
+                        self.db.commit()
+                counts['probed'] += 1
+                counts['failed'] += bool(info['error'])
+                if on_file:
+                    on_file(path, info)
+
+        with self._lock:
+            if prune:
+                roots = [os.path.join(os.path.abspath(f), '') for f in folders]
+                gone = [p for p, (size, _) in known.items()
+                        if p not in found and size is not None and not os.path.exists(p)
+                        and any(p.startswith(root) for root in roots)]
+                self.db.executemany('DELETE FROM recordings WHERE path = ?', [(p,) for p in gone])
+                counts['removed'] = len(gone)
+            self.db.commit()
+        counts['unchanged'] = counts['files'] - counts['probed']
+        counts['seconds'] = round(time.perf_counter() - started, 3)
+        return counts
+
+    def query(self, min_duration=None, max_duration=None, since=None, until=None,
+              audio=None, source=None, min_height=None, renditions=False,
+              order='created DESC', limit=None):
+        """Recordings matching every given filter, as dicts"""
+        where, params = [], []
+        for clause, value in (('duration >= ?', min_duration), ('duration <= ?', max_duration),
+                              ('created >= ?', since), ('created < ?', until),
+                              ('height >= ?', min_height)):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        if audio is not None:
+            where.append('audio_streams > 0' if audio else 'COALESCE(audio_streams, 0) = 0')
+        if source:
+            where.append('source LIKE ?')
+            params.append(f'%{source}%')
+        if not renditions:
+            where.append('rendition IS NULL')
+        if order not in ('created DESC', 'created', 'duration DESC', 'duration',
+                         'size DESC', 'size'):
+            raise ValueError(f"Unsupported order: {order}")
+        sql = 'SELECT * FROM recordings'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += f' ORDER BY {order}'
+        if limit:
+            sql += f' LIMIT {int(limit)}'
+        with self._lock:
+            return [dict(row) for row in self.db.execute(sql, params)]
+
+    def totals(self):
+        with self._lock:
+            row = self.db.execute(
+                'SELECT COUNT(*) AS recordings, COALESCE(SUM(duration), 0) AS seconds, '
+                'COALESCE(SUM(size), 0) AS bytes, SUM(error IS NOT NULL) AS errors '
+                'FROM recordings').fetchone()
+        return dict(row)
+
+
+def _walk(folder, recursive):
+    """(path, stat) of every video file in folder"""
+    try:
+        entries = list(os.scandir(folder))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            if recursive:
+                yield from _walk(entry.path, recursive)
+        elif entry.name.lower().endswith(VIDEO_EXTENSIONS) and not entry.name.startswith('.'):
+            yield entry.path, entry.stat()
+
+
+def catalog_session(session, path=CATALOG_PATH):
+    """Add a finished session to the catalog; never fails the recording"""
+    try:
+        catalog = Catalog(path)
+        try:
+            catalog.add_session(session)
+        finally:
+            catalog.close()
+    except (sqlite3.Error, OSError) as e:
+        print(f"Could not add recording to the catalog: {e}", file=sys.stderr)
+
+
+def parse_seconds(text):
+    """'90', '90s', '30m', '1.5h' → seconds"""
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    text = text.strip().lower()
+    if text and text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+def parse_time(text):
+    """'7d' / '12h' ago, or a date 'YYYY-MM-DD[ HH:MM]' → timestamp"""
+    text = text.strip()
+    if text[-1:] in ('d', 'h') and text[:-1].replace('.', '', 1).isdigit():
+        return time.time() - float(text[:-1]) * (86400 if text[-1] == 'd' else 3600)
+    for fmt in ('%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(text, fmt).timestamp()
+        except ValueError:
+            pass
+    raise ValueError(f"Not a time: {text} (use e.g. 7d, 12h or 2024-02-05)")
+
+
+def _format_row(row):
+    created = datetime.fromtimestamp(row['created']).strftime('%Y-%m-%d %H:%M') if row['created'] else '?'
+    minutes = (row['duration'] or 0) / 60
+    size = (row['size'] or 0) / (1024 * 1024)
+    video = f"{row['width']}x{row['height']}" if row['width'] else '?'
+    audio = '🔊' if row['audio_streams'] else '  '
+    return (f"{created}  {minutes:7.1f} min  {video:>9}  {size:8.1f} MB  {audio} "
+            f"{row['source'] or '':<20} {row['path']}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Index recordings and search them")
+    parser.add_argument('--db', default=CATALOG_PATH)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    scan = sub.add_parser('scan', help="probe new or changed recordings in folders")
+    scan.add_argument('folders', nargs='*', default=['.'])
+    scan.add_argument('--workers', type=int, default=PROBE_WORKERS)
+    scan.add_argument('--recursive', action='store_true')
+    scan.add_argument('--keep-missing', action='store_true',
+                      help="keep entries whose file was deleted")
+
+    query = sub.add_parser('query', help="list recordings matching filters")
+    query.add_argument('--longer', type=parse_seconds, help="e.g. 30m")
+    query.add_argument('--shorter', type=parse_seconds)
+    query.add_argument('--since', type=parse_time, help="e.g. 7d or 2024-02-01")
+    query.add_argument('--until', type=parse_time)
+    query.add_argument('--audio', action='store_true', help="only with audio")
+    query.add_argument('--no-audio', action='store_true', help="only without audio")
+    query.add_argument('--source', help="e.g. window:Chrome or monitor")
+    query.add_argument('--min-height', type=int, help="e.g. 1080")
+    query.add_argument('--renditions', action='store_true', help="include share copies")
+    query.add_argument('--order', default='created DESC')
+    query.add_argument('--limit', type=int)
+    query.add_argument('--json', action='store_true')
+
+    sub.add_parser('stats', help="catalog totals")
+    args = parser.parse_args()
+
+    catalog = Catalog(args.db)
+    if args.command == 'scan':
+        def show(path, info):
+            mark = '✗' if info['error'] else '✓'
+            print(f"  {mark} {os.path.basename(path)}")
+
+        counts = catalog.scan(args.folders, args.workers, args.recursive,
+                              prune=not args.keep_missing, on_file=show)
+        print(f"Scanned {counts['files']} files in {counts['seconds']:.2f}s: "
+              f"{counts['probed']} probed ({counts['failed']} failed), "
+              f"{counts['unchanged']} unchanged, {counts['removed']} removed")
+    elif args.command == 'query':
+        started = time.perf_counter()
+        rows = catalog.query(
+            min_duration=args.longer, max_duration=args.shorter, since=args.since,
+            until=args.until, audio=True if args.audio else False if args.no_audio else None,
+            source=args.source, min_height=args.min_height, renditions=args.renditions,
+            order=args.order, limit=args.limit)
+        elapsed = (time.perf_counter() - started) * 1000
+        if args.json:
+            print(json.dumps(rows, indent=2))
+        else:
+            for row in rows:
+                print(_format_row(row))
+            print(f"{len(rows)} recording(s) in {elapsed:.1f} ms")
+    else:
+        totals = catalog.totals()
+        print(f"{totals['recordings']} recordings, {totals['seconds'] / 3600:.1f} hours, "
+              f"{totals['bytes'] / (1024 ** 3):.2f} GB ({totals['errors'] or 0} unreadable)")
+    catalog.close()
+
+
+if __name__ == "__main__":
+    main()
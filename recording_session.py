@@ -0,0 +1,773 @@
+#!/usr/bin/env python3
+"""
+Headless Recording Session
+Configuration, state machine and progress events for one recording, without any GUI
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+from ffmpeg_progress import FFmpegProcess
+from segmented_output import SegmentWatcher, join_files, output_size
+from device_discovery import get_backend
+from multi_monitor import MultiMonitorCapture
+from encoder_calibration import choose_preset
+from transcode_queue import TranscodeQueue
+from video_filters import (REDACT_STYLE, REDACT_STYLES, DecimationStats, clip_regions,
+                           record_session, redaction_region)
+from desktop_discovery import window_rect
+from prewarm import first_frame_latency
+from recording_catalog import CATALOG_PATH, catalog_session
+from previews import finish_previews, preview_dir
+from frame_tap import FrameTap, tap_settings
+from command_builder import (QUALITY_PRESETS, VIDEO_SOURCES, advanced_recorder_command,
+                             desktop_size,
+                             limit_duration, rendition, rendition_path,
+                             screen_recorder_command, synthetic_inputs)
+
+RECORDERS = ['screen_recorder', 'advanced_recorder', 'parallel']
+REDACT_RECHECK = 2       # seconds between position checks of redacted windows
+
+IDLE = 'idle'
+STARTING = 'starting'
+RECORDING = 'recording'
+PAUSED = 'paused'
+STOPPING = 'stopping'
+FINISHED = 'finished'
+FAILED = 'failed'
+
+# state → states it may move to
+TRANSITIONS = {
+    IDLE: (STARTING,),
+    STARTING: (RECORDING, FAILED),
+    RECORDING: (PAUSED, STOPPING, FAILED),
+    PAUSED: (RECORDING, STOPPING, FAILED),
+    STOPPING: (FINISHED, FAILED),
+    FINISHED: (),
+    FAILED: (),
+}
+
+
+class RecordingConfig:
+    """Everything needed to build a recording command, as plain data.
+
+    recorder picks the command builder: 'screen_recorder' (mode
+    fullscreen/window/area, quality names), 'advanced_recorder' (mode
+    desktop/monitor/window, CRF) or 'parallel' (one pipeline per monitor).
+    audio_devices are device names for audio_backend (default for this OS).
+    synthetic replaces the capture devices with a lavfi source of that name
+    (see command_builder.VIDEO_SOURCES), fed in real time.
+    renditions are extra, smaller outputs encoded from the same capture in
+    the same FFmpeg (command_builder.rendition specs, e.g. 'share').
+    previews adds thumbnails, sprite sheets and a preview clip the same way.
+    tap streams raw frames to the session's frame_tap (True, or frame_tap
+    settings such as {'width': 1280, 'height': 720, 'pix_fmt': 'gray'}).
+    redact are screen rectangles ('x,y,w,h' or dicts) or {'window': title}
+    masked inside the capture's filter graph, in redact_style.
+    audio_tracks records several audio devices as separate drift-corrected
+    tracks instead of mixing them (audio_tracks.mixdown mixes them later).
+    """
+
+    def __init__(self, recorder='screen_recorder', mode=None, fps='30', quality='high',
+                 crf=None, window=None, area=None, screen_size=(None, None), monitors=(),
+                 monitor_index=0, layout='separate', audio_devices=(), audio_backend=None,
+                 output_mode='single', output_dir='.', base_name=None, two_stage=False,
+                 deferred=False, vfr=False, synthetic=None, synthetic_size='1920x1080',
+                 duration=None, renditions=(), previews=False, tap=None, redact=(),
+                 redact_style=REDACT_STYLE, audio_tracks=False):
+        if recorder not in RECORDERS:
+            raise ValueError(f"Unknown recorder: {recorder}")
+        if (renditions or previews or tap or redact) and recorder == 'parallel':
+            raise ValueError("Renditions, previews, the frame tap and redaction are not "
+                             "supported for parallel monitor capture")
+        if (duration or vfr or two_stage or output_mode != 'single') and recorder == 'parallel':
+            raise ValueError("Timed, variable frame rate, two-stage and segmented "
+                             "recordings are not supported for parallel monitor capture")
+        if redact_style not in REDACT_STYLES:
+            raise ValueError(f"Unknown redaction style: {redact_style}")
+        self.recorder = recorder
+        self.mode = mode or ('fullscreen' if recorder == 'screen_recorder' else 'desktop')
+        self.fps = str(fps)
+        self.quality = quality
+        self.crf = str(crf) if crf else QUALITY_PRESETS[quality][1]
+        self.window = window
+        self.area = tuple(area) if area else None
+        self.screen_size = tuple(screen_size)
+        self.monitors = list(monitors)
+        self.monitor_index = monitor_index
+        self.layout = layout
+        self.audio_devices = [d for d in audio_devices if d]
+        self.audio_backend = audio_backend
+        self.output_mode = output_mode
+        self.output_dir = output_dir
+        self.base_name = base_name
+        self.two_stage = two_stage
+        self.deferred = deferred
+        self.vfr = vfr
+        self.synthetic = synthetic
+        self.synthetic_size = synthetic_size
+        self.duration = duration
+        self.renditions = [rendition(spec) for spec in renditions]
+        self.previews = previews
+        self.tap = tap_settings(tap) if tap else None
+        self.redact = [redaction_region(r) for r in redact]
+        self.redact_style = redact_style
+        self.audio_tracks = audio_tracks
+
+    def audio_inputs(self):
+        backend = get_backend(self.audio_backend)
+        return [backend.input_args(name) for name in self.audio_devices]
+
+    def command(self, base_name, redact=None):
+        """(cmd, output, transcode_job) from the recorder's command builder.
+
+        redact are capture rectangles already resolved by redaction_regions()
+        (looked up now by default).
+        """
+        audio = self.audio_inputs()
+        if redact is None:
+            redact = self.redaction_regions() if self.redact else ()
+        if self.recorder == 'screen_recorder':
+            cmd, output, job = screen_recorder_command(
+                base_name, mode=self.mode, fps=self.fps, quality=self.quality,
+                window=self.window, area=self.area, screen_size=self.screen_size,
+                audio_inputs=audio, output_mode=self.output_mode, output_dir=self.output_dir,
+                two_stage=self.two_stage, deferred=self.deferred, vfr=self.vfr,
+                renditions=self.renditions, previews=self.previews, tap=self.tap,
+                redact=redact, redact_style=self.redact_style,
+                audio_tracks=self.audio_tracks, track_titles=self.audio_devices)
+        elif self.recorder == 'advanced_recorder':
+            cmd, output, job = advanced_recorder_command(
+                base_name, mode=self.mode, fps=self.fps, crf=self.crf, monitors=self.monitors,
+                monitor_index=self.monitor_index, window=self.window,
+                audio_input=audio[0] if audio else None, output_mode=self.output_mode,
+                output_dir=self.output_dir, two_stage=self.two_stage,
+                deferred=self.deferred, vfr=self.vfr, renditions=self.renditions,
+                previews=self.previews, tap=self.tap, redact=redact,
+                redact_style=self.redact_style)
+        else:
+            raise ValueError("Parallel recordings have one command per monitor")
+
+        if self.synthetic:
+            cmd = synthetic_inputs(cmd, self.synthetic, self.synthetic_size, realtime=True)
+        if self.duration:
+            cmd = limit_duration(cmd, self.duration)
+        return cmd, output, job
+
+    def capture_geometry(self):
+        """(origin, size) of the captured picture in screen coordinates"""
+        if self.synthetic:
+            return (0, 0), tuple(int(v) for v in self.synthetic_size.split('x'))
+        if self.mode == 'window':
+            rect = window_rect(self.window) if self.window else None
+            if not rect:
+                raise ValueError(f"Window not found: {self.window}")
+            return (rect['x'], rect['y']), (rect['width'], rect['height'])
+        if self.mode == 'area' and self.area:
+            x, y, w, h = (int(v) for v in self.area)
+            return (x, y), (w, h)
+        if self.mode == 'monitor' and self.monitors:
+            mon = self.monitors[self.monitor_index]
+            return (mon['x'], mon['y']), (mon['width'], mon['height'])
+        # The desktop starts at the top-left monitor, which may be at negative coordinates
+        origin = ((min(m['x'] for m in self.monitors), min(m['y'] for m in self.monitors))
+                  if self.monitors else (0, 0))
+        size = self.screen_size if all(self.screen_size) else desktop_size(self.monitors)
+        return origin, size
+
+    def redaction_regions(self):
+        """redact as rectangles in capture coordinates, windows looked up now.
+
+        A window that can't be found, or a region entirely outside the
+        capture, is an error rather than an unredacted recording.
+        """
+        rects = []
+        for region in self.redact:
+            if 'window' in region:
+                rect = window_rect(region['window'])
+                if not rect:
+                    raise ValueError(f"Window to redact not found: {region['window']}")
+                rects.append(rect)
+            else:
+                rects.append(region)
+        origin, size = self.capture_geometry()
+        clipped = clip_regions(rects, origin, size)
+        for region, rect in zip(self.redact, clipped):
+            if rect is None:
+                name = (region['window'] if 'window' in region else
+                        f"{region['x']},{region['y']},{region['width']},{region['height']}")
+                raise ValueError(f"Region to redact is outside the captured screen: {name}")
+        return clipped
+
+    def follows_windows(self):
+        """True if redaction regions move with windows during the recording"""
+        return any('window' in region for region in self.redact)
+
+    def rendition_outputs(self, base_name):
+        """Rendition name → file written next to base_name's main output"""
+        return {r['name']: rendition_path(self.output_dir, base_name, r) for r in self.renditions}
+
+    def parallel_capture(self, base_name):
+        if not self.monitors:
+            raise ValueError("No monitors detected")
+        largest = max(self.monitors, key=lambda m: m['width'] * m['height'])
+        audio = self.audio_inputs()
+        return MultiMonitorCapture(
+            self.monitors, self.output_dir, base_name, fps=self.fps, crf=self.crf,
+            preset=choose_preset(self.crf, largest['width'], largest['height'], fps=self.fps),
+            layout=self.layout, audio_args=audio[0] if audio else None)
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class RecordingSession:
+    """One recording from start to finished/failed.
+
+    on_event(session, event, data) is called for 'state' (new state),
+    'progress' (ProgressStats), 'segment' (path), 'redaction' (new
+    regions after a redacted window moved) and 'finished'/'failed'
+    (result dict). It runs on worker threads; GUIs must marshal it to
+    their own thread. Pausing ends the current part; resuming starts the
+    next one ('<base>_part2' and so on). When the session finishes, the
+    parts are joined with stream copy into the first part's file.
+
+    standby is a warm prewarm.StandbyCapture; parts are cut from it instead
+    of launching FFmpeg, if it records exactly what config asks for.
+    start_latency is click-to-first-frame in seconds once known.
+    With config.tap, frame_tap (a frame_tap.FrameTap) receives the raw
+    frames of every part; subscribe to it before start() to see them all.
+    Finished sessions are added to the recording catalog at `catalog`
+    (a database path, None to skip).
+
+    Redacted windows are followed: when one moves or resizes, the current
+    part ends and a new one starts with the mask at the new position,
+    joined like a pause/resume. Until that check (every REDACT_RECHECK
+    seconds) the window's new area is not masked.
+    """
+
+    def __init__(self, config, on_event=None, session_id=None, standby=None,
+                 catalog=CATALOG_PATH):
+        self.id = session_id or uuid.uuid4().hex[:12]
+        self.config = config
+        self.on_event = on_event
+        self.state = IDLE
+        self.base_name = config.base_name or time.strftime("recording_%Y%m%d_%H%M%S")
+        self.parts = []          # {'output', 'renditions', 'command', 'started', 'ended'}
+        self.process = None
+        self.watcher = None
+        self.decimation = DecimationStats(config.fps) if config.vfr else None
+        self._decimated = (0, 0.0)  # kept frames / seconds of finished parts
+        self.transcode_jobs = []
+        self.error = None
+        self.joined = False
+        self.join_error = None
+        self.previews = None     # previews index once finished
+        self.frame_tap = FrameTap(**config.tap) if config.tap else None
+        self.standby = standby if standby and standby.matches(config) else None
+        self.catalog = catalog
+        self.clicked = None
+        self.start_latency = None
+        self.created = time.time()
+        self.finished_at = None
+        self._lock = threading.RLock()
+        self._monitor = None
+
+    def _set_state(self, state):
+        with self._lock:
+            if state not in TRANSITIONS[self.state]:
+                raise RuntimeError(f"Cannot go from {self.state} to {state}")
+            self.state = state
+        self._emit('state', state)
+
+    def _emit(self, event, data=None):
+        if self.on_event:
+            try:
+                self.on_event(self, event, data)
+            except Exception as e:
+                print(f"Session event handler failed ({event}): {e}", file=sys.stderr)
+
+    @property
+    def active(self):
+        return self.state in (STARTING, RECORDING, PAUSED, STOPPING)
+
+    @property
+    def output(self):
+        return self.parts[0]['output'] if self.parts else None
+
+    @property
+    def latest(self):
+        """Progress stats of the running part (MultiStats for parallel recordings)"""
+        return self.process.latest if self.process else None
+
+    def start(self, clicked=None):
+        """Begin recording; clicked is when the user asked for it (default now)"""
+        self.clicked = clicked or time.time()
+        self._set_state(STARTING)
+        try:
+            self._start_part()
+        except Exception as e:
+            self.error = str(e)
+            self._close_tap()
+            self._set_state(FAILED)
+            self._emit('failed', self.result())
+            raise
+        self._set_state(RECORDING)
+        if self.config.follows_windows():
+            threading.Thread(target=self._follow_windows, daemon=True).start()
+        return self
+
+    def pause(self):
+        """End the current part; nothing is captured until resume()"""
+        with self._lock:
+            if self.state != RECORDING:
+                raise RuntimeError(f"Cannot pause while {self.state}")
+            self._stop_part()
+            self._set_state(PAUSED)
+
+    def resume(self):
+        with self._lock:
+            if self.state != PAUSED:
+                raise RuntimeError(f"Cannot resume while {self.state}")
+            self._start_part()
+            self._set_state(RECORDING)
+
+    def stop(self, timeout=5):
+        """Finish the recording and return its result metadata"""
+        with self._lock:
+            if self.state in (FINISHED, FAILED):
+                return self.result()
+            if self.state not in (RECORDING, PAUSED):
+                raise RuntimeError(f"Cannot stop while {self.state}")
+            was_recording = self.state == RECORDING
+            self._set_state(STOPPING)
+            if was_recording:
+                self._stop_part(timeout)
+            self._finish()
+        result = self.result()
+        self._emit('finished', result)
+        return result
+
+    def wait(self, timeout=None):
+        """Block until the session is finished or failed"""
+        deadline = None if timeout is None else time.time() + timeout
+        while self.active:
+            if deadline and time.time() > deadline:
+                return False
+            time.sleep(0.1)
+        return True
+
+    def _part_name(self):
+        n = len(self.parts) + 1
+        return self.base_name if n == 1 else f"{self.base_name}_part{n}"
+
+    def _start_part(self, redact=None):
+        name = self._part_name()
+        standby = bool(self.standby and self.standby.ready)
+        if standby:
+            first = not self.parts
+            latency = self.standby.begin(self.clicked if first else None)
+            if first:
+                self.start_latency = latency
+            process = self.standby.process
+            output = os.path.join(self.config.output_dir, f"{name}.mp4")
+            command, job = self.standby.command(), None
+        elif self.config.recorder == 'parallel':
+            capture = self.config.parallel_capture(name)
+            process = capture.start()
+            output, command, job = capture.output, capture.commands(), None
+        else:
+            if redact is None:
+                redact = self.config.redaction_regions() if self.config.redact else ()
+            command, output, job = self.config.command(name, redact=redact)
+            if self.frame_tap:
+                # Progress moves to stderr so stdout can carry the raw frames
+                process = FFmpegProcess(command, on_progress=self._progress, progress_pipe=2,
+                                        popen_kwargs={'stdout': subprocess.PIPE}).start()
+                self.frame_tap.feed(process.process.stdout)
+            else:
+                process = FFmpegProcess(command, on_progress=self._progress).start()
+            if self.config.output_mode == 'segments':
+                self.watcher = SegmentWatcher(
+                    output, on_segment=lambda path, seg: self._emit('segment', path)).start()
+        if job:
+            self.transcode_jobs.append(job)
+        self.process = process
+        renditions = self.config.rendition_outputs(name) if not standby else {}
+        previews = (preview_dir(self.config.output_dir, name)
+                    if self.config.previews and not standby else None)
+        self.parts.append({'output': output, 'renditions': renditions, 'previews': previews,
+                           'command': command, 'standby': standby, 'redact': redact,
+                           'started': time.time(), 'ended': None})
+        self._monitor = threading.Thread(target=self._watch, args=(process,), daemon=True)
+        self._monitor.start()
+
+    def _stop_part(self, timeout=5):
+        process = self.process
+        # Mark the part ended first so the monitor sees an expected exit
+        part = self.parts[-1]
+        part['ended'] = time.time()
+        if part['standby']:
+            # The standby pipeline keeps running for the next recording
+            self.standby.finish(part['output'], part['ended'])
+            return
+        process.stop(timeout)
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+        if self.decimation and isinstance(process, FFmpegProcess):
+            self._update_decimation(process.latest, part_done=True)
+
+    def _follow_windows(self):
+        """Start a new part whenever a redacted window's rectangle changes.
+
+        The filter graph's rectangles are fixed for the life of an FFmpeg
+        process, so following a window means restarting the capture.
+        """
+        warned = False
+        while self.active:
+            time.sleep(REDACT_RECHECK)
+            try:
+                regions = self.config.redaction_regions()
+            except ValueError as e:
+                # Closed, minimised or off the captured screen: none of it is
+                # in the picture, so the current mask can stay until it's back
+                if not warned:
+                    print(f"⚠️ {e}", file=sys.stderr)
+                    warned = True
+                continue
+            warned = False
+            with self._lock:
+                if self.state != RECORDING or regions == self.parts[-1]['redact']:
+                    continue
+                self._stop_part()
+                try:
+                    self._start_part(regions)
+                except Exception as e:
+                    self.error = str(e)
+                    self._close_tap()
+                    self._set_state(FAILED)
+                    failed = True
+                else:
+                    failed = False
+            if failed:
+                self._emit('failed', self.result())
+                return
+            self._emit('redaction', regions)
+
+    def _update_decimation(self, stats, part_done=False):
+        """Totals over all parts: this part's stats plus the finished ones"""
+        kept, seconds = self._decimated
+        self.decimation.kept = kept + stats.frame
+        self.decimation.seconds = seconds + stats.out_time
+        if part_done:
+            self._decimated = (self.decimation.kept, self.decimation.seconds)
+
+    def _progress(self, stats):
+        if self.start_latency is None and len(self.parts) == 1:
+            self.start_latency = first_frame_latency(stats, self.clicked)
+        if self.decimation:
+            self._update_decimation(stats)
+        self._emit('progress', stats)
+
+    def _watch(self, process):
+        """Turn an exit nobody asked for into the failed state"""
+        part = self.parts[-1]
+        while process.running and part['ended'] is None:
+            time.sleep(0.2)
+        with self._lock:
+            if part['ended'] is not None or self.state not in (RECORDING, STARTING):
+                return
+            part['ended'] = time.time()
+            if self.config.duration and process.returncode == 0:
+                # -t ran out: a normal end of a timed recording
+                self._set_state(STOPPING)
+                if self.decimation:
+                    self._update_decimation(process.latest, part_done=True)
+                if self.watcher:
+                    self.watcher.stop()
+                    self.watcher = None
+                self._finish()
+                event = 'finished'
+            else:
+                self.error = (f"FFmpeg exited with code {process.returncode}\n\n"
+                              f"{process.log_tail(10)}")
+                # A parallel capture loses one monitor: stop the others too
+                process.stop()
+                if self.watcher:
+                    self.watcher.stop()
+                    self.watcher = None
+                self._close_tap()
+                self._set_state(FAILED)
+                event = 'failed'
+        self._emit(event, self.result())
+
+    def _finish(self):
+        """Join the parts and record stats (in STOPPING, with the lock held)"""
+        self.finished_at = time.time()
+        self._join_parts()
+        if self.parts and self.parts[0]['previews']:
+            try:
+                self.previews = finish_previews([(p['previews'], p['ended'] - p['started'])
+                                                 for p in self.parts])
+            except OSError as e:
+                print(f"Could not index the previews: {e}", file=sys.stderr)
+        if self.decimation:
+            record_session(self.output, self.decimation)
+        if self.catalog:
+            catalog_session(self, self.catalog)
+        self._close_tap()
+        self._set_state(FINISHED)
+
+    def _close_tap(self):
+        """Let tap subscribers see the last frames, then free the ring"""
+        if self.frame_tap and not self.frame_tap.closed:
+            self.frame_tap.close()
+
+    def _join_parts(self):
+        """Stream-copy the parts of a paused recording into one file.
+
+        The joined file takes the first part's name, so output stays the
+        same; renditions are joined the same way. Two-stage recordings join
+        their scratch captures and keep one transcode job. If a join fails,
+        its parts are left as they are.
+        """
+        if (len(self.parts) < 2 or self.config.recorder == 'parallel'
+                or self.config.output_mode == 'segments'):
+            return
+        jobs = self.transcode_jobs
+        if jobs:
+            groups = [[job.input for job in jobs]]
+        else:
+            groups = [[p['output'] for p in self.parts]]
+            groups += [[p['renditions'][r['name']] for p in self.parts]
+                       for r in self.config.renditions]
+        for n, paths in enumerate(groups):
+            try:
+                joined = self._join_files(paths)
+            except (RuntimeError, OSError) as e:
+                self.join_error = str(e)
+                continue
+            if joined and n == 0:
+                if jobs:
+                    self.transcode_jobs = jobs[:1]
+                self.joined = True
+
+    def _join_files(self, paths):
+        """Join paths into paths[0]; False if there was nothing to join"""
+        target = paths[0]
+        existing = [p for p in paths if os.path.exists(p)]
+        if len(existing) < 2:
+            return False
+
+        if existing[0] == target:
+            root, ext = os.path.splitext(target)
+            existing[0] = f"{root}_part1{ext}"
+            os.replace(target, existing[0])
+        try:
+            # Parts are separate encodes; MP4 parts carry AAC priming at each start
+            join_files(existing, target, reencode_audio=target.lower().endswith('.mp4'))
+        except (RuntimeError, OSError):
+            if existing[0] != target and not os.path.exists(target):
+                os.replace(existing[0], target)
+            raise
+        for path in existing:
+            os.remove(path)
+        return True
+
+    def rendition_stats(self):
+        """Main output and each rendition so far: file, size, bitrate, quantizer.
+
+        The outputs share one capture and decode, so frame count and time
+        are the same for all; only the encodes differ. quality is the
+        running encoder's current quantizer (None between parts).
+        """
+        if not self.config.renditions or not self.parts:
+            return []
+        seconds = self.elapsed()
+        latest = self.latest if self.state == RECORDING else None
+        outputs = [('main', [p['output'] for p in self.parts])]
+        outputs += [(r['name'], [p['renditions'][r['name']] for p in self.parts])
+                    for r in self.config.renditions]
+        stats = []
+        for index, (name, paths) in enumerate(outputs):
+            size = sum(output_size(path) for path in paths)
+            stats.append({
+                'name': name,
+                'output': paths[0],
+                'size_bytes': size,
+                'bitrate_kbps': round(size * 8 / seconds / 1000, 1) if seconds else 0.0,
+                'quality': latest.quality.get(index) if latest else None,
+            })
+        return stats
+
+    def elapsed(self):
+        """Seconds actually recorded, pauses excluded"""
+        now = time.time()
+        return sum((p['ended'] or now) - p['started'] for p in self.parts)
+
+    def result(self):
+        latest = self.latest
+        return {
+            'id': self.id,
+            'state': self.state,
+            'recorder': self.config.recorder,
+            'output': self.output,
+            'parts': [{'output': p['output'], 'renditions': p['renditions'], 'started': p['started'], 'ended': p['ended'],
+                       'standby': p['standby'], 'size_bytes': output_size(p['output'])} for p in self.parts],
+            'duration': round(self.elapsed(), 2),
+            'start_latency': (round(self.start_latency, 3)
+                              if self.start_latency is not None else None),
+            'created': self.created,
+            'finished': self.finished_at,
+            'stats': latest.to_dict() if hasattr(latest, 'to_dict') else None,
+            'decimation': self.decimation.to_dict() if self.decimation else None,
+            'renditions': self.rendition_stats(),
+            'previews': self.parts[0]['previews'] if self.previews else None,
+            'frame_tap': self.frame_tap.stats() if self.frame_tap else None,
+            'joined': self.joined,
+            'transcode_jobs': [job.id for job in self.transcode_jobs],
+            'error': self.error,
+            'join_error': self.join_error,
+            'config': self.config.to_dict(),
+        }
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Record from the command line, no GUI needed")
+    parser.add_argument('--recorder', choices=RECORDERS[:2], default='screen_recorder')
+    parser.add_argument('--mode', help="fullscreen/window/area or desktop/monitor/window")
+    parser.add_argument('--fps', default='30')
+    parser.add_argument('--quality', choices=list(QUALITY_PRESETS), default='high')
+    parser.add_argument('--crf')
+    parser.add_argument('--window', help="window title for window mode")
+    parser.add_argument('--area', help="x,y,w,h for area mode")
+    parser.add_argument('--audio', action='append', default=[],
+                        help="audio device name (repeat for several)")
+    parser.add_argument('--audio-tracks', action='store_true',
+                        help="keep each audio device on its own track instead of mixing")
+    parser.add_argument('--output-mode', default='single')
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--name', help="base file name")
+    parser.add_argument('--duration', type=int, help="stop after this many seconds")
+    parser.add_argument('--vfr', action='store_true', help="skip static frames")
+    parser.add_argument('--two-stage', action='store_true')
+    parser.add_argument('--rendition', action='append', default=[],
+                        help="extra output from the same capture: share, preview or "
+                             "e.g. 480p,crf=30 (repeat for several)")
+    parser.add_argument('--previews', action='store_true',
+                        help="also write thumbnails, sprite sheets and a preview clip")
+    parser.add_argument('--redact', action='append', default=[], metavar='X,Y,W,H',
+                        help="screen rectangle to mask (repeat for several)")
+    parser.add_argument('--redact-window', action='append', default=[], metavar='TITLE',
+                        help="window to mask (repeat for several)")
+    parser.add_argument('--redact-style', choices=REDACT_STYLES, default=REDACT_STYLE)
+    parser.add_argument('--tap', metavar='WxH',
+                        help="stream raw frames of this size into the frame tap and "
+                             "report its throughput")
+    parser.add_argument('--synthetic', choices=list(VIDEO_SOURCES),
+                        help="record a lavfi test source instead of the screen")
+    parser.add_argument('--size', default='1920x1080', help="size of the synthetic source")
+    parser.add_argument('--json', action='store_true', help="print the result as JSON")
+    args = parser.parse_args()
+
+    config = RecordingConfig(
+        recorder=args.recorder, mode=args.mode, fps=args.fps, quality=args.quality,
+        crf=args.crf, window=args.window,
+        area=args.area.split(',') if args.area else None,
+        audio_devices=args.audio, output_mode=args.output_mode, output_dir=args.output_dir,
+        base_name=args.name, two_stage=args.two_stage, vfr=args.vfr,
+        synthetic=args.synthetic, synthetic_size=args.size, duration=args.duration,
+        renditions=args.rendition, previews=args.previews,
+        tap=dict(zip(('width', 'height'), args.tap.split('x'))) if args.tap else None,
+        redact=args.redact + [{'window': title} for title in args.redact_window],
+        redact_style=args.redact_style, audio_tracks=args.audio_tracks)
+
+    def show(session, event, data):
+        if event == 'progress' and not args.json:
+            sizes = ''.join(f" | {r['name']} {r['size_bytes'] / (1024 * 1024):.1f} MB"
+                            for r in session.rendition_stats())
+            print(f"\r  {session.elapsed():7.1f}s  {data.summary()}{sizes}", end='', flush=True)
+
+    session = RecordingSession(config, on_event=show)
+    try:
+        session.start()
+    except Exception as e:
+        print(f"✗ Failed to start: {e}")
+        sys.exit(1)
+    stop_requested = threading.Event()
+
+    def keys():
+        """p + Enter pauses/resumes, s or q + Enter stops"""
+        for line in sys.stdin:
+            key = line.strip().lower()
+            try:
+                if key == 'p' and session.state == PAUSED:
+                    session.resume()
+                    print(f"\n▶️ Resumed (part {len(session.parts)})")
+                elif key == 'p':
+                    session.pause()
+                    print("\n⏸️ Paused (p + Enter to resume)")
+                elif key in ('s', 'q'):
+                    stop_requested.set()
+                    return
+            except RuntimeError as e:
+                print(f"\n✗ {e}")
+
+    if not args.json:
+        print(f"🔴 Recording to {session.output}")
+        if sys.stdin.isatty():
+            print("   p + Enter: pause/resume, s + Enter or Ctrl+C: stop")
+            threading.Thread(target=keys, daemon=True).start()
+        else:
+            print("   Ctrl+C to stop")
+    try:
+        while session.active and not stop_requested.wait(0.2):
+            pass
+    except KeyboardInterrupt:
+        pass
+    result = session.stop()
+
+    if session.transcode_jobs and result['state'] == FINISHED:
+        print(f"\n⏳ Compressing {len(session.transcode_jobs)} capture(s)...")
+        queue = TranscodeQueue(workers=1).start()
+        for job in session.transcode_jobs:
+            queue.submit(job)
+        queue.wait()
+        queue.stop()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    elif result['state'] == FINISHED:
+        print(f"\n✓ Saved {result['duration']:.1f}s to {result['output']}")
+        if result['joined']:
+            print(f"  joined {len(result['parts'])} parts without re-encoding")
+        elif result['join_error']:
+            print(f"  ⚠ Parts kept separately, join failed: {result['join_error']}")
+        if result['previews']:
+            print(f"  previews in {result['previews']}")
+        if result['frame_tap']:
+            tap = result['frame_tap']
+            print(f"  frame tap: {tap['frames']} frames, {tap['fps']} fps, "
+                  f"{tap['mb_per_second']} MB/s")
+        for r in result['renditions']:
+            print(f"  {r['name']:<8} {r['size_bytes'] / (1024 * 1024):8.1f} MB  "
+                  f"{r['bitrate_kbps']:7.0f} kbit/s  {r['output']}")
+    else:
+        print(f"\n✗ {result['error']}")
+    sys.exit(0 if result['state'] == FINISHED else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Instant Replay Buffer
+Always-on capture into a bounded ring of short segments; save the last N seconds on demand
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+
+from ffmpeg_progress import FFmpegProcess
+from segmented_output import SEGMENT_LIST, read_segment_list
+
+SEGMENT_SECONDS = 2
+MAX_AGE = 300                 # keep five minutes
+MAX_BYTES = 2 * 1024 ** 3     # and never more than 2 GB of scratch
+
+
+def default_scratch_dir():
+    """tmpfs when available so the ring never touches a real disk"""
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(base, f'screen_recorder_replay_{uuid.uuid4().hex[:8]}')
+
+
+class ReplayBuffer:
+    """Continuously record into short Matroska segments and evict old ones.
+
+    input_args are the capture inputs (e.g. gdigrab + dshow). Segments are
+    cut on forced keyframes so any run of them can be joined with stream
+    copy; save_replay() never touches the running capture.
+    """
+
+    def __init__(self, input_args, fps='30', crf='23', preset='ultrafast', audio=False,
+                 segment_seconds=SEGMENT_SECONDS, max_age=MAX_AGE, max_bytes=MAX_BYTES,
+                 scratch_dir=None):
+        self.input_args = list(input_args)
+        self.fps = str(fps)
+        self.crf = str(crf)
+        self.preset = preset
+        self.audio = audio
+        self.segment_seconds = segment_seconds
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.scratch_dir = scratch_dir or default_scratch_dir()
+        self.process = None
+        self.segments = []      # completed, not yet evicted
+        self.evicted = 0
+        self.hold = None        # stream time from which nothing may be evicted
+        self._seen = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._janitor = None
+
+    def codec_args(self):
+        args = [
+            '-c:v', 'libx264', '-preset', self.preset, '-crf', self.crf,
+            '-pix_fmt', 'yuv420p',
+            # Keyframe every second: replays start at most a second early
+            '-g', self.fps,
+        ]
+        if self.audio:
+            args.extend(['-c:a', 'aac', '-b:a', '160k'])
+        return args
+
+    def command(self):
+        return ['ffmpeg', '-y'] + self.input_args + self.codec_args() + [
+            '-force_key_frames', f'expr:gte(t,n_forced*{self.segment_seconds})',
+            '-f', 'segment',
+            '-segment_time', str(self.segment_seconds),
+            '-segment_format', 'matroska',
+            # Each segment starts at zero so concat 'inpoint' trims work
+            '-reset_timestamps', '1',
+            '-segment_list', os.path.join(self.scratch_dir, SEGMENT_LIST),
+            '-segment_list_type', 'csv',
+            os.path.join(self.scratch_dir, 'replay_%06d.mkv')
+        ]
+
+    def start(self):
+        os.makedirs(self.scratch_dir, exist_ok=True)
+        self.process = FFmpegProcess(self.command()).start()
+        self._janitor = threading.Thread(target=self._janitor_loop, daemon=True)
+        self._janitor.start()
+        return self
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.running
+
+    def _janitor_loop(self):
+        while not self._stop.wait(0.5):
+            self.collect()
+
+    def collect(self):
+        """Pick up newly completed segments and evict by age and total size"""
+        listed = read_segment_list(self.scratch_dir)
+        with self._lock:
+            for seg in listed[self._seen:]:
+                path = os.path.join(self.scratch_dir, seg['file'])
+                seg['path'] = path
+                seg['size'] = os.path.getsize(path) if os.path.exists(path) else 0
+                self.segments.append(seg)
+            self._seen = len(listed)
+
+            if not self.segments:
+                return
+            newest = self.segments[-1]['end']
+            total = sum(s['size'] for s in self.segments)
+            while self.segments and (newest - self.segments[0]['start'] > self.max_age
+                                     or total > self.max_bytes):
+                if self.hold is not None and self.segments[0]['end'] > self.hold:
+                    break
+                old = self.segments.pop(0)
+                total -= old['size']
+                self.evicted += 1
+                try:
+                    os.remove(old['path'])
+                except OSError:
+                    pass
+
+    def buffered_seconds(self):
+        with self._lock:
+            if not self.segments:
+                return 0.0
+            return self.segments[-1]['end'] - self.segments[0]['start']
+
+    def save_replay(self, seconds=None, output=None):
+        """Stitch the last `seconds` (default: everything buffered) into one MP4.
+
+        Stream copy only, so this takes a fraction of a second. Holds the
+        ring lock so the janitor cannot evict segments mid-copy.
+        """
+        self.collect()
+        if output is None:
+            output = f"replay_{time.strftime('%Y%m%d_%H%M%S')}.mp4"
+
+        with self._lock:
+            if not self.segments:
+                raise RuntimeError("Replay buffer is empty (still filling the first segment)")
+            end = self.segments[-1]['end']
+            start = end - seconds if seconds else self.segments[0]['start']
+            chosen = [s for s in self.segments if s['end'] > start]
+            elapsed = self.join(chosen, output, inpoint=start - chosen[0]['start'])
+        return {
+            'output': output,
+            'seconds': end - max(start, chosen[0]['start']),
+            'segments': len(chosen),
+            'save_time': round(elapsed, 3),
+        }
+
+    def join(self, segments, output, inpoint=0.0, outpoint=None):
+        """Concatenate ring segments into output with stream copy.
+
+        inpoint trims the first segment, outpoint the last (seconds into
+        that segment). Returns the time the copy took.
+        """
+        list_file = os.path.join(self.scratch_dir, f'save_{uuid.uuid4().hex[:8]}.txt')
+        cmd = ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error',
+               '-f', 'concat', '-safe', '0', '-i', list_file,
+               '-c', 'copy', '-avoid_negative_ts', 'make_zero', output]
+        try:
+            with open(list_file, 'w', encoding='utf-8') as f:
+                for i, seg in enumerate(segments):
+                    f.write(f"file '{seg['file']}'\n")
+                    if i == 0 and inpoint > 0:
+                        f.write(f"inpoint {inpoint:.3f}\n")
+                    if i == len(segments) - 1 and outpoint is not None:
+                        f.write(f"outpoint {outpoint:.3f}\n")
+            started = time.perf_counter()
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            elapsed = time.perf_counter() - started
+        finally:
+            if os.path.exists(list_file):
+                os.remove(list_file)
+
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr[-1000:])
+        return elapsed
+
+    def stop(self, cleanup=True):
+        """Stop capturing; the scratch ring is deleted unless cleanup=False"""
+        self._stop.set()
+        if self.process:
+            self.process.stop()
+        if self._janitor:
+            self._janitor.join(timeout=2)
+        if cleanup:
+            shutil.rmtree(self.scratch_dir, ignore_errors=True)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay buffer test on a lavfi source")
+    parser.add_argument('--buffer', type=int, default=60, help="seconds to keep")
+    parser.add_argument('--run', type=int, default=30, help="seconds to record before saving")
+    parser.add_argument('--save', type=int, default=15, help="seconds to save")
+    args = parser.parse_args()
+
+    buffer = ReplayBuffer(['-re', '-f', 'lavfi', '-i', 'testsrc2=size=1280x720:rate=30'],
+                          fps='30', max_age=args.buffer).start()
+    print(f"Buffering into {buffer.scratch_dir} ...")
+    try:
+        for _ in range(args.run):
+            time.sleep(1)
+            buffer.collect()
+            print(f"\r  buffered {buffer.buffered_seconds():5.1f}s, "
+                  f"{len(buffer.segments)} segments, {buffer.evicted} evicted", end='', flush=True)
+        print()
+        result = buffer.save_replay(args.save)
+        print(f"✓ Saved {result['seconds']:.1f}s to {result['output']} "
+              f"in {result['save_time'] * 1000:.0f} ms (capture kept running: {buffer.running})")
+    finally:
+        buffer.stop()
+
+
+if __name__ == "__main__":
+    main()
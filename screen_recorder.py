@@ -6,12 +6,20 @@ Similar to Screenity - Select windows, audio sources, and recording options
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-import subprocess
-import threading
-import json
 import os
-from datetime import datetime
+import shutil
 import sys
+import time
+
+from segmented_output import OUTPUT_MODES
+from device_discovery import get_cache, split_system_and_mic
+from transcode_queue import TranscodeQueue
+from audio_meter import BLOCK_SECONDS, AudioMeter, draw_level
+from recording_session import FAILED, PAUSED, RecordingConfig, RecordingSession
+from desktop_discovery import list_windows, run_async
+
+NO_BLUR = "(none)"
+
 
 class ScreenRecorderGUI:
     def __init__(self, root):
@@ -20,14 +28,21 @@ class ScreenRecorderGUI:
         self.root.geometry("600x700")
         self.root.resizable(False, False)
         
-        self.recording_process = None
+        self.session = None
+        self.transcode_queue = None
         self.is_recording = False
         self.windows_list = []
         self.audio_devices = []
+        self.device_cache = get_cache()
+        self.discovery_status = {}
+        self.meters = {}  # canvas → AudioMeter of the device shown above it
+        self.meter_job = None
         
         self.setup_ui()
-        self.refresh_windows()
-        self.refresh_audio_devices()
+        # Discovery runs on worker threads so the window paints immediately;
+        # dropdowns fill in as each scan finishes, without popups
+        self.refresh_windows(notify=False)
+        self.refresh_audio_devices(force=False)
     
     def setup_ui(self):
         """Create the user interface"""
@@ -35,7 +50,11 @@ class ScreenRecorderGUI:
         # Title
         title_label = tk.Label(self.root, text="🎥 Screen Recorder", 
                               font=("Arial", 18, "bold"), fg="#2563eb")
-        title_label.pack(pady=10)
+        title_label.pack(pady=(10, 0))
+        
+        self.discovery_label = tk.Label(self.root, text="", 
+                                        font=("Arial", 8), fg="#6b7280")
+        self.discovery_label.pack()
         
         # Recording Mode Section
         mode_frame = tk.LabelFrame(self.root, text="📹 Recording Mode", 
@@ -87,6 +106,7 @@ class ScreenRecorderGUI:
         self.system_audio_check = tk.Checkbutton(audio_frame, 
                                                  text="🔊 System Audio (Stereo Mix / Speakers)",
                                                  variable=self.system_audio_var,
+                                                 command=self.restart_meters,
                                                  font=("Arial", 10))
         self.system_audio_check.pack(anchor="w")
         
@@ -94,11 +114,16 @@ class ScreenRecorderGUI:
         self.system_dropdown = ttk.Combobox(audio_frame, textvariable=self.system_audio_device,
                                            width=50, state="readonly")
         self.system_dropdown.pack(fill="x", padx=20, pady=2)
+        self.system_dropdown.bind("<<ComboboxSelected>>", lambda e: self.restart_meters())
+        self.system_level = tk.Canvas(audio_frame, width=400, height=8, bg="#e5e7eb",
+                                      highlightthickness=0)
+        self.system_level.pack(anchor="w", padx=20)
         
         self.mic_var = tk.BooleanVar(value=False)
         self.mic_check = tk.Checkbutton(audio_frame, 
                                        text="🎤 Microphone",
                                        variable=self.mic_var,
+                                       command=self.restart_meters,
                                        font=("Arial", 10))
         self.mic_check.pack(anchor="w", pady=(10, 0))
         
@@ -106,6 +131,19 @@ class ScreenRecorderGUI:
         self.mic_dropdown = ttk.Combobox(audio_frame, textvariable=self.mic_device,
                                         width=50, state="readonly")
         self.mic_dropdown.pack(fill="x", padx=20, pady=2)
+        self.mic_dropdown.bind("<<ComboboxSelected>>", lambda e: self.restart_meters())
+        self.mic_level = tk.Canvas(audio_frame, width=400, height=8, bg="#e5e7eb",
+                                   highlightthickness=0)
+        self.mic_level.pack(anchor="w", padx=20)
+        
+        # Both sources on their own tracks: no mixing while recording, rebalance later
+        self.audio_tracks_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(audio_frame, text="🎛️ Separate tracks for system audio and mic (mix later)",
+                      variable=self.audio_tracks_var, font=("Arial", 9)).pack(anchor="w", pady=(5, 0))
+        
+        self.meters_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(audio_frame, text="🎚️ Show live levels", variable=self.meters_var,
+                      command=self.restart_meters, font=("Arial", 9)).pack(anchor="w", pady=(5, 0))
         
         # Recording Settings Section
         settings_frame = tk.LabelFrame(self.root, text="⚙️ Recording Settings", 
@@ -130,6 +168,49 @@ class ScreenRecorderGUI:
                     values=["15", "24", "30", "60"], 
                     state="readonly", width=15).pack(side="left", padx=10)
         
+        # Output mode (segments/fragmented survive a killed FFmpeg)
+        output_mode_frame = tk.Frame(settings_frame)
+        output_mode_frame.pack(fill="x", pady=2)
+        tk.Label(output_mode_frame, text="Output:", font=("Arial", 10)).pack(side="left")
+        self.output_mode_var = tk.StringVar(value="single")
+        ttk.Combobox(output_mode_frame, textvariable=self.output_mode_var, 
+                    values=OUTPUT_MODES, 
+                    state="readonly", width=15).pack(side="left", padx=10)
+        
+        # Variable frame rate: don't encode frames where nothing changed
+        self.vfr_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(settings_frame, text="🧊 Skip static frames (variable frame rate)",
+                      variable=self.vfr_var, font=("Arial", 10)).pack(anchor="w")
+        
+        # Extra 720p copy encoded from the same capture, for sharing
+        self.share_copy_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(settings_frame, text="📱 Also save a 720p share copy",
+                      variable=self.share_copy_var, font=("Arial", 10)).pack(anchor="w")
+        
+        # Review previews written during the recording, ready at stop
+        self.previews_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(settings_frame, text="🖼️ Thumbnails, scrub sprites and preview clip",
+                      variable=self.previews_var, font=("Arial", 10)).pack(anchor="w")
+        
+        # A window blurred out of the recording (passwords, customer data)
+        blur_frame = tk.Frame(settings_frame)
+        blur_frame.pack(fill="x", pady=2)
+        tk.Label(blur_frame, text="🙈 Blur window:", font=("Arial", 10)).pack(side="left")
+        self.blur_window_var = tk.StringVar(value=NO_BLUR)
+        self.blur_dropdown = ttk.Combobox(blur_frame, textvariable=self.blur_window_var,
+                                          values=[NO_BLUR], state="readonly", width=35)
+        self.blur_dropdown.pack(side="left", padx=10)
+        tk.Label(blur_frame, text="follows the window within 2 s",
+                 font=("Arial", 8), fg="#6b7280").pack(side="left")
+        
+        # Two-stage capture: lossless to scratch now, compress after stop
+        self.two_stage_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(settings_frame, text="⚡ Fast capture, compress after recording",
+                      variable=self.two_stage_var, font=("Arial", 10)).pack(anchor="w")
+        self.defer_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(settings_frame, text="🌙 Queue compression for overnight run",
+                      variable=self.defer_var, font=("Arial", 9)).pack(anchor="w", padx=20)
+        
         # Custom Area Settings (hidden by default)
         self.area_frame = tk.Frame(settings_frame)
         
@@ -173,6 +254,10 @@ class ScreenRecorderGUI:
                                     font=("Arial", 14), fg="#6b7280")
         self.timer_label.pack()
         
+        self.stats_label = tk.Label(status_frame, text="", 
+                                    font=("Arial", 9), fg="#6b7280")
+        self.stats_label.pack()
+        
         # Control Buttons
         button_frame = tk.Frame(self.root)
         button_frame.pack(pady=10)
@@ -184,6 +269,13 @@ class ScreenRecorderGUI:
                                       width=20, height=2)
         self.record_button.pack(side="left", padx=5)
         
+        self.pause_button = tk.Button(button_frame, text="⏸️ Pause",
+                                     command=self.toggle_pause,
+                                     bg="#6b7280", fg="white",
+                                     font=("Arial", 12, "bold"),
+                                     width=10, height=2, state="disabled")
+        self.pause_button.pack(side="left", padx=5)
+        
         self.stop_button = tk.Button(button_frame, text="⏹️ Stop Recording", 
                                     command=self.stop_recording,
                                     bg="#6b7280", fg="white", 
@@ -209,160 +301,156 @@ class ScreenRecorderGUI:
         else:
             self.area_frame.pack_forget()
     
-    def refresh_windows(self):
-        """Get list of open windows"""
-        try:
-            # Use PowerShell to get window titles
-            cmd = 'powershell "Get-Process | Where-Object {$_.MainWindowTitle -ne \\"\\"} | Select-Object MainWindowTitle"'
-            result = subprocess.run(cmd, capture_output=True, text=True, shell=True)
-            
-            windows = []
-            for line in result.stdout.split('\n')[3:]:  # Skip header lines
-                line = line.strip()
-                if line and line != '':
-                    windows.append(line)
-            
-            self.windows_list = windows
-            self.window_dropdown['values'] = windows
-            if windows:
-                self.window_dropdown.current(0)
-            
+    def set_discovery_status(self, source, text):
+        """One-line startup/refresh status per discovery source"""
+        if text is None:
+            self.discovery_status.pop(source, None)
+        else:
+            self.discovery_status[source] = text
+        self.discovery_label.config(text="  ·  ".join(self.discovery_status.values()))
+    
+    def refresh_windows(self, notify=True):
+        """Get list of open windows (in the background)"""
+        self.set_discovery_status('windows', "⏳ Scanning windows...")
+        run_async(list_windows, lambda windows, error: self.windows_found(windows, error, notify),
+                  self.root.after)
+    
+    def windows_found(self, windows, error, notify):
+        """Window scan finished (runs on the Tk thread)"""
+        if error:
+            self.set_discovery_status('windows', "✗ Window list unavailable")
+            if notify:
+                messagebox.showerror("Error", f"Failed to get windows: {str(error)}")
+            return
+        
+        self.windows_list = windows
+        self.window_dropdown['values'] = windows
+        self.blur_dropdown['values'] = [NO_BLUR] + windows
+        if windows and self.window_var.get() not in windows:
+            self.window_dropdown.current(0)
+        self.set_discovery_status('windows', f"✓ {len(windows)} windows")
+        if notify:
             messagebox.showinfo("Success", f"Found {len(windows)} windows")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to get windows: {str(e)}")
     
-    def refresh_audio_devices(self):
-        """Get list of audio devices using FFmpeg"""
-        try:
-            cmd = ['ffmpeg', '-list_devices', 'true', '-f', 'dshow', '-i', 'dummy']
-            result = subprocess.run(cmd, capture_output=True, text=True, stderr=subprocess.STDOUT)
-            
-            audio_devices = []
-            for line in result.stdout.split('\n'):
-                if '(audio)' in line and '"' in line:
-                    # Extract device name between quotes
-                    start = line.find('"') + 1
-                    end = line.find('"', start)
-                    if start > 0 and end > start:
-                        device_name = line[start:end]
-                        audio_devices.append(device_name)
-            
-            self.audio_devices = audio_devices
-            
-            # Separate into system audio and microphones
-            system_devices = [d for d in audio_devices if 'stereo mix' in d.lower() or 'wave out' in d.lower() or 'loopback' in d.lower()]
-            mic_devices = [d for d in audio_devices if 'microphone' in d.lower() or 'mic' in d.lower()]
-            
-            # If no explicit system devices found, use all as options
-            if not system_devices:
-                system_devices = audio_devices
-            if not mic_devices:
-                mic_devices = audio_devices
-            
-            self.system_dropdown['values'] = system_devices
-            self.mic_dropdown['values'] = mic_devices
-            
-            if system_devices:
-                self.system_dropdown.current(0)
-            if mic_devices:
-                self.mic_dropdown.current(0)
-            
-            messagebox.showinfo("Success", f"Found {len(audio_devices)} audio devices")
-        except FileNotFoundError:
-            messagebox.showerror("Error", "FFmpeg not found! Please install FFmpeg first.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to get audio devices: {str(e)}")
+    def refresh_audio_devices(self, force=True):
+        """Fill the audio dropdowns from the device cache; a fresh scan runs in the background"""
+        def on_update(devices):
+            self.root.after(0, self.audio_scan_finished, devices, None, force)
+        
+        def on_error(error):
+            self.root.after(0, self.audio_scan_finished, None, error, force)
+        
+        cached = self.device_cache.get(on_update=on_update, on_error=on_error, 
+                                       force_refresh=force)
+        if cached:
+            self.show_audio_devices(cached)
+        if force or not cached or self.device_cache.stale:
+            self.set_discovery_status('audio', "⏳ Scanning audio devices...")
     
-    def build_ffmpeg_command(self):
-        """Build FFmpeg command based on user selections"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_file = f"recording_{timestamp}.mp4"
-        
-        cmd = ['ffmpeg']
-        
-        # Video input based on mode
+    def audio_scan_finished(self, devices, error, notify):
+        """Background device scan completed (runs on the Tk thread)"""
+        if error:
+            missing = isinstance(error, FileNotFoundError)
+            self.set_discovery_status('audio', "✗ FFmpeg not found" if missing 
+                                      else "✗ Audio scan failed")
+            if not notify:
+                return
+            if missing:
+                messagebox.showerror("Error", "FFmpeg not found! Please install FFmpeg first.")
+            else:
+                messagebox.showerror("Error", f"Failed to get audio devices: {str(error)}")
+        else:
+            self.show_audio_devices(devices)
+            if notify:
+                messagebox.showinfo("Success", f"Found {len(devices)} audio devices")
+    
+    def show_audio_devices(self, devices):
+        """Populate the system audio and microphone dropdowns"""
+        self.audio_devices = devices
+        self.set_discovery_status('audio', f"✓ {len(devices)} audio devices")
+        
+        # Separate into system audio and microphones
+        system_devices, mic_devices = split_system_and_mic(devices)
+        
+        for dropdown, var, options in ((self.system_dropdown, self.system_audio_device, system_devices),
+                                       (self.mic_dropdown, self.mic_device, mic_devices)):
+            names = [d.name for d in options]
+            dropdown['values'] = names
+            # Keep the user's choice if the device is still there
+            if names and var.get() not in names:
+                dropdown.current(0)
+        self.restart_meters()
+    
+    def restart_meters(self):
+        """Meter the selected devices while live levels are switched on"""
+        for meter in self.meters.values():
+            meter.stop()
+        self.meters = {}
+        
+        if self.meters_var.get():
+            backend = self.device_cache.backend
+            for canvas, enabled, device in ((self.system_level, self.system_audio_var, self.system_audio_device),
+                                            (self.mic_level, self.mic_var, self.mic_device)):
+                if enabled.get() and device.get():
+                    try:
+                        self.meters[canvas] = AudioMeter(backend.input_args(device.get())).start()
+                    except OSError as e:
+                        self.set_discovery_status('audio', f"✗ Level meter failed: {e}")
+        self.update_meters()
+    
+    def update_meters(self):
+        """Redraw the level bars, 20 times a second while any meter runs"""
+        if self.meter_job:
+            self.root.after_cancel(self.meter_job)
+            self.meter_job = None
+        for canvas in (self.system_level, self.mic_level):
+            draw_level(canvas, self.meters.get(canvas))
+        if self.meters:
+            self.meter_job = self.root.after(int(BLOCK_SECONDS * 1000), self.update_meters)
+    
+    def build_config(self):
+        """Recording configuration from the user's selections"""
         mode = self.recording_mode.get()
-        fps = self.fps_var.get()
-        
-        if mode == "fullscreen":
-            cmd.extend(['-f', 'gdigrab', '-framerate', fps, '-i', 'desktop'])
-        elif mode == "window":
-            window_title = self.window_var.get()
-            if not window_title:
-                raise ValueError("Please select a window")
-            cmd.extend(['-f', 'gdigrab', '-framerate', fps, '-i', f'title={window_title}'])
-        elif mode == "area":
-            x = self.area_x.get()
-            y = self.area_y.get()
-            w = self.area_width.get()
-            h = self.area_height.get()
-            cmd.extend(['-f', 'gdigrab', '-framerate', fps, 
-                       '-offset_x', x, '-offset_y', y,
-                       '-video_size', f'{w}x{h}', '-i', 'desktop'])
-        
-        # Audio inputs
-        audio_inputs = []
-        audio_filters = []
-        
-        if self.system_audio_var.get() and self.system_audio_device.get():
-            audio_inputs.extend(['-f', 'dshow', '-i', f'audio={self.system_audio_device.get()}'])
-        
-        if self.mic_var.get() and self.mic_device.get():
-            audio_inputs.extend(['-f', 'dshow', '-i', f'audio={self.mic_device.get()}'])
-        
-        cmd.extend(audio_inputs)
-        
-        # Mix audio if both sources selected
-        audio_count = sum([self.system_audio_var.get(), self.mic_var.get()])
-        if audio_count > 1:
-            cmd.extend(['-filter_complex', 'amix=inputs=2:duration=longest'])
-        
-        # Quality settings
-        quality = self.quality_var.get()
-        quality_map = {
-            'low': ('ultrafast', '28'),
-            'medium': ('fast', '23'),
-            'high': ('medium', '20'),
-            'ultra': ('slow', '18')
-        }
-        preset, crf = quality_map[quality]
-        
-        # Video codec
-        cmd.extend(['-c:v', 'libx264', '-preset', preset, '-crf', crf])
-        
-        # Audio codec (if audio is included)
-        if audio_count > 0:
-            cmd.extend(['-c:a', 'aac', '-b:a', '192k'])
-        
-        cmd.append(output_file)
-        
-        return cmd, output_file
+        area = None
+        if mode == "area":
+            area = (self.area_x.get(), self.area_y.get(), 
+                    self.area_width.get(), self.area_height.get())
+        
+        # Audio devices (mixed by the command builder if both are selected)
+        audio_devices = []
+        if self.system_audio_var.get():
+            audio_devices.append(self.system_audio_device.get())
+        if self.mic_var.get():
+            audio_devices.append(self.mic_device.get())
+        blur = self.blur_window_var.get()
+        
+        return RecordingConfig(
+            recorder='screen_recorder', mode=mode, fps=self.fps_var.get(),
+            quality=self.quality_var.get(), window=self.window_var.get(), area=area,
+            screen_size=(self.root.winfo_screenwidth(), self.root.winfo_screenheight()),
+            audio_devices=audio_devices, audio_backend=self.device_cache.backend.name,
+            output_mode=self.output_mode_var.get(), two_stage=self.two_stage_var.get(),
+            deferred=self.defer_var.get(), vfr=self.vfr_var.get(),
+            renditions=['share'] if self.share_copy_var.get() else [],
+            previews=self.previews_var.get(),
+            redact=[{'window': blur}] if blur != NO_BLUR else [],
+            audio_tracks=self.audio_tracks_var.get())
     
     def start_recording(self):
         """Start the recording"""
+        clicked = time.time()
         try:
-            cmd, output_file = self.build_ffmpeg_command()
+            self.session = RecordingSession(self.build_config()).start(clicked)
             
             # Update UI
             self.is_recording = True
             self.record_button.config(state="disabled")
+            self.pause_button.config(state="normal", text="⏸️ Pause", bg="#d97706")
             self.stop_button.config(state="normal", bg="#dc2626")
             self.status_label.config(text="🔴 Recording...", fg="#dc2626")
-            self.output_label.config(text=f"Saving to: {output_file}")
-            
-            # Start FFmpeg in a separate thread
-            def run_ffmpeg():
-                self.recording_process = subprocess.Popen(cmd, 
-                                                         stdin=subprocess.PIPE,
-                                                         stdout=subprocess.PIPE,
-                                                         stderr=subprocess.PIPE)
-                self.recording_process.wait()
-            
-            self.recording_thread = threading.Thread(target=run_ffmpeg, daemon=True)
-            self.recording_thread.start()
+            self.output_label.config(text=f"Saving to: {self.session.output}")
             
             # Start timer
-            self.start_time = datetime.now()
             self.update_timer()
             
         except Exception as e:
@@ -373,37 +461,117 @@ class ScreenRecorderGUI:
     
     def stop_recording(self):
         """Stop the recording"""
-        if self.recording_process:
-            try:
-                # Send 'q' to FFmpeg to stop gracefully
-                self.recording_process.stdin.write(b'q')
-                self.recording_process.stdin.flush()
-                self.recording_process.wait(timeout=5)
-            except:
-                self.recording_process.terminate()
+        if self.session:
+            # FFmpeg gets 'q' and finishes the file
+            self.session.stop(timeout=5)
             
             self.is_recording = False
             self.record_button.config(state="normal")
+            self.pause_button.config(state="disabled", text="⏸️ Pause", bg="#6b7280")
             self.stop_button.config(state="disabled", bg="#6b7280")
             self.status_label.config(text="✅ Recording stopped", fg="#059669")
             
-            messagebox.showinfo("Success", "Recording saved successfully!")
+            stats = []
+            if self.session.decimation:
+                stats.append(self.session.decimation.summary())
+            if self.session.start_latency is not None:
+                stats.append(f"click to first frame {self.session.start_latency * 1000:.0f} ms")
+            self.stats_label.config(text=" | ".join(stats))
+            
+            if self.session.transcode_jobs:
+                for job in self.session.transcode_jobs:
+                    self.queue_transcode(job)
+                return
+            
+            copies = ''.join(f"\n📱 {os.path.basename(r['output'])} "
+                             f"({r['size_bytes'] / (1024*1024):.1f} MB)"
+                             for r in self.session.rendition_stats()[1:])
+            if self.session.previews:
+                copies += f"\n🖼️ Previews: {self.session.parts[0]['previews']}"
+            config = self.session.config
+            if config.audio_tracks and len(config.audio_devices) > 1:
+                copies += (f"\n🎛️ {len(config.audio_devices)} audio tracks; to mix them: "
+                           f"python audio_tracks.py mix \"{self.session.output}\"")
+            if self.session.joined:
+                messagebox.showinfo("Success", f"Recording saved successfully!\n\n"
+                                              f"{len(self.session.parts)} parts joined into "
+                                              f"{os.path.basename(self.session.output)}" + copies)
+            elif self.session.join_error:
+                messagebox.showwarning("Saved in parts",
+                                       "The paused parts could not be joined and were kept "
+                                       f"as separate files.\n\n{self.session.join_error}")
+            else:
+                messagebox.showinfo("Success", "Recording saved successfully!" +
+                                    (f"\n{copies}" if copies else ""))
+    
+    def toggle_pause(self):
+        """Pause or resume; the parts are joined without re-encoding at stop"""
+        if not self.session:
+            return
+        try:
+            if self.session.state == PAUSED:
+                self.session.resume()
+                self.pause_button.config(text="⏸️ Pause")
+                self.status_label.config(text="🔴 Recording...", fg="#dc2626")
+            else:
+                self.session.pause()
+                self.pause_button.config(text="▶️ Resume")
+                self.status_label.config(text="⏸️ Paused", fg="#d97706")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to pause/resume: {e}")
+    
+    def queue_transcode(self, job):
+        """Hand a finished scratch capture to the background transcode queue"""
+        if self.transcode_queue is None:
+            def on_job_done(done):
+                self.root.after(0, self.transcode_finished, done)
+            self.transcode_queue = TranscodeQueue(workers=1, on_job_done=on_job_done).start()
+        
+        self.transcode_queue.submit(job)
+        if job.deferred:
+            self.output_label.config(text=f"🌙 Queued for overnight compression: {job.output}\n"
+                                          "(run: python transcode_queue.py run)")
+        else:
+            self.output_label.config(text=f"⏳ Compressing in background: {job.output}")
+    
+    def transcode_finished(self, job):
+        """Background compression finished (runs on the Tk thread)"""
+        if job.status == 'done':
+            self.output_label.config(text=f"✅ Compressed: {job.output}")
+        else:
+            self.output_label.config(text=f"❌ Compression failed, capture kept at {job.input}")
     
     def update_timer(self):
         """Update the recording timer"""
         if self.is_recording:
-            elapsed = datetime.now() - self.start_time
-            hours = int(elapsed.total_seconds() // 3600)
-            minutes = int((elapsed.total_seconds() % 3600) // 60)
-            seconds = int(elapsed.total_seconds() % 60)
+            elapsed = self.session.elapsed()
+            hours = int(elapsed // 3600)
+            minutes = int((elapsed % 3600) // 60)
+            seconds = int(elapsed % 60)
             self.timer_label.config(text=f"{hours:02d}:{minutes:02d}:{seconds:02d}")
+            
+            if self.session.state == FAILED:
+                self.recording_failed(self.session)
+                return
+            if self.session.latest:
+                summary = self.session.latest.summary()
+                if self.session.decimation:
+                    summary += " | " + self.session.decimation.summary()
+                self.stats_label.config(text=summary)
             self.root.after(1000, self.update_timer)
+    
+    def recording_failed(self, session):
+        """FFmpeg exited on its own while we were recording"""
+        self.is_recording = False
+        self.record_button.config(state="normal")
+        self.pause_button.config(state="disabled", text="⏸️ Pause", bg="#6b7280")
+        self.stop_button.config(state="disabled", bg="#6b7280")
+        self.status_label.config(text="❌ Recording stopped unexpectedly", fg="#dc2626")
+        messagebox.showerror("Error", session.error)
 
 def main():
-    # Check if FFmpeg is available
-    try:
-        subprocess.run(['ffmpeg', '-version'], capture_output=True, check=True)
-    except FileNotFoundError:
+    # Check if FFmpeg is available (a PATH lookup, so startup doesn't wait on a spawn)
+    if not shutil.which('ffmpeg'):
         response = messagebox.askyesno(
             "FFmpeg Not Found",
             "FFmpeg is required but not found.\n\n"
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Segmented Recording Output
+Crash-safe output modes: rolling MP4 segments with a manifest, or fragmented MP4
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+OUTPUT_MODES = ['single', 'segments', 'fragmented']
+SEGMENT_SECONDS = 60
+SEGMENT_LIST = 'segments.csv'
+MANIFEST = 'manifest.json'
+JOIN_AUDIO_BITRATE = '192k'   # same as the recorders' AAC
+
+
+def output_args(mode, output_dir, base_name, segment_seconds=SEGMENT_SECONDS):
+    """FFmpeg output arguments for an output mode.
+
+    Returns (args, output_path). For 'segments' output_path is the
+    directory holding the segment files and manifest.
+    """
+    if mode == 'segments':
+        seg_dir = os.path.join(output_dir, base_name)
+        os.makedirs(seg_dir, exist_ok=True)
+        args = [
+            # Keyframe exactly at each boundary so segments cut cleanly
+            '-force_key_frames', f'expr:gte(t,n_forced*{segment_seconds})',
+            '-f', 'segment',
+            '-segment_time', str(segment_seconds),
+            '-segment_format', 'mp4',
+            '-reset_timestamps', '1',
+            '-segment_list', os.path.join(seg_dir, SEGMENT_LIST),
+            '-segment_list_type', 'csv',
+            os.path.join(seg_dir, f'{base_name}_%05d.mp4')
+        ]
+        return args, seg_dir
+
+    output = os.path.join(output_dir, f'{base_name}.mp4')
+    if mode == 'fragmented':
+        # moov up front and a new fragment every second: a killed
+        # process leaves a playable file up to the last fragment
+        args = ['-movflags', '+frag_keyframe+empty_moov+default_base_moof',
+                '-frag_duration', '1000000', output]
+        return args, output
+
+    return [output], output
+
+
+def read_segment_list(seg_dir):
+    """Completed segments as dicts with file, start and end"""
+    path = os.path.join(seg_dir, SEGMENT_LIST)
+    segments = []
+    if not os.path.exists(path):
+        return segments
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            parts = line.strip().rsplit(',', 2)
+            if len(parts) != 3:
+                continue
+            name, start, end = parts
+            segments.append({
+                'file': name.strip('"'),
+                'start': float(start),
+                'end': float(end),
+            })
+    return segments
+
+
+def write_manifest(seg_dir, finalized=False, extra=None):
+    """(Re)write manifest.json from the segment list; cheap enough to run per segment"""
+    segments = read_segment_list(seg_dir)
+    offset = 0.0
+    for seg in segments:
+        path = os.path.join(seg_dir, seg['file'])
+        seg['size'] = os.path.getsize(path) if os.path.exists(path) else 0
+        # Segments restart at zero; keep the session timeline too
+        seg['offset'] = offset
+        offset += seg['end'] - seg['start']
+
+    manifest = {
+        'version': 1,
+        'mode': 'segments',
+        'finalized': finalized,
+        'updated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'duration': offset,
+        'segments': segments,
+    }
+    if extra:
+        manifest.update(extra)
+
+    path = os.path.join(seg_dir, MANIFEST)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+    return manifest
+
+
+def load_manifest(seg_dir):
+    with open(os.path.join(seg_dir, MANIFEST), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def output_size(path):
+    """Size in bytes of a recording file or segment directory"""
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name))
+                   for name in os.listdir(path)
+                   if name.endswith('.mp4'))
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+class SegmentWatcher:
+    """Poll the segment list and report each segment as soon as FFmpeg closes it.
+
+    on_segment(path, segment) runs on the watcher thread, so completed
+    segments can be uploaded or processed while recording continues.
+    """
+
+    def __init__(self, seg_dir, on_segment=None, interval=1.0):
+        self.seg_dir = seg_dir
+        self.on_segment = on_segment
+        self.interval = interval
+        self.seen = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.poll()
+            self._stop.wait(self.interval)
+
+    def poll(self):
+        """Handle any segments completed since the last poll"""
+        segments = read_segment_list(self.seg_dir)
+        new = segments[self.seen:]
+        if not new:
+            return []
+        self.seen = len(segments)
+        write_manifest(self.seg_dir)
+        for seg in new:
+            if self.on_segment:
+                try:
+                    self.on_segment(os.path.join(self.seg_dir, seg['file']), seg)
+                except Exception as e:
+                    print(f"Segment callback failed for {seg['file']}: {e}")
+        return new
+
+    def stop(self):
+        """Stop polling and write the final manifest"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+        self.poll()
+        return write_manifest(self.seg_dir, finalized=True)
+
+
+def join_files(paths, output, list_file=None, reencode_audio=False):
+    """Concatenate files of the same codecs into output with stream copy.
+
+    Each file's timestamps are offset to follow the previous one, so gaps
+    between them (segments, paused parts) don't appear in the result.
+
+    Files encoded separately (paused parts) each start with the AAC
+    encoder delay, which the MP4 edit list hides but stream copy keeps:
+    the audio would fall ~21 ms further behind at every join. With
+    reencode_audio the audio is decoded (dropping each file's delay) and
+    encoded once more; the video is still copied.
+    """
+    list_file = list_file or output + '.concat.txt'
+    with open(list_file, 'w', encoding='utf-8') as f:
+        for path in paths:
+            name = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{name}'\n")
+
+    cmd = ['ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', list_file, '-map', '0', '-c', 'copy']
+    if reencode_audio:
+        cmd.extend(['-c:a', 'aac', '-b:a', JOIN_AUDIO_BITRATE])
+    if output.lower().endswith('.mp4'):
+        cmd.extend(['-movflags', '+faststart'])
+    cmd.append(output)
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    finally:
+        os.remove(list_file)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-1000:])
+    return output
+
+
+def join_segments(seg_dir, output=None):
+    """Concatenate segments into one file with stream copy (no re-encode)"""
+    segments = read_segment_list(seg_dir)
+    if not segments:
+        raise ValueError(f"No completed segments in {seg_dir}")
+    if output is None:
+        output = seg_dir.rstrip('/\\') + '.mp4'
+    return join_files([os.path.join(seg_dir, seg['file']) for seg in segments], output,
+                      os.path.join(seg_dir, 'concat.txt'))
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ('manifest', 'join'):
+        print("Usage:")
+        print("  python segmented_output.py manifest <segment_dir>   rebuild manifest.json")
+        print("  python segmented_output.py join <segment_dir> [output.mp4]")
+        sys.exit(1)
+
+    seg_dir = sys.argv[2]
+    if sys.argv[1] == 'manifest':
+        manifest = write_manifest(seg_dir)
+        print(f"✓ {len(manifest['segments'])} segments, {manifest['duration']:.1f}s")
+    else:
+        output = join_segments(seg_dir, sys.argv[3] if len(sys.argv) > 3 else None)
+        print(f"✓ Joined into {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,8 @@ import subprocess
 import os
 from datetime import datetime
 
+from device_discovery import list_audio_devices
+
 print("="*70)
 print("  SCREEN RECORDER DIAGNOSTIC")
 print("="*70)
@@ -69,23 +71,10 @@ except Exception as e:
 # Test 3: Audio Devices
 print("\n3. Detecting Audio Devices...")
 try:
-    result = subprocess.run(['ffmpeg', '-list_devices', 'true', '-f', 'dshow', '-i', 'dummy'],
-                          capture_output=True, text=True)
-    
-    # Audio devices are in stderr for this command
-    output = result.stderr
-    
-    audio_devices = []
     print("   Scanning...")
-    
-    for line in output.split('\n'):
-        if '(audio)' in line and '"' in line:
-            start = line.find('"') + 1
-            end = line.find('"', start)
-            if start > 0 and end > start:
-                device = line[start:end]
-                audio_devices.append(device)
-                print(f"      • {device}")
+    audio_devices = [d.name for d in list_audio_devices(use_cache=False)]
+    for device in audio_devices:
+        print(f"      • {device}")
     
     if audio_devices:
         print(f"\n   ✓ Found {len(audio_devices)} audio device(s)")
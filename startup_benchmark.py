@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+GUI Startup Benchmark
+Measures time-to-first-paint of the recorder windows against a target
+"""
+
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+GUIS = {
+    'screen_recorder': 'ScreenRecorderGUI',
+    'advanced_recorder': 'AdvancedRecorderGUI',
+}
+TARGET_MS = 400    # process spawn to first paint
+TIMEOUT = 30       # a modal dialog on the startup path would block until this
+
+
+def child(name, spawned):
+    """Open one GUI, report when it first painted, then close it"""
+    started = time.perf_counter()
+    import tkinter as tk
+    module = importlib.import_module(name)
+    imported = time.perf_counter()
+
+    root = tk.Tk()
+    app = getattr(module, GUIS[name])(root)
+    constructed = time.perf_counter()
+    marks = {}
+
+    def painted():
+        marks['paint'] = time.perf_counter()
+        marks['paint_wall'] = time.time()
+        # Give the background scans a moment, then see what had arrived
+        root.after(500, root.quit)
+
+    def on_map(event):
+        if event.widget is root and 'map' not in marks:
+            marks['map'] = time.perf_counter()
+            root.after_idle(painted)
+
+    root.bind('<Map>', on_map)
+    root.mainloop()
+
+    status = getattr(app, 'discovery_label', None)
+    print(json.dumps({
+        'gui': name,
+        'import_ms': round((imported - started) * 1000, 1),
+        'init_ms': round((constructed - imported) * 1000, 1),
+        'first_paint_ms': round((marks['paint'] - started) * 1000, 1),
+        # Includes interpreter startup, which the in-process clocks can't see
+        'spawn_to_paint_ms': round((marks['paint_wall'] - spawned) * 1000, 1),
+        'discovery_after_500ms': status.cget('text') if status else None,
+    }))
+    root.destroy()
+
+
+def measure(name, runs=5):
+    """Spawn the GUI `runs` times; each sample includes interpreter startup"""
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', name,
+                                 '--spawned', repr(time.time())],
+                                capture_output=True, text=True, timeout=TIMEOUT,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip()
+                               else f"exit code {result.returncode}")
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure GUI time-to-first-paint")
+    parser.add_argument('--child', choices=list(GUIS), help=argparse.SUPPRESS)
+    parser.add_argument('--spawned', type=float, help=argparse.SUPPRESS)
+    parser.add_argument('--gui', nargs='+', choices=list(GUIS), default=list(GUIS))
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--target-ms', type=float, default=TARGET_MS)
+    parser.add_argument('--json', help="also write the samples to this file")
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.spawned or time.time())
+        return
+
+    if not sys.platform.startswith('win') and not os.environ.get('DISPLAY'):
+        print("✗ No display (on a headless box run: xvfb-run python startup_benchmark.py)")
+        sys.exit(1)
+
+    failed = False
+    results = {}
+    for name in args.gui:
+        print(f"{name}: {args.runs} cold start(s)...")
+        try:
+            samples = measure(name, args.runs)
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            print(f"  ✗ did not paint: {e}")
+            failed = True
+            continue
+        paint = [s['spawn_to_paint_ms'] for s in samples]
+        median = statistics.median(paint)
+        ok = median <= args.target_ms
+        failed = failed or not ok
+        results[name] = samples
+        print(f"  {'✓' if ok else '✗'} first paint median {median:.0f} ms, "
+              f"max {max(paint):.0f} ms (target {args.target_ms:.0f} ms)")
+        print(f"    import {statistics.median(s['import_ms'] for s in samples):.0f} ms, "
+              f"__init__ {statistics.median(s['init_ms'] for s in samples):.0f} ms, "
+              f"in-process to paint {statistics.median(s['first_paint_ms'] for s in samples):.0f} ms")
+        if samples[-1]['discovery_after_500ms']:
+            print(f"    discovery 0.5 s after paint: {samples[-1]['discovery_after_500ms']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
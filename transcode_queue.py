@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Two-Stage Capture and Background Transcode Queue
+Capture losslessly to scratch, then compress to the final CRF output in the background
+"""
+
+import heapq
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from ffmpeg_progress import FFmpegProcess
+
+SCRATCH_DIR = os.path.join(tempfile.gettempdir(), 'screen_recorder_scratch')
+QUEUE_PATH = os.path.join(os.path.expanduser('~'), '.screen_recorder', 'transcode_queue.json')
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10
+
+FINISHED_KEEP = 50              # newest done/failed jobs kept in the state file
+FINISHED_TTL = 7 * 24 * 3600    # and for at most this many seconds
+
+
+def capture_args(base_name, scratch_dir=SCRATCH_DIR, audio=False):
+    """Near-zero-cost codec + output arguments for the capture stage.
+
+    Lossless x264 at ultrafast costs little CPU, and Matroska stays readable
+    if the capture is killed. Returns (args, scratch_path).
+    """
+    os.makedirs(scratch_dir, exist_ok=True)
+    path = os.path.join(scratch_dir, f'{base_name}.mkv')
+    args = ['-c:v', 'libx264', '-preset', 'ultrafast', '-qp', '0', '-pix_fmt', 'yuv420p']
+    if audio:
+        args.extend(['-c:a', 'pcm_s16le'])
+    args.append(path)
+    return args, path
+
+
+def probe_duration(path):
+    """Container duration in seconds, 0 if unknown"""
+    try:
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+             '-of', 'default=noprint_wrappers=1:nokey=1', path],
+            capture_output=True, text=True, timeout=30)
+        return float(result.stdout.strip())
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        return 0.0
+
+
+def _process_alive(pid):
+    """True if a process with this id is running"""
+    if not pid:
+        return False
+    if sys.platform.startswith('win'):
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        return code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def _prune(jobs, now=None):
+    """Job dicts without finished jobs beyond the newest FINISHED_KEEP or
+    older than FINISHED_TTL. Failed jobs are kept while their scratch input
+    exists: it is the only full-quality copy of the capture."""
+    now = now or time.time()
+    finished = sorted((d for d in jobs if d.get('status') in ('done', 'failed')),
+                      key=lambda d: d.get('finished') or 0, reverse=True)
+    drop = set()
+    for n, data in enumerate(finished):
+        if n < FINISHED_KEEP and now - (data.get('finished') or 0) < FINISHED_TTL:
+            continue
+        if data['status'] == 'failed' and os.path.exists(data['input']):
+            continue
+        drop.add(data['id'])
+    return [d for d in jobs if d['id'] not in drop]
+
+
+def _low_priority():
+    """Popen arguments that keep re-encodes from starving a live capture"""
+    if sys.platform.startswith('win'):
+        return {'creationflags': subprocess.BELOW_NORMAL_PRIORITY_CLASS}
+    return {'preexec_fn': lambda: os.nice(10)}
+
+
+class TranscodeJob:
+    """One scratch file waiting to be compressed"""
+
+    def __init__(self, input, output, preset='medium', crf='23', audio_bitrate='192k',
+                 priority=PRIORITY_NORMAL, deferred=False, delete_input=True, job_id=None,
+                 vfr=False):
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.input = input
+        self.output = output
+        self.preset = preset
+        self.crf = str(crf)
+        self.audio_bitrate = audio_bitrate
+        self.priority = priority
+        self.deferred = deferred
+        self.delete_input = delete_input
+        self.vfr = vfr
+        self.owner = None    # pid of the process whose queue runs the job
+        self.status = 'deferred' if deferred else 'pending'
+        self.progress = 0.0
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    def command(self):
+        # Every stream: multi-track captures keep all their audio tracks
+        cmd = ['ffmpeg', '-y', '-i', self.input, '-map', '0']
+        if self.vfr:
+            # Keep the capture's timestamps; MP4 would otherwise refill dropped frames
+            cmd.extend(['-fps_mode', 'vfr'])
+        cmd.extend([
+            '-c:v', 'libx264', '-preset', self.preset, '-crf', self.crf,
+            '-pix_fmt', 'yuv420p',
+            '-c:a', 'aac', '-b:a', self.audio_bitrate,
+            '-movflags', '+faststart',
+            self.output
+        ])
+        return cmd
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, data):
+        job = cls(data['input'], data['output'], job_id=data['id'])
+        job.__dict__.update(data)
+        return job
+
+
+class TranscodeQueue:
+    """Priority queue of transcode jobs run by a fixed number of FFmpeg workers.
+
+    Each worker drives its own FFmpeg process at below-normal priority, so
+    jobs run in parallel across cores without blocking the capture. Job
+    state is persisted so deferred (overnight) and interrupted jobs survive
+    a restart. The state file is shared: each job belongs to the process
+    that queued it, and another queue only takes it over once that process
+    has exited. Jobs of other running processes and finished ones loaded
+    from the file are kept in `others`, for listing only.
+    """
+
+    def __init__(self, workers=1, state_path=QUEUE_PATH, on_job_done=None):
+        self.workers = max(1, int(workers))
+        self.state_path = state_path
+        self.on_job_done = on_job_done
+        self.jobs = {}
+        self.others = {}
+        self.pid = os.getpid()
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._running = {}
+        self._stopping = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        adopted = False
+        for data in saved.get('jobs', []):
+            job = TranscodeJob.from_dict(data)
+            if job.status in ('done', 'failed') or (
+                    job.owner not in (None, self.pid) and _process_alive(job.owner)):
+                self.others[job.id] = job
+                continue
+            # Queued by a process that has exited: ours to finish now
+            job.owner = self.pid
+            adopted = True
+            if job.status == 'running':
+                job.status = 'pending'  # interrupted last time
+            self.jobs[job.id] = job
+            if job.status == 'pending':
+                heapq.heappush(self._heap, (job.priority, next(self._counter), job.id))
+        if adopted:
+            self._save()
+
+    def _save(self):
+        """Merge our jobs into the state file (other processes may share it)
+        and drop old finished entries"""
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                saved = {d['id']: d for d in json.load(f).get('jobs', [])}
+        except (OSError, ValueError):
+            saved = {}
+        for job in self.jobs.values():
+            saved[job.id] = job.to_dict()
+        try:
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            tmp = self.state_path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'jobs': _prune(list(saved.values()))}, f, indent=2)
+            os.replace(tmp, self.state_path)
+        except OSError:
+            pass
+
+    def submit(self, job):
+        """Queue a job; deferred jobs wait for run_deferred()"""
+        with self._cond:
+            job.owner = self.pid
+            self.jobs[job.id] = job
+            if not job.deferred:
+                job.status = 'pending'
+                heapq.heappush(self._heap, (job.priority, next(self._counter), job.id))
+                self._cond.notify()
+            self._save()
+        return job
+
+    def run_deferred(self):
+        """Release all deferred jobs into the queue (e.g. from a nightly task)"""
+        with self._cond:
+            for job in self.jobs.values():
+                if job.status == 'deferred':
+                    job.status = 'pending'
+                    heapq.heappush(self._heap, (job.priority, next(self._counter), job.id))
+            self._cond.notify_all()
+            self._save()
+
+    def start(self):
+        for _ in range(self.workers - len(self._threads)):
+            thread = threading.Thread(target=self._worker, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def _next_job(self):
+        with self._cond:
+            while not self._heap and not self._stopping:
+                self._cond.wait()
+            if self._stopping:
+                return None
+            _, _, job_id = heapq.heappop(self._heap)
+            job = self.jobs[job_id]
+            job.status = 'running'
+            job.started = time.time()
+            self._save()
+            return job
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            self._run(job)
+
+    def _run(self, job):
+        duration = probe_duration(job.input)
+
+        def on_progress(stats):
+            if duration:
+                job.progress = min(stats.out_time / duration, 1.0)
+
+        os.makedirs(os.path.dirname(os.path.abspath(job.output)), exist_ok=True)
+        proc = FFmpegProcess(job.command(), on_progress=on_progress,
+                             popen_kwargs=_low_priority())
+        with self._cond:
+            self._running[job.id] = proc
+        try:
+            proc.start()
+            proc.wait()
+            ok = proc.returncode == 0
+        except OSError as e:
+            ok = False
+            proc.log.append(str(e))
+        with self._cond:
+            self._running.pop(job.id, None)
+            job.finished = time.time()
+            if self._stopping:
+                # Interrupted by stop(): FFmpeg exits 0 on 'q', but the output is
+                # partial. Keep the scratch input and start over next time.
+                job.status = 'pending'
+                job.progress = 0.0
+                job.finished = None
+                if os.path.exists(job.output):
+                    os.remove(job.output)
+            elif ok:
+                job.status = 'done'
+                job.progress = 1.0
+                if job.delete_input and os.path.exists(job.input):
+                    os.remove(job.input)
+            else:
+                job.status = 'failed'
+                job.error = proc.log_tail(10)
+            self._save()
+        if self.on_job_done:
+            self.on_job_done(job)
+
+    def pending(self):
+        return [j for j in self.jobs.values() if j.status in ('pending', 'running', 'deferred')]
+
+    def wait(self, timeout=None):
+        """Block until no pending or running jobs are left"""
+        deadline = None if timeout is None else time.time() + timeout
+        while any(j.status in ('pending', 'running') for j in self.jobs.values()):
+            if deadline and time.time() > deadline:
+                return False
+            time.sleep(0.5)
+        return True
+
+    def stop(self):
+        """Stop workers; running jobs are interrupted and re-queued for next time"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            running = list(self._running.values())
+        for proc in running:
+            proc.stop()
+        for thread in self._threads:
+            thread.join(timeout=10)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Background transcode queue")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run = sub.add_parser('run', help="process queued jobs, including deferred ones")
+    run.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+
+    sub.add_parser('list', help="show queued jobs")
+
+    add = sub.add_parser('add', help="queue a file for compression")
+    add.add_argument('input')
+    add.add_argument('output')
+    add.add_argument('--preset', default='medium')
+    add.add_argument('--crf', default='23')
+    add.add_argument('--priority', type=int, default=PRIORITY_NORMAL)
+    add.add_argument('--keep-input', action='store_true')
+
+    args = parser.parse_args()
+
+    if args.command == 'add':
+        queue = TranscodeQueue()
+        job = queue.submit(TranscodeJob(args.input, args.output, args.preset, args.crf,
+                                        priority=args.priority, deferred=True,
+                                        delete_input=not args.keep_input))
+        print(f"✓ Queued {job.id}: {args.input} → {args.output}")
+
+    elif args.command == 'list':
+        queue = TranscodeQueue()
+        jobs = list(queue.jobs.values()) + list(queue.others.values())
+        for job in sorted(jobs, key=lambda j: j.created):
+            owner = f"  (pid {job.owner})" if job.id in queue.others and job.owner else ''
+            print(f"  {job.id}  {job.status:<9} p{job.priority:<2} {job.preset}/crf{job.crf}  "
+                  f"{os.path.basename(job.output)}{owner}")
+        if not jobs:
+            print("  (queue is empty)")
+
+    else:
+        queue = TranscodeQueue(workers=args.workers,
+                               on_job_done=lambda j: print(f"  {'✓' if j.status == 'done' else '✗'} "
+                                                           f"{os.path.basename(j.output)}"))
+        queue.run_deferred()
+        count = len([j for j in queue.jobs.values() if j.status == 'pending'])
+        print(f"Transcoding {count} job(s) with {queue.workers} worker(s)...")
+        queue.start()
+        try:
+            queue.wait()
+        except KeyboardInterrupt:
+            print("\nStopping, unfinished jobs stay queued")
+        queue.stop()
+
+
+if __name__ == "__main__":
+    main()
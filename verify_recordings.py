@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Recording Verification
+Checks a folder of recordings for broken containers, missing streams and A/V length mismatches, in parallel and incrementally
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+CACHE_PATH = os.path.join(os.path.expanduser('~'), '.screen_recorder', 'verify_cache.json')
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.mov')
+WORKERS = min(8, os.cpu_count() or 2)
+IN_FLIGHT = 4            # queued probes per worker; bounds memory on huge folders
+DURATION_TOLERANCE = 2.0 # seconds a recording may differ from the expected length
+AV_TOLERANCE = 0.5       # seconds audio and video may differ in length
+CACHE_VERSION = 1
+
+
+def fingerprint(stat):
+    """Identity of a file's contents as far as a stat can tell"""
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _seconds(value):
+    """'12.5' or an MKV 'HH:MM:SS.nnnnnnnnn' tag → seconds, None if absent"""
+    if not value or value == 'N/A':
+        return None
+    try:
+        if ':' in value:
+            h, m, s = value.split(':')
+            return int(h) * 3600 + int(m) * 60 + float(s)
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _stream(stream):
+    if not stream:
+        return None
+    return {
+        'codec': stream.get('codec_name'),
+        'duration': _seconds(stream.get('duration')) or _seconds(
+            stream.get('tags', {}).get('DURATION')),
+        'frames': int(stream['nb_frames']) if str(stream.get('nb_frames', '')).isdigit() else None,
+    }
+
+
+def inspect(path, deep=False):
+    """Facts about one file: container, durations, streams and errors.
+
+    Runs in a worker process. deep also decodes every frame (as slow as
+    playing the file at full speed) to find corrupt packets.
+    """
+    facts = {'path': path, 'size': None, 'error': None, 'warnings': [], 'decode_errors': None}
+    try:
+        facts['size'] = os.path.getsize(path)
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries',
+             'format=duration,format_name:stream=codec_type,codec_name,duration,nb_frames'
+             ':stream_tags=DURATION', '-of', 'json', path],
+            capture_output=True, text=True, errors='replace', timeout=120)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        facts['error'] = f"ffprobe failed: {e}"
+        return facts
+    if result.returncode != 0:
+        facts['error'] = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else \
+            f"ffprobe exited with {result.returncode}"
+        return facts
+    facts['warnings'] = result.stderr.strip().splitlines()[-5:]
+
+    data = json.loads(result.stdout or '{}')
+    streams = data.get('streams', [])
+    facts['format'] = data.get('format', {}).get('format_name')
+    facts['duration'] = _seconds(data.get('format', {}).get('duration'))
+    facts['streams'] = len(streams)
+    facts['video'] = _stream(next((s for s in streams if s.get('codec_type') == 'video'), None))
+    facts['audio'] = _stream(next((s for s in streams if s.get('codec_type') == 'audio'), None))
+
+    if deep:
+        try:
+            decode = subprocess.run(
+                ['ffmpeg', '-v', 'error', '-nostdin', '-i', path, '-map', '0', '-f', 'null', '-'],
+                capture_output=True, text=True, errors='replace', timeout=3600)
+            facts['decode_errors'] = decode.stderr.strip().splitlines()[:20]
+        except (OSError, subprocess.TimeoutExpired) as e:
+            facts['decode_errors'] = [f"decode failed: {e}"]
+    return facts
+
+
+def check(facts, expected=None, tolerance=DURATION_TOLERANCE, require_audio=False,
+          av_tolerance=AV_TOLERANCE):
+    """Problems found in a file's facts (empty if it is fine)"""
+    if facts['error']:
+        return [f"unreadable: {facts['error']}"]
+    problems = []
+    duration = facts.get('duration')
+    if not facts.get('video'):
+        problems.append("no video stream")
+    if require_audio and not facts.get('audio'):
+        problems.append("no audio stream")
+    if not duration:
+        problems.append("no duration (not finalized?)")
+    elif expected is not None and abs(duration - expected) > tolerance:
+        problems.append(f"length {duration:.1f}s, expected {expected:.1f}s")
+    video, audio = facts.get('video'), facts.get('audio')
+    if video and audio and video['duration'] and audio['duration']:
+        gap = audio['duration'] - video['duration']
+        if abs(gap) > av_tolerance:
+            problems.append(f"audio is {abs(gap):.2f}s {'longer' if gap > 0 else 'shorter'} "
+                            f"than video")
+    if facts.get('decode_errors'):
+        problems.append(f"{len(facts['decode_errors'])} decode error(s): "
+                        f"{facts['decode_errors'][0]}")
+    return problems
+
+
+def verify_file(path, deep=False, **limits):
+    """Inspect and check one file in this process: (facts, problems)"""
+    facts = inspect(path, deep)
+    return facts, check(facts, **limits)
+
+
+def find_recordings(folders, recursive=True):
+    """(path, stat) of every video file under folders"""
+    for folder in folders:
+        if os.path.isfile(folder):
+            yield os.path.abspath(folder), os.stat(folder)
+            continue
+        for root, dirs, files in os.walk(os.path.abspath(folder)):
+            if not recursive:
+                dirs.clear()
+            for name in files:
+                if name.lower().endswith(VIDEO_EXTENSIONS) and not name.startswith('.'):
+                    path = os.path.join(root, name)
+                    try:
+                        yield path, os.stat(path)
+                    except OSError:
+                        pass
+
+
+def load_cache(path=CACHE_PATH):
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') == CACHE_VERSION:
+            return data['files']
+    except (OSError, ValueError, KeyError):
+        pass
+    return {}
+
+
+def save_cache(files, path=CACHE_PATH):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'files': files}, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # a cache only
+
+
+def verify(folders, workers=WORKERS, deep=False, recursive=True, cache_path=CACHE_PATH,
+           on_result=None, **limits):
+    """Verify every recording under folders; returns (results, counts).
+
+    Files whose fingerprint matches the cache are checked against their
+    cached facts without running anything, so a re-run only probes new or
+    changed files. The checks themselves (limits: expected, tolerance,
+    require_audio, av_tolerance) are always re-applied.
+    on_result(path, facts, problems) runs in this process for every file.
+    """
+    started = time.perf_counter()
+    cache = load_cache(cache_path) if cache_path else {}
+    results = {}
+    counts = {'files': 0, 'probed': 0, 'cached': 0, 'failed': 0}
+
+    def done(path, stamp, facts):
+        cache[path] = {'fingerprint': stamp, 'facts': facts}
+        problems = check(facts, **limits)
+        results[path] = {'facts': facts, 'problems': problems}
+        counts['failed'] += bool(problems)
+        if on_result:
+            on_result(path, facts, problems)
+
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        running = {}
+        for path, stat in find_recordings(folders, recursive):
+            counts['files'] += 1
+            stamp = fingerprint(stat)
+            entry = cache.get(path)
+            if (entry and entry['fingerprint'] == stamp
+                    and (not deep or entry['facts'].get('decode_errors') is not None)):
+                counts['cached'] += 1
+                done(path, stamp, entry['facts'])
+                continue
+            while len(running) >= workers * IN_FLIGHT:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    done(*running.pop(future), future.result())
+            running[pool.submit(inspect, path, deep)] = (path, stamp)
+            counts['probed'] += 1
+        for future in wait(running).done:
+            done(*running.pop(future), future.result())
+
+    if cache_path:
+        save_cache(cache, cache_path)
+    counts['seconds'] = round(time.perf_counter() - started, 2)
+    return results, counts
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Verify recordings: container, streams, "
+                                                 "length and A/V sync")
+    parser.add_argument('folders', nargs='*', default=['.'])
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--expected', type=float, help="expected length in seconds")
+    parser.add_argument('--tolerance', type=float, default=DURATION_TOLERANCE)
+    parser.add_argument('--av-tolerance', type=float, default=AV_TOLERANCE)
+    parser.add_argument('--require-audio', action='store_true')
+    parser.add_argument('--deep', action='store_true', help="decode every frame (slow)")
+    parser.add_argument('--no-recursive', action='store_true')
+    parser.add_argument('--no-cache', action='store_true', help="probe every file again")
+    parser.add_argument('--all', action='store_true', help="list good files too")
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    def show(path, facts, problems):
+        if args.json:
+            return
+        if problems:
+            print(f"✗ {path}")
+            for problem in problems:
+                print(f"    {problem}")
+        elif args.all:
+            print(f"✓ {path} ({facts['duration']:.1f}s)")
+
+    results, counts = verify(
+        args.folders, workers=args.workers, deep=args.deep, recursive=not args.no_recursive,
+        cache_path=None if args.no_cache else CACHE_PATH, on_result=show,
+        expected=args.expected, tolerance=args.tolerance, require_audio=args.require_audio,
+        av_tolerance=args.av_tolerance)
+
+    if args.json:
+        print(json.dumps({'counts': counts, 'results': results}, indent=2))
+    else:
+        print(f"\n{counts['files']} file(s) in {counts['seconds']:.2f}s: "
+              f"{counts['probed']} probed, {counts['cached']} from cache, "
+              f"{counts['failed']} with problems")
+    sys.exit(1 if counts['failed'] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Video Filters for Desktop Capture
+Static-frame decimation with variable frame rate output and capture-time redaction, with benchmarks on synthetic sources
+"""
+
+import json
+import os
+import tempfile
+import time
+
+from ffmpeg_progress import FFmpegProcess
+
+STATS_PATH = os.path.join(os.path.expanduser('~'), '.screen_recorder', 'decimation_stats.json')
+STATS_HISTORY = 100        # sessions kept in STATS_PATH
+KEEPALIVE_SECONDS = 2      # emit a frame at least this often on a frozen screen
+REDACT_STYLES = ('blur', 'pixelate', 'box')
+REDACT_STYLE = 'blur'
+BLUR_RADIUS = 20           # boxblur radius; two passes make text unreadable
+PIXEL_SIZE = 16            # pixelate block size
+MIN_REGION = 8             # thinner rectangles are grown to this
+
+
+def decimate_filter(fps, keepalive=KEEPALIVE_SECONDS):
+    """mpdecimate tuned for screen content.
+
+    Thresholds are the FFmpeg defaults (8x8 blocks, so a blinking cursor
+    still counts as a change). 'max' caps how many frames in a row may be
+    dropped, so players and seeking get a frame every `keepalive` seconds.
+    """
+    max_drop = max(1, int(float(fps) * keepalive) - 1)
+    return f'mpdecimate=max={max_drop}'
+
+
+def vfr_args(fps, keepalive=KEEPALIVE_SECONDS):
+    """Output arguments that drop duplicate frames and keep the timestamps.
+
+    MP4 defaults to constant frame rate and would re-duplicate the dropped
+    frames, so the output is forced to VFR.
+    """
+    return ['-vf', decimate_filter(fps, keepalive), '-fps_mode', 'vfr']
+
+
+def redaction_region(spec):
+    """Region dict from 'x,y,w,h', a {'x', 'y', 'width', 'height'} dict
+    (monitor style) or {'window': title} (followed while recording)"""
+    if isinstance(spec, dict):
+        if 'window' in spec:
+            return {'window': spec['window']}
+        return {k: int(spec[k]) for k in ('x', 'y', 'width', 'height')}
+    try:
+        x, y, w, h = (int(v) for v in str(spec).split(','))
+    except ValueError:
+        raise ValueError(f"Redaction region must be x,y,width,height: {spec}")
+    return {'x': x, 'y': y, 'width': w, 'height': h}
+
+
+def clip_regions(regions, origin=(0, 0), size=(None, None)):
+    """Screen rectangles → rectangles inside a capture at origin of size.
+
+    Parts outside the capture are cut off (all sides when size is known).
+    Rectangles thinner than MIN_REGION are grown to it, so masking errs
+    on the side of too much. A region entirely outside the capture
+    becomes None, in the same position, so callers can tell which one.
+    """
+    clipped = []
+    for r in regions:
+        x, y = r['x'] - origin[0], r['y'] - origin[1]
+        right, bottom = x + r['width'], y + r['height']
+        x, y = max(x, 0), max(y, 0)
+        if size[0]:
+            right = min(right, int(size[0]))
+        if size[1]:
+            bottom = min(bottom, int(size[1]))
+        if right <= x or bottom <= y:
+            clipped.append(None)
+            continue
+        if right - x < MIN_REGION:
+            right = x + MIN_REGION
+            if size[0] and right > int(size[0]):
+                x, right = max(int(size[0]) - MIN_REGION, 0), int(size[0])
+        if bottom - y < MIN_REGION:
+            bottom = y + MIN_REGION
+            if size[1] and bottom > int(size[1]):
+                y, bottom = max(int(size[1]) - MIN_REGION, 0), int(size[1])
+        clipped.append({'x': x, 'y': y, 'width': right - x, 'height': bottom - y})
+    return clipped
+
+
+def redact_filter(regions, style=REDACT_STYLE, source='[0:v]', output='[redacted]'):
+    """Filter graph from source to output with the regions masked.
+
+    Only the regions are processed: 'box' fills them in place (drawbox),
+    'blur' and 'pixelate' crop each region from a split of the frame,
+    blur or pixelate just that crop and overlay it back. The frame
+    itself is not filtered, so the cost grows with the masked area, not
+    the capture size. Regions are capture coordinates (clip_regions);
+    crop sizes are also clamped in the graph in case the capture is
+    smaller than expected.
+    """
+    if style not in REDACT_STYLES:
+        raise ValueError(f"Unknown redaction style: {style}")
+    if not regions:
+        return f"{source}null{output}"
+    if style == 'box':
+        boxes = ','.join(f"drawbox=x={r['x']}:y={r['y']}:w={r['width']}:h={r['height']}"
+                         f":color=black:t=fill" for r in regions)
+        return f"{source}{boxes}{output}"
+
+    n = len(regions)
+    graph = [f"{source}split={n + 1}[rbase]" + ''.join(f'[rc{i}]' for i in range(n))]
+    base = '[rbase]'
+    for i, r in enumerate(regions):
+        crop = (f"[rc{i}]crop=w='min({r['width']},iw-{r['x']})':h='min({r['height']},ih-{r['y']})'"
+                f":x={r['x']}:y={r['y']}")
+        if style == 'blur':
+            # Radius limited to what the (possibly small) crop allows
+            radius = (f"boxblur=luma_radius='min({BLUR_RADIUS},min(w,h)/2-1)'"
+                      f":chroma_radius='min({BLUR_RADIUS},min(cw,ch)/2-1)':luma_power=2")
+            graph.append(f"{crop},{radius}[rb{i}]")
+        else:
+            # Blocks are scaled back from the crop's own size, which the clamp
+            # may have made smaller than the region; any part past the frame
+            # edge is cut off by the overlay
+            graph.append(f"{crop},scale='ceil(iw/{PIXEL_SIZE})':'ceil(ih/{PIXEL_SIZE})',"
+                         f"scale=iw*{PIXEL_SIZE}:ih*{PIXEL_SIZE}:flags=neighbor,"
+                         f"crop=w='min(iw,{r['width']})':h='min(ih,{r['height']})':x=0:y=0[rb{i}]")
+        target = output if i == n - 1 else f'[ro{i}]'
+        graph.append(f"{base}[rb{i}]overlay=x={r['x']}:y={r['y']}:eof_action=pass{target}")
+        base = target
+    return ';'.join(graph)
+
+
+class DecimationStats:
+    """Frames captured vs frames kept, derived from FFmpeg progress.
+
+    Progress 'frame' counts encoded (kept) frames, and out_time advances
+    with the capture clock, so out_time * fps is what a CFR encode would
+    have written.
+    """
+
+    def __init__(self, fps):
+        self.fps = float(fps)
+        self.kept = 0
+        self.seconds = 0.0
+
+    def update(self, stats):
+        self.kept = stats.frame
+        self.seconds = stats.out_time
+        return self
+
+    @property
+    def captured(self):
+        return max(self.kept, int(round(self.seconds * self.fps)))
+
+    @property
+    def dropped(self):
+        return self.captured - self.kept
+
+    @property
+    def dropped_percent(self):
+        return 100.0 * self.dropped / self.captured if self.captured else 0.0
+
+    def summary(self):
+        return f"static frames skipped: {self.dropped} ({self.dropped_percent:.0f}%)"
+
+    def to_dict(self):
+        return {
+            'fps': self.fps,
+            'seconds': round(self.seconds, 2),
+            'captured': self.captured,
+            'kept': self.kept,
+            'dropped': self.dropped,
+            'dropped_percent': round(self.dropped_percent, 1),
+        }
+
+
+def record_session(output, stats, path=STATS_PATH):
+    """Append one session's decimation stats to the history file"""
+    entry = dict(stats.to_dict(), output=output, finished=time.time())
+    try:
+        with open(path, encoding='utf-8') as f:
+            sessions = json.load(f).get('sessions', [])
+    except (OSError, ValueError):
+        sessions = []
+    sessions = (sessions + [entry])[-STATS_HISTORY:]
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'sessions': sessions}, f, indent=2)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # statistics only
+    return entry
+
+
+def static_source(width=1920, height=1080, fps=30, change_every=3):
+    """lavfi stand-in for a screencast: a new 'slide' every few seconds"""
+    return ['-f', 'lavfi', '-i',
+            f'testsrc2=size={width}x{height}:rate=1/{change_every},fps={fps}']
+
+
+def encode(input_args, vfr, fps, duration, output, preset='ultrafast', crf='23',
+           graph=None, mode=None):
+    """Encode `duration` seconds and measure wall time, CPU time, size and frames.
+
+    graph is a filter graph ending in [redacted] (see redact_filter).
+    """
+    cmd = ['ffmpeg', '-y'] + input_args + ['-t', str(duration)]
+    if vfr:
+        cmd.extend(vfr_args(fps))
+    if graph:
+        cmd.extend(['-filter_complex', graph, '-map', '[redacted]'])
+    cmd.extend(['-c:v', 'libx264', '-preset', preset, '-crf', crf,
+                '-pix_fmt', 'yuv420p', output])
+
+    stats = DecimationStats(fps)
+    cpu_before = os.times()
+    started = time.time()
+    proc = FFmpegProcess(cmd, on_progress=stats.update).start()
+    proc.wait()
+    wall = time.time() - started
+    cpu_after = os.times()
+    if proc.returncode != 0:
+        raise RuntimeError(f"FFmpeg failed:\n{proc.log_tail(10)}")
+
+    cpu = ((cpu_after.children_user - cpu_before.children_user) +
+           (cpu_after.children_system - cpu_before.children_system))
+    return {
+        'mode': mode or ('vfr' if vfr else 'cfr'),
+        'wall_seconds': round(wall, 2),
+        'cpu_seconds': round(cpu, 2) if cpu > 0 else None,
+        'size_bytes': os.path.getsize(output),
+        'frames': proc.latest.frame,
+        'decimation': stats.to_dict() if vfr else None,
+    }
+
+
+def benchmark(width=1920, height=1080, fps=30, duration=30, change_every=3):
+    """CFR vs VFR on the same mostly-static source"""
+    source = static_source(width, height, fps, change_every)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for vfr in (False, True):
+            output = os.path.join(tmp, f"bench_{'vfr' if vfr else 'cfr'}.mp4")
+            results.append(encode(source, vfr, fps, duration, output))
+    return results
+
+
+def benchmark_regions(width, height):
+    """A login form, a customer-data side panel and a status bar"""
+    return [
+        {'x': width * 3 // 8, 'y': height * 2 // 5, 'width': width // 4, 'height': height // 18},
+        {'x': width * 3 // 4, 'y': height // 9, 'width': width // 5, 'height': height // 2},
+        {'x': 0, 'y': height * 17 // 18, 'width': width // 2, 'height': height // 18},
+    ]
+
+
+def redaction_benchmark(width=1920, height=1080, fps=30, duration=30, style=REDACT_STYLE,
+                        regions=None):
+    """Capture cost with and without redaction, at the same encoder settings.
+
+    Runs a moving source (every frame changes, as in a busy capture)
+    three ways: unredacted, redacted with the region-only graph, and
+    redacted by blurring the whole frame and overlaying the regions of it
+    (what a mask over a filtered frame costs). Encodes run as fast as
+    possible, so CPU time and wall time both show the overhead.
+    """
+    source = ['-f', 'lavfi', '-i', f'testsrc2=size={width}x{height}:rate={fps}']
+    regions = regions or benchmark_regions(width, height)
+    full_frame = [f"[0:v]split=2[rbase][rfull];[rfull]boxblur={BLUR_RADIUS}:luma_power=2,"
+                  f"split={len(regions)}" + ''.join(f'[rf{i}]' for i in range(len(regions)))]
+    base = '[rbase]'
+    for i, r in enumerate(regions):
+        target = '[redacted]' if i == len(regions) - 1 else f'[ro{i}]'
+        full_frame.append(f"[rf{i}]crop={r['width']}:{r['height']}:{r['x']}:{r['y']}[rc{i}];"
+                          f"{base}[rc{i}]overlay=x={r['x']}:y={r['y']}{target}")
+        base = target
+    runs = [('none', None), (style, redact_filter(regions, style)),
+            ('full-frame', ';'.join(full_frame))]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, graph in runs:
+            output = os.path.join(tmp, f"redact_{mode}.mp4")
+            results.append(encode(source, False, fps, duration, output, graph=graph, mode=mode))
+    for r in results:
+        r['fps'] = round(r['frames'] / r['wall_seconds'], 1) if r['wall_seconds'] else 0.0
+    return results
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark static-frame decimation (VFR) "
+                                                 "against constant frame rate, or the cost "
+                                                 "of capture-time redaction")
+    parser.add_argument('--size', default='1920x1080')
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--duration', type=int, default=30)
+    parser.add_argument('--change-every', type=int, default=3,
+                        help="seconds between screen changes in the synthetic source")
+    parser.add_argument('--redaction', action='store_true',
+                        help="benchmark redaction overhead instead")
+    parser.add_argument('--style', choices=REDACT_STYLES, default=REDACT_STYLE)
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split('x'))
+    if args.redaction:
+        print(f"Encoding {args.duration}s of {args.size}@{args.fps}, "
+              f"unredacted and with 3 regions masked...\n")
+        results = redaction_benchmark(width, height, args.fps, args.duration, args.style)
+        plain = results[0]
+        for r in results:
+            cpu = f"{r['cpu_seconds']:.1f}s" if r['cpu_seconds'] is not None else "n/a"
+            overhead = ''
+            if r is not plain and plain['cpu_seconds'] and r['cpu_seconds']:
+                overhead = f"  (+{100 * (r['cpu_seconds'] / plain['cpu_seconds'] - 1):.0f}% CPU)"
+            print(f"  {r['mode']:<10} {r['fps']:>7.1f} fps  wall {r['wall_seconds']:.1f}s  "
+                  f"cpu {cpu}{overhead}")
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump({r['mode']: r for r in results}, f, indent=2)
+        return
+
+    print(f"Encoding {args.duration}s of a mostly-static {args.size}@{args.fps} source...\n")
+    cfr, vfr = benchmark(width, height, args.fps, args.duration, args.change_every)
+
+    for r in (cfr, vfr):
+        cpu = f"{r['cpu_seconds']:.1f}s" if r['cpu_seconds'] is not None else "n/a"
+        print(f"  {r['mode'].upper()}  {r['frames']:>6} frames  {r['size_bytes'] / 1024:>8.0f} KB  "
+              f"wall {r['wall_seconds']:.1f}s  cpu {cpu}")
+    print(f"\n✓ VFR: {vfr['decimation']['dropped_percent']:.0f}% of frames skipped, "
+          f"file {100 * (1 - vfr['size_bytes'] / max(cfr['size_bytes'], 1)):.0f}% smaller")
+    if cfr['cpu_seconds'] and vfr['cpu_seconds']:
+        print(f"  encoder CPU {100 * (1 - vfr['cpu_seconds'] / cfr['cpu_seconds']):.0f}% lower")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'cfr': cfr, 'vfr': vfr}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()